@@ -0,0 +1,152 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import duckdb
+
+import payroll_archive
+
+# Parameterized reports over the Parquet archive. Each query reads the
+# ``payroll`` view (one row per archived employee with ``company`` and
+# ``month`` columns) and takes its parameters in the order listed.
+REPORTS = {
+    'ctc-trend': {
+        'description': 'Total CTC per company and month',
+        'params': ['start_month', 'end_month'],
+        'sql': """
+            SELECT company, month, COUNT(*) AS employee_count,
+                   SUM(ctc) AS total_ctc, SUM(total_b) AS total_gross
+            FROM payroll
+            WHERE month BETWEEN ? AND ?
+            GROUP BY company, month
+            ORDER BY company, month
+        """
+    },
+    'top-ot-earners': {
+        'description': 'Employees with the highest OT wages in a month',
+        'params': ['month', 'limit'],
+        'sql': """
+            SELECT company, employee_id, name, ot_days, ot_wages
+            FROM payroll
+            WHERE month = ? AND ot_wages > 0
+            ORDER BY ot_wages DESC, company, employee_id
+            LIMIT ?
+        """
+    },
+    'esi-liability': {
+        'description': 'ESI employee and employer share per month and company',
+        'params': ['start_month', 'end_month'],
+        'sql': """
+            SELECT month, company, SUM(esi_employee) AS employee_share,
+                   SUM(esi_employer) AS employer_share,
+                   SUM(esi_employee + esi_employer) AS total_liability
+            FROM payroll
+            WHERE month BETWEEN ? AND ?
+            GROUP BY month, company
+            ORDER BY month, company
+        """
+    },
+}
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 1000
+
+# Report results kept per worker; the least recently used leaves first
+REPORT_CACHE_SIZE = int(os.getenv("REPORT_CACHE_SIZE", "256"))
+
+
+class ReportCache:
+    """Report results per (tenant, month range), valid until one of its months is rewritten.
+
+    Every cached result remembers the archive write stamps of the months it
+    covers. Writes in this process drop entries through ``invalidate``; writes
+    made by other workers change the stamps, which is checked on lookup. The
+    keys come from request parameters, so at most ``capacity`` results are
+    kept, least recently used out first.
+    """
+
+    def __init__(self, capacity: int = REPORT_CACHE_SIZE):
+        self.capacity = capacity
+        self._entries: "OrderedDict[Tuple, Tuple[Tuple, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple, stamp: Tuple) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == stamp:
+                self._entries.move_to_end(key)
+                return entry[1]
+        return None
+
+    def put(self, key: Tuple, stamp: Tuple, rows: List[Dict[str, Any]]):
+        with self._lock:
+            self._entries[key] = (stamp, rows)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tenant_id: Optional[str] = None, month: Optional[str] = None):
+        """Drop cached results of a tenant that cover the given month (all months if None)."""
+        with self._lock:
+            for key in list(self._entries):
+                key_tenant, _, start_month, end_month = key[:4]
+                if key_tenant != tenant_id:
+                    continue
+                if month is None or start_month <= month <= end_month:
+                    del self._entries[key]
+
+
+report_cache = ReportCache()
+
+
+def run_report(
+    report: str,
+    tenant_id: Optional[str] = None,
+    month: Optional[str] = None,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    limit: int = DEFAULT_LIMIT
+) -> List[Dict[str, Any]]:
+    """Run a named report for a tenant, serving it from the cache when still valid.
+
+    Raises KeyError for an unknown report and ValueError for invalid months.
+    """
+    definition = REPORTS[report]
+    if 'month' in definition['params']:
+        if not month:
+            raise ValueError(f"Report '{report}' requires a month")
+        start_month = end_month = payroll_archive.normalize_month(month)
+    else:
+        if not start_month or not end_month:
+            raise ValueError(f"Report '{report}' requires start_month and end_month")
+        start_month = payroll_archive.normalize_month(start_month)
+        end_month = payroll_archive.normalize_month(end_month)
+
+    root = payroll_archive.archive_root(tenant_id)
+    stamps = payroll_archive.month_stamps(root)
+    stamp = tuple(sorted((m, t) for m, t in stamps.items() if start_month <= m <= end_month))
+    key = (tenant_id, report, start_month, end_month, limit)
+
+    rows = report_cache.get(key, stamp)
+    if rows is not None:
+        return rows
+
+    dataset = payroll_archive.archive_dataset(root)
+    if dataset is None or not stamp:
+        rows = []
+    else:
+        values = {'start_month': start_month, 'end_month': end_month, 'month': start_month, 'limit': limit}
+        connection = duckdb.connect()
+        try:
+            # DuckDB scans the Arrow dataset directly, pushing the month
+            # filter and column selection down to the Parquet files
+            connection.register('payroll', dataset)
+            cursor = connection.execute(definition['sql'], [values[name] for name in definition['params']])
+            columns = [column[0] for column in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            connection.close()
+
+    report_cache.put(key, stamp, rows)
+    return rows
@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+import analytics
+from mapping_api import get_tenant_id
+
+router = APIRouter()
+
+@router.get("/analytics/reports", response_model=List[dict])
+async def list_reports():
+    """List the available analytics reports and their parameters"""
+    return [
+        {"name": name, "description": report["description"], "params": report["params"]}
+        for name, report in analytics.REPORTS.items()
+    ]
+
+@router.get("/analytics/reports/{report}", response_model=List[dict])
+async def get_report(
+    report: str,
+    month: Optional[str] = None,
+    start_month: Optional[str] = None,
+    end_month: Optional[str] = None,
+    limit: int = Query(analytics.DEFAULT_LIMIT, ge=1, le=analytics.MAX_LIMIT),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Run an analytics report over the payroll archive of the current tenant"""
+    if report not in analytics.REPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown report: {report}")
+    try:
+        return await run_in_threadpool(
+            analytics.run_report,
+            report,
+            tenant_id=tenant_id,
+            month=month,
+            start_month=start_month,
+            end_month=end_month,
+            limit=limit
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
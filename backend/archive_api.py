@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+
+import payroll_archive
+from mapping_api import get_tenant_id
+
+router = APIRouter()
+
+@router.get("/archive/monthly-totals", response_model=List[dict])
+async def get_monthly_totals(
+    start_month: str,
+    end_month: str,
+    company: Optional[List[str]] = Query(None),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Payroll totals per company and month from the Parquet archive"""
+    try:
+        return await run_in_threadpool(
+            payroll_archive.monthly_totals,
+            start_month,
+            end_month,
+            companies=company,
+            root=payroll_archive.archive_root(tenant_id)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/archive/year-over-year/{year}", response_model=List[dict])
+async def get_year_over_year(year: int, tenant_id: Optional[str] = Depends(get_tenant_id)):
+    """Payroll totals per company for a year compared with the previous year"""
+    return await run_in_threadpool(
+        payroll_archive.year_over_year,
+        year,
+        root=payroll_archive.archive_root(tenant_id)
+    )
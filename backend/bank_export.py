@@ -0,0 +1,120 @@
+import csv
+import io
+from typing import Any, Dict, Iterable, Iterator
+
+# Archive fields every bank format may use
+EXPORT_COLUMNS = ['employee_id', 'name', 'bank_account', 'bank_transfer']
+
+# Bytes buffered before a chunk is sent to the client
+CHUNK_SIZE = 64 * 1024
+
+
+class BankFormat:
+    """Base class of a bank upload file format.
+
+    A format renders one line per employee plus an optional header and
+    trailer. Subclasses are registered in BANK_FORMATS by name.
+    """
+
+    media_type = 'text/plain'
+    extension = 'txt'
+
+    def header(self, company: str, month: str) -> str:
+        return ''
+
+    def line(self, employee: Dict[str, Any]) -> str:
+        raise NotImplementedError
+
+    def trailer(self, count: int, total: float) -> str:
+        return ''
+
+
+class CSVBankFormat(BankFormat):
+    """Comma separated file with a header row."""
+
+    media_type = 'text/csv'
+    extension = 'csv'
+
+    def _row(self, values) -> str:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    def header(self, company: str, month: str) -> str:
+        return self._row(['Employee ID', 'Name', 'Account Number', 'Amount'])
+
+    def line(self, employee: Dict[str, Any]) -> str:
+        return self._row([
+            employee['employee_id'],
+            employee['name'],
+            employee.get('bank_account') or '',
+            f"{employee['bank_transfer'] or 0:.2f}"
+        ])
+
+
+class FixedWidthBankFormat(BankFormat):
+    """Fixed-width records: H header, D detail lines, T trailer with count and total.
+
+    Amounts are written in paise, zero padded, as most bulk upload formats expect.
+    """
+
+    extension = 'txt'
+    widths = {'employee_id': 12, 'name': 35, 'bank_account': 20, 'amount': 15}
+
+    def header(self, company: str, month: str) -> str:
+        return f"H{company[:40]:<40}{month:<7}\r\n"
+
+    def line(self, employee: Dict[str, Any]) -> str:
+        widths = self.widths
+        amount = int(round((employee['bank_transfer'] or 0) * 100))
+        return (
+            f"D{str(employee['employee_id'])[:widths['employee_id']]:<{widths['employee_id']}}"
+            f"{str(employee['name'])[:widths['name']]:<{widths['name']}}"
+            f"{str(employee.get('bank_account') or '')[:widths['bank_account']]:<{widths['bank_account']}}"
+            f"{amount:0{widths['amount']}d}\r\n"
+        )
+
+    def trailer(self, count: int, total: float) -> str:
+        return f"T{count:08d}{int(round(total * 100)):0{self.widths['amount']}d}\r\n"
+
+
+BANK_FORMATS = {
+    'csv': CSVBankFormat,
+    'fixed-width': FixedWidthBankFormat,
+}
+
+
+def register_bank_format(name: str, format_class):
+    """Make a BankFormat subclass available to the export endpoint."""
+    BANK_FORMATS[name] = format_class
+
+
+def stream_bank_file(
+    employees: Iterable[Dict[str, Any]],
+    bank_format: BankFormat,
+    company: str,
+    month: str,
+    chunk_size: int = CHUNK_SIZE
+) -> Iterator[bytes]:
+    """Render a bank upload file as a stream of byte chunks.
+
+    Employees are consumed lazily and lines are flushed every ``chunk_size``
+    bytes, so memory stays constant and the download starts immediately.
+    """
+    lines = [bank_format.header(company, month)]
+    pending = len(lines[0])
+    count = 0
+    total = 0.0
+    for employee in employees:
+        line = bank_format.line(employee)
+        lines.append(line)
+        pending += len(line)
+        count += 1
+        total += employee['bank_transfer'] or 0
+        if pending >= chunk_size:
+            yield ''.join(lines).encode('utf-8')
+            lines = []
+            pending = 0
+
+    lines.append(bank_format.trailer(count, total))
+    yield ''.join(lines).encode('utf-8')
@@ -0,0 +1,16 @@
+"""Ingestion benchmarks.
+
+Run from the backend directory so the flat imports resolve:
+
+    python -m benchmarks.run --rows 2000 --sheets 5 --dirty-rate 0.02
+
+Each run generates synthetic workbooks (see ``benchmarks.workbooks``), times
+the ingestion paths in a fresh process each, and appends the results to a
+JSON history file so regressions show up against earlier runs. The default
+file, ``benchmarks/history.json``, is local to the machine and not tracked.
+
+``benchmarks.query_plans`` checks with EXPLAIN that each list endpoint
+query is served by its index:
+
+    python -m benchmarks.query_plans [--url postgresql://.../scratch]
+"""
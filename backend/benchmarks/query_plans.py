@@ -0,0 +1,241 @@
+"""Check with EXPLAIN that every list endpoint query is served by an index.
+
+    python -m benchmarks.query_plans [--url DATABASE_URL] [--companies N]
+                                     [--employees N] [--months N] [--verbose]
+
+Seeds a scratch database (a temporary SQLite file unless --url points at
+an empty PostgreSQL database), builds each query shape with the same
+functions company_api uses, and exits with status 1 when a plan scans a
+whole table, picks an unexpected index or sorts a result that should come
+out of the index in order. tests/test_query_plans.py runs the same check
+under pytest against SQLite; this script is the way to check PostgreSQL.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import uuid
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class Shape(NamedTuple):
+    name: str
+    # (api, session, sample) -> Query
+    build: Callable
+    # Indexes the plan may use; any of them is fine
+    indexes: Tuple[str, ...]
+    # The rows must come out of the index in order (no sort step)
+    ordered: bool = False
+
+
+PAYROLL_MONTH = 'ix_payroll_entries_company_id_report_month_employee_id'
+PAYROLL_EMPLOYEE = 'ix_payroll_entries_company_id_employee_id_report_month'
+ATTENDANCE_MONTH = 'ix_attendance_records_company_id_month'
+ATTENDANCE_EMPLOYEE = 'ix_attendance_records_company_id_employee_id_month'
+
+
+def _company_filter(sample):
+    return lambda model: model.company_id == sample['company_id']
+
+
+SHAPES = [
+    Shape('GET /employees',
+          lambda api, db, s: api.employees_query(db, _company_filter(s)),
+          ('ix_employees_company_id_employee_id',)),
+    Shape('GET /attendance?month',
+          lambda api, db, s: api.attendance_query(db, _company_filter(s), month=s['month']),
+          (ATTENDANCE_MONTH,)),
+    Shape('GET /attendance?start_month&end_month',
+          lambda api, db, s: api.attendance_query(
+              db, _company_filter(s), start_month=s['start_month'], end_month=s['end_month']),
+          (ATTENDANCE_MONTH,)),
+    Shape('GET /attendance?employee_id',
+          lambda api, db, s: api.attendance_query(db, _company_filter(s), employee_id=s['employee_id']),
+          (ATTENDANCE_EMPLOYEE,)),
+    Shape('GET /attendance?month&employee_id',
+          lambda api, db, s: api.attendance_query(
+              db, _company_filter(s), month=s['month'], employee_id=s['employee_id']),
+          (ATTENDANCE_EMPLOYEE,)),
+    Shape('GET /payroll?month',
+          lambda api, db, s: api.payroll_query(db, _company_filter(s), month=s['month']),
+          (PAYROLL_MONTH,)),
+    Shape('GET /payroll?start_month&end_month',
+          lambda api, db, s: api.payroll_query(
+              db, _company_filter(s), start_month=s['start_month'], end_month=s['end_month']),
+          (PAYROLL_MONTH,)),
+    Shape('GET /payroll?employee_id',
+          lambda api, db, s: api.payroll_query(db, _company_filter(s), employee_id=s['employee_id']),
+          (PAYROLL_EMPLOYEE,)),
+    Shape('GET /payroll?month&employee_id',
+          lambda api, db, s: api.payroll_query(
+              db, _company_filter(s), month=s['month'], employee_id=s['employee_id']),
+          (PAYROLL_EMPLOYEE, PAYROLL_MONTH)),
+    Shape('GET /payroll/payslips',
+          lambda api, db, s: api.payslip_entries_query(db, s['company_id'], s['month']),
+          (PAYROLL_MONTH,), ordered=True),
+]
+
+
+def load_api(database_url: str):
+    """Import company_api against ``database_url`` (the engine is created at import)."""
+    os.environ['DATABASE_URL'] = database_url
+    # company_api uses package-relative imports
+    sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+    from backend import company_api, database, updated_payroll_models
+    return company_api, database, updated_payroll_models
+
+
+def seed(database, models, companies: int, employees: int, months: int) -> Dict[str, Any]:
+    """Create the tables and fill them; returns the filter values the shapes query with."""
+    engine = database.engine
+    models.Base.metadata.create_all(bind=engine)
+    month_list = [date(2024 + index // 12, index % 12 + 1, 1) for index in range(months)]
+    company_ids = [str(uuid.uuid4()) for _ in range(companies)]
+
+    with engine.begin() as conn:
+        conn.execute(models.Company.__table__.insert(), [
+            {'id': company_id, 'name': f"Company {index}"} for index, company_id in enumerate(company_ids)
+        ])
+        for company_id in company_ids:
+            employee_ids = [f"E{index:05d}" for index in range(employees)]
+            conn.execute(models.Employee.__table__.insert(), [
+                {'company_id': company_id, 'employee_id': employee_id, 'name': employee_id}
+                for employee_id in employee_ids
+            ])
+            conn.execute(models.AttendanceRecord.__table__.insert(), [
+                {'company_id': company_id, 'employee_id': employee_id, 'month': month, 'days_worked': 26}
+                for month in month_list for employee_id in employee_ids
+            ])
+            conn.execute(models.PayrollEntry.__table__.insert(), [
+                {'company_id': company_id, 'employee_id': employee_id, 'report_month': month,
+                 'gross_salary': 20000.0, 'net_salary': 18000.0, 'ctc': 23000.0}
+                for month in month_list for employee_id in employee_ids
+            ])
+        # Planner statistics, so the plans match a production-sized table
+        conn.exec_driver_sql("ANALYZE")
+
+    return {
+        'company_id': company_ids[len(company_ids) // 2],
+        'employee_id': f"E{employees // 2:05d}",
+        'month': month_list[-1],
+        'start_month': month_list[max(0, len(month_list) - 3)],
+        'end_month': month_list[-1],
+    }
+
+
+def explain(db, query) -> List[Any]:
+    """EXPLAIN the SQL of ``query`` with its parameters bound."""
+    dialect = db.bind.dialect
+    compiled = query.statement.compile(dialect=dialect)
+    params = compiled.construct_params()
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    prefix = "EXPLAIN (FORMAT JSON) " if dialect.name == 'postgresql' else "EXPLAIN QUERY PLAN "
+    return db.connection().exec_driver_sql(prefix + compiled.string, params).fetchall()
+
+
+def _sqlite_plan(rows) -> Tuple[List[str], List[str], bool, List[str]]:
+    """Indexes used, tables scanned, whether a sort step is needed, and the plan lines."""
+    indexes, scans, sorts, lines = [], [], False, []
+    for row in rows:
+        detail = row[-1]
+        lines.append(detail)
+        words = detail.split()
+        if 'INDEX' in words:
+            indexes.append(words[words.index('INDEX') + 1])
+        elif words[:1] == ['SCAN'] and len(words) == 2:
+            scans.append(words[1])
+        if 'TEMP B-TREE' in detail:
+            sorts = True
+    return indexes, scans, sorts, lines
+
+
+def _postgres_plan(db, rows) -> Tuple[List[str], List[str], bool, List[str]]:
+    indexes, scans, sorts, lines = [], [], False, []
+    plan = rows[0][0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    def walk(node, depth):
+        nonlocal sorts
+        relation = node.get('Relation Name') or ''
+        lines.append(f"{'  ' * depth}{node['Node Type']} {node.get('Index Name') or relation}".rstrip())
+        if node.get('Index Name'):
+            # Partitions carry their own copy of each index; report the parent's name
+            root = db.connection().exec_driver_sql(
+                "SELECT COALESCE(pg_partition_root(to_regclass(%(name)s))::text, %(name)s)",
+                {'name': node['Index Name']}
+            ).scalar()
+            indexes.append(root)
+        elif node['Node Type'] == 'Seq Scan':
+            scans.append(relation)
+        if node['Node Type'] in ('Sort', 'Incremental Sort'):
+            sorts = True
+        for child in node.get('Plans', []):
+            walk(child, depth + 1)
+
+    walk(plan[0]['Plan'], 0)
+    return indexes, scans, sorts, lines
+
+
+def check(api, db, sample, shapes: List[Shape] = SHAPES) -> List[Dict[str, Any]]:
+    results = []
+    for shape in shapes:
+        rows = explain(db, shape.build(api, db, sample))
+        if db.bind.dialect.name == 'postgresql':
+            indexes, scans, sorts, lines = _postgres_plan(db, rows)
+        else:
+            indexes, scans, sorts, lines = _sqlite_plan(rows)
+
+        problems = []
+        if scans:
+            problems.append(f"full scan of {', '.join(scans)}")
+        if not any(index in shape.indexes for index in indexes):
+            problems.append(f"expected {' or '.join(shape.indexes)}, used {', '.join(indexes) or 'no index'}")
+        if shape.ordered and sorts:
+            problems.append("sorts instead of reading the index in order")
+        results.append({'shape': shape.name, 'indexes': indexes, 'problems': problems, 'plan': lines})
+    return results
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Check the list endpoint query plans with EXPLAIN")
+    parser.add_argument('--url', default=None, help="Empty scratch database to seed (default: temporary SQLite)")
+    parser.add_argument('--companies', type=int, default=20, help="Companies to seed")
+    parser.add_argument('--employees', type=int, default=200, help="Employees per company")
+    parser.add_argument('--months', type=int, default=12, help="Months of attendance and payroll per employee")
+    parser.add_argument('--verbose', action='store_true', help="Print every plan")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        api, database, models = load_api(args.url or f"sqlite:///{os.path.join(directory, 'plans.db')}")
+        sample = seed(database, models, args.companies, args.employees, args.months)
+        db = database.SessionLocal()
+        try:
+            results = check(api, db, sample)
+        finally:
+            db.close()
+            database.engine.dispose()
+
+    failed = 0
+    for result in results:
+        status = 'FAIL' if result['problems'] else 'ok'
+        print(f"{status:4s} {result['shape']:40s} {', '.join(result['indexes']) or '-'}")
+        for problem in result['problems']:
+            print(f"     {problem}")
+        if args.verbose or result['problems']:
+            for line in result['plan']:
+                print(f"       {line}")
+        failed += bool(result['problems'])
+
+    if failed:
+        print(f"{failed} of {len(results)} query shapes are not served by their index")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+"""Time the ingestion paths on synthetic workbooks and record the results.
+
+    python -m benchmarks.run [--rows N] [--sheets N] [--dirty-rate R]
+                             [--no-total-rows] [--repeat N] [--only NAME ...]
+                             [--history PATH] [--label TEXT]
+"""
+import argparse
+import contextlib
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks import workbooks
+
+# Machine-local results; ignored by git (see .gitignore)
+DEFAULT_HISTORY = os.path.join(os.path.dirname(__file__), 'history.json')
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _best_of(repeat: int, run: Callable[[], Any]) -> float:
+    timings = []
+    for _ in range(repeat):
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            started = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def bench_process_excel_file_by_position(params: Dict[str, Any], directory: str) -> Tuple[float, int]:
+    import pandas as pd
+    import excel_processor
+
+    path = os.path.join(directory, 'position.xlsx')
+    rows = workbooks.write_position_workbook(
+        path, params['sheets'], params['rows'], params['dirty_rate'], params['total_rows']
+    )
+    seconds = _best_of(params['repeat'], lambda: excel_processor.process_excel_file_by_position(
+        pd.ExcelFile(path), excel_processor.DEFAULT_COLUMN_MAPPINGS
+    ))
+    return seconds, rows
+
+
+def bench_payroll_processor(params: Dict[str, Any], directory: str) -> Tuple[float, int]:
+    import payroll_processor
+
+    path = os.path.join(directory, 'payroll.xlsx')
+    rows = workbooks.write_payroll_workbook(path, params['rows'] * params['sheets'], params['dirty_rate'])
+    with open(path, 'rb') as f:
+        content = f.read()
+    seconds = _best_of(params['repeat'], lambda: payroll_processor.process_excel_file(content, datetime(2025, 2, 1)))
+    return seconds, rows
+
+
+def bench_calculate_bulk_payroll(params: Dict[str, Any], directory: str) -> Tuple[float, int]:
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from payroll_models import Base, Employee
+    from payroll_calculator import calculate_bulk_payroll
+
+    rows = params['rows'] * params['sheets']
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'bench.db')}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    session.bulk_save_objects([
+        Employee(employee_id=f"GO{10000 + index}", name=f"EMPLOYEE {index}", basic_rate=500.0 + index % 400)
+        for index in range(rows)
+    ])
+    session.commit()
+
+    data = workbooks.attendance_data(rows, datetime(2025, 2, 1))
+    try:
+        seconds = _best_of(params['repeat'], lambda: calculate_bulk_payroll(session, data))
+    finally:
+        session.close()
+    return seconds, rows
+
+
+BENCHMARKS = {
+    'process_excel_file_by_position': bench_process_excel_file_by_position,
+    'payroll_processor.process_excel_file': bench_payroll_processor,
+    'calculate_bulk_payroll': bench_calculate_bulk_payroll,
+}
+
+
+def _run_one(name: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as directory:
+        seconds, rows = BENCHMARKS[name](params, directory)
+    return {
+        'seconds': round(seconds, 4),
+        'rows': rows,
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def run_benchmarks(params: Dict[str, Any], names: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """Run each benchmark in a fresh process so peak RSS is measured per benchmark."""
+    results = {}
+    for name in names or list(BENCHMARKS):
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results[name] = executor.submit(_run_one, name, params).result()
+    return results
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def load_history(path: str) -> List[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)
+
+
+def previous_run(history: List[Dict[str, Any]], params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Most recent recorded run with the same workload parameters."""
+    for entry in reversed(history):
+        if entry['params'] == params:
+            return entry
+    return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmark Excel ingestion and payroll calculation")
+    parser.add_argument('--rows', type=int, default=1000, help="Employee rows per sheet")
+    parser.add_argument('--sheets', type=int, default=3, help="Sheets per workbook")
+    parser.add_argument('--dirty-rate', type=float, default=0.02, help="Share of numeric cells holding dirty text")
+    parser.add_argument('--no-total-rows', action='store_true', help="Do not append blank and grand total rows")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per benchmark; the best time is kept")
+    parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help="JSON file the results are appended to")
+    parser.add_argument('--label', default=None, help="Free text stored with the run")
+    args = parser.parse_args(argv)
+
+    params = {
+        'rows': args.rows,
+        'sheets': args.sheets,
+        'dirty_rate': args.dirty_rate,
+        'total_rows': not args.no_total_rows,
+        'repeat': args.repeat,
+    }
+    results = run_benchmarks(params, args.only)
+
+    history = load_history(args.history)
+    previous = previous_run(history, params)
+    for name, result in results.items():
+        line = (f"{name:40s} {result['seconds']:9.3f}s {result['rows_per_second'] or 0:12.1f} rows/s "
+                f"{result['peak_rss_mb']:8.1f} MB")
+        before = previous and previous['results'].get(name)
+        if before and before['seconds']:
+            change = (result['seconds'] - before['seconds']) / before['seconds'] * 100
+            line += f"  ({change:+.1f}% vs {previous.get('commit') or previous['timestamp']})"
+        print(line)
+
+    history.append({
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'label': args.label,
+        'python': sys.version.split()[0],
+        'params': params,
+        'results': results,
+    })
+    with open(args.history, 'w') as f:
+        json.dump(history, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""Synthetic workbooks for the ingestion benchmarks."""
+import random
+from datetime import datetime
+from typing import Any, Dict, List
+
+import xlsxwriter
+
+from excel_processor import DEFAULT_COLUMN_MAPPINGS
+
+# Header labels of the standard attendance workbook, in DEFAULT_COLUMN_MAPPINGS order
+POSITION_HEADERS = {
+    'employee_id': 'Card No',
+    'name': 'Name',
+    'attendance': 'Attendance',
+    'net_salary': 'Basic Rate',
+    'daily_allowance': 'Daily Allowance',
+    'nh_fh_days': 'NH/FH',
+    'ot_days': 'OT Days',
+    'uniform_deduction': 'Uniform',
+    'pt': 'PT',
+    'lwf_employee_bool': 'LWF40',
+    'lwf_employer_bool': 'LWF60',
+}
+
+# Columns and header names recognised by payroll_processor.PAYROLL_COLUMN_PATTERNS
+PAYROLL_HEADERS = ['Card No', 'Name', 'ESI No', 'UAN No', 'Basic', 'VDA', 'Allowance',
+                   'Bonus', 'OT Wages', 'PPE Cost', 'Uniform Deduction', 'PT']
+
+# The kinds of dirty cells seen in real uploads
+DIRTY_VALUES = ['₹ 1,250', 'Rs. 980', '1,100.50', 'abc', '-', '', 'N/A', ' 23 ']
+
+
+def _dirty(rng: random.Random, value: Any, dirty_rate: float) -> Any:
+    if dirty_rate and rng.random() < dirty_rate:
+        return rng.choice(DIRTY_VALUES)
+    return value
+
+
+def position_row(rng: random.Random, index: int, dirty_rate: float = 0.0) -> Dict[str, Any]:
+    """One employee row of the standard attendance workbook."""
+    values = {
+        'employee_id': f"GO{10000 + index}",
+        'name': f"EMPLOYEE {index}",
+        'attendance': round(rng.uniform(10, 26), 2),
+        'net_salary': float(rng.randint(400, 900)),
+        'daily_allowance': float(rng.choice([0, 0, 25, 50])),
+        'nh_fh_days': float(rng.randint(0, 3)),
+        'ot_days': float(rng.randint(0, 4)),
+        'uniform_deduction': float(rng.choice([0, 0, 100])),
+        'pt': 200.0,
+        'lwf_employee_bool': rng.choice([0, 1]),
+        'lwf_employer_bool': rng.choice([0, 1]),
+    }
+    for field in ('attendance', 'net_salary', 'daily_allowance', 'ot_days'):
+        values[field] = _dirty(rng, values[field], dirty_rate)
+    return values
+
+
+def write_position_workbook(
+    path: str,
+    sheets: int = 3,
+    rows: int = 500,
+    dirty_rate: float = 0.0,
+    total_rows: bool = True,
+    seed: int = 0
+) -> int:
+    """Write a multi-sheet workbook laid out for DEFAULT_COLUMN_MAPPINGS.
+
+    Every sheet gets ``rows`` employees, a share ``dirty_rate`` of numeric
+    cells replaced with dirty text, and (with ``total_rows``) a blank row and
+    a grand total row at the end. Returns the number of employee rows.
+    """
+    rng = random.Random(seed)
+    mapping = DEFAULT_COLUMN_MAPPINGS['default']
+    fields = sorted(mapping, key=mapping.get)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    try:
+        for sheet in range(sheets):
+            worksheet = workbook.add_worksheet(f"Company {sheet + 1}")
+            worksheet.write_row(0, 0, [POSITION_HEADERS[field] for field in fields])
+            total = 0.0
+            for index in range(rows):
+                values = position_row(rng, sheet * rows + index, dirty_rate)
+                worksheet.write_row(index + 1, 0, [values[field] for field in fields])
+                if isinstance(values['net_salary'], float):
+                    total += values['net_salary']
+            if total_rows:
+                worksheet.write_row(rows + 3, 0, ['', 'Grand Total', '', total])
+    finally:
+        workbook.close()
+    return sheets * rows
+
+
+def write_payroll_workbook(path: str, rows: int = 500, dirty_rate: float = 0.0, seed: int = 0) -> int:
+    """Write a single-sheet salary statement as read by payroll_processor.process_excel_file.
+
+    The sheet starts with title rows, as real statements do, so header
+    detection is exercised too. Returns the number of employee rows.
+    """
+    rng = random.Random(seed)
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    try:
+        worksheet = workbook.add_worksheet('Salary')
+        worksheet.write_row(0, 0, ['ACME SERVICES PVT LTD'])
+        worksheet.write_row(1, 0, ['Salary statement'])
+        worksheet.write_row(3, 0, PAYROLL_HEADERS)
+        for index in range(rows):
+            basic = float(rng.randint(8000, 20000))
+            values = [
+                f"GO{10000 + index}", f"EMPLOYEE {index}", f"ESI{index:07d}", f"UAN{index:09d}",
+                basic, round(basic * 0.1, 2), float(rng.choice([0, 500, 1000])), float(rng.choice([0, 800])),
+                float(rng.randint(0, 2000)), 0.0, float(rng.choice([0, 100])), 200.0,
+            ]
+            for column in (4, 6, 8):
+                values[column] = _dirty(rng, values[column], dirty_rate)
+            worksheet.write_row(index + 4, 0, values)
+    finally:
+        workbook.close()
+    return rows
+
+
+def attendance_data(rows: int, month: datetime, seed: int = 0) -> List[Dict[str, Any]]:
+    """Attendance records for calculate_bulk_payroll, for employees GO10000..."""
+    rng = random.Random(seed)
+    return [
+        {
+            'employee_id': f"GO{10000 + index}",
+            'month': month,
+            'days_worked': rng.randint(10, 26),
+            'ot_hours': float(rng.randint(0, 16)),
+            'allowance': float(rng.choice([0, 500])),
+            'uniform': float(rng.choice([0, 100])),
+        }
+        for index in range(rows)
+    ]
@@ -0,0 +1,118 @@
+import datetime
+import pandas as pd
+import numpy as np
+from typing import Collection, Dict, List, Optional, Tuple
+
+# Currency markers, thousands separators and whitespace that may surround a number
+NOISE_PATTERN = r'(?i)₹|\brs\.?|\binr\b|,|\s'
+
+# First signed decimal number left in the cell once the noise is removed
+NUMBER_PATTERN = r'(-?\d+(?:\.\d+)?|-?\.\d+)'
+
+# Accounting negative: the whole (cleaned) cell in parentheses, e.g. "(500)"
+PARENTHESIZED_PATTERN = r'^\((.*)\)$'
+
+# A cell holding one number and nothing else, for strict columns
+STRICT_PATTERN = r'^\s*(?:-?\d+(?:\.\d+)?|-?\.\d+|\((?:\d+(?:\.\d+)?|\.\d+)\))\s*$'
+
+
+def clean_numeric(
+    series: pd.Series,
+    default: Optional[float] = 0.0,
+    strict: bool = False
+) -> Tuple[pd.Series, pd.Series]:
+    """Coerce a column of raw Excel cell values to floats.
+
+    Cells that are already numeric are converted directly with ``pd.to_numeric``.
+    Only the remaining text cells go through the regex cleaning, which strips
+    rupee signs, "Rs"/"INR" prefixes and thousands separators and keeps the
+    first number found in any stray text (e.g. "22 days" -> 22.0). A cell in
+    parentheses is an accounting negative ("(500)" -> -500.0). Date and time
+    cells are invalid rather than read as their year.
+
+    Args:
+        series: Column of raw cell values
+        default: Value used for blank and invalid cells, or None to keep NaN
+        strict: For day counts and flags, where a currency sign, a range such as
+            "12-15" or any other text means the cell is wrong: text cells must
+            hold exactly one number, or they are invalid
+
+    Returns:
+        Tuple of (float values, mask of non-blank cells that held no number)
+    """
+    blank = series.isna()
+    if pd.api.types.is_datetime64_any_dtype(series) or pd.api.types.is_timedelta64_dtype(series):
+        # A whole column of dates would otherwise become nanosecond counts
+        values = pd.Series(np.nan, index=series.index)
+        invalid = ~blank
+        return (values.fillna(default) if default is not None else values), invalid
+
+    values = pd.to_numeric(series, errors='coerce')
+    if values.dtype != float:
+        values = values.astype(float)
+
+    text = series.astype(str).str.strip()
+    blank = blank | text.eq('')
+    # Dates typed into a numeric column; their text starts with the year
+    dates = series.map(lambda value: isinstance(value, (datetime.date, datetime.time, datetime.timedelta)))
+
+    pending = values.isna() & ~blank & ~dates
+    if pending.any():
+        if strict:
+            cleaned = text[pending].where(text[pending].str.match(STRICT_PATTERN))
+        else:
+            cleaned = text[pending].str.replace(NOISE_PATTERN, '', regex=True)
+        negative = cleaned.str.match(PARENTHESIZED_PATTERN, na=False)
+        extracted = pd.to_numeric(cleaned.str.extract(NUMBER_PATTERN, expand=False), errors='coerce')
+        extracted[negative] = -extracted[negative].abs()
+        values[pending] = extracted
+
+    invalid = values.isna() & ~blank
+    if default is not None:
+        values = values.fillna(default)
+    return values, invalid
+
+
+def coerce_columns(
+    df: pd.DataFrame,
+    column_indices: Dict[str, int],
+    defaults: Dict[str, Optional[float]],
+    strict_fields: Collection[str] = ()
+) -> Tuple[Dict[str, np.ndarray], Dict[str, pd.Series]]:
+    """Coerce the mapped numeric columns of a sheet in one pass per column.
+
+    Args:
+        df: DataFrame containing the Excel sheet data
+        column_indices: Field name to 0-based column index
+        defaults: Numeric fields to coerce, with the value used for blank/invalid cells
+        strict_fields: Fields coerced with ``strict=True`` (see clean_numeric)
+
+    Returns:
+        Tuple of (field -> float array aligned with df rows, field -> invalid cell mask)
+    """
+    values = {}
+    invalid = {}
+    for field, default in defaults.items():
+        index = column_indices.get(field)
+        if index is None or index >= len(df.columns):
+            fill = np.nan if default is None else default
+            values[field] = np.full(len(df), fill, dtype=float)
+            invalid[field] = pd.Series(False, index=df.index)
+            continue
+
+        column_values, column_invalid = clean_numeric(df.iloc[:, index], default, strict=field in strict_fields)
+        values[field] = column_values.to_numpy()
+        invalid[field] = column_invalid
+    return values, invalid
+
+
+def invalid_cell_report(invalid: Dict[str, pd.Series]) -> Dict[str, List[int]]:
+    """Summarize invalid cell masks as 1-based row numbers per field.
+
+    Only fields with at least one invalid cell are included.
+    """
+    report = {}
+    for field, mask in invalid.items():
+        if mask.any():
+            report[field] = [int(idx) + 1 for idx in mask.index[mask.to_numpy()]]
+    return report
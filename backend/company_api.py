@@ -1,16 +1,76 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import date, datetime
 import pandas as pd
 import uuid
+from types import SimpleNamespace
 
 from .database import get_db
 from .updated_payroll_models import Company, Employee, AttendanceRecord, PayrollEntry
 from .company_auth import get_current_company_id, get_company_filter, admin_required, TokenData
+from .payslips import generate_payslips, payslip_context, stream_zip
+from .payroll_periods import period_snapshots, PeriodClosedError, SnapshotChecksumError
+from .company_context import stamp_company_id
 
 router = APIRouter()
 
+# Query shapes of the list endpoints; benchmarks/query_plans.py checks each
+# of them against the indexes with EXPLAIN
+def employees_query(db: Session, company_filter):
+    return db.query(Employee).filter(company_filter(Employee))
+
+def attendance_query(
+    db: Session,
+    company_filter,
+    month: Optional[date] = None,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    employee_id: Optional[str] = None
+):
+    query = db.query(AttendanceRecord).filter(company_filter(AttendanceRecord))
+    
+    if month:
+        query = query.filter(AttendanceRecord.month == month)
+    if start_month:
+        query = query.filter(AttendanceRecord.month >= start_month)
+    if end_month:
+        query = query.filter(AttendanceRecord.month <= end_month)
+    
+    if employee_id:
+        query = query.filter(AttendanceRecord.employee_id == employee_id)
+    
+    return query
+
+def payroll_query(
+    db: Session,
+    company_filter,
+    month: Optional[date] = None,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
+    employee_id: Optional[str] = None
+):
+    query = db.query(PayrollEntry).filter(company_filter(PayrollEntry))
+    
+    if month:
+        query = query.filter(PayrollEntry.report_month == month)
+    if start_month:
+        query = query.filter(PayrollEntry.report_month >= start_month)
+    if end_month:
+        query = query.filter(PayrollEntry.report_month <= end_month)
+    
+    if employee_id:
+        query = query.filter(PayrollEntry.employee_id == employee_id)
+    
+    return query
+
+def payslip_entries_query(db: Session, company_id: str, month: date):
+    return db.query(PayrollEntry).filter(
+        PayrollEntry.company_id == company_id,
+        PayrollEntry.report_month == month
+    ).order_by(PayrollEntry.employee_id)
+
 # Company management endpoints (admin only)
 @router.get("/companies", response_model=List[dict])
 async def get_all_companies(
@@ -55,7 +115,7 @@ async def get_employees(
     company_filter = Depends(get_company_filter)
 ):
     """Get all employees for the current company"""
-    employees = db.query(Employee).filter(company_filter(Employee)).all()
+    employees = employees_query(db, company_filter).all()
     return [employee.to_dict() for employee in employees]
 
 @router.post("/employees", response_model=dict)
@@ -95,20 +155,14 @@ async def create_employee(
 @router.get("/attendance", response_model=List[dict])
 async def get_attendance_records(
     month: Optional[date] = None,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
     employee_id: Optional[str] = None,
     db: Session = Depends(get_db),
     company_filter = Depends(get_company_filter)
 ):
-    """Get attendance records for the current company, optionally filtered by month and employee"""
-    query = db.query(AttendanceRecord).filter(company_filter(AttendanceRecord))
-    
-    if month:
-        query = query.filter(AttendanceRecord.month == month)
-    
-    if employee_id:
-        query = query.filter(AttendanceRecord.employee_id == employee_id)
-    
-    records = query.all()
+    """Get attendance records for the current company, optionally filtered by month (or an inclusive month range) and employee"""
+    records = attendance_query(db, company_filter, month, start_month, end_month, employee_id).all()
     return [record.to_dict() for record in records]
 
 @router.post("/attendance", response_model=dict)
@@ -163,22 +217,98 @@ async def create_attendance_record(
 @router.get("/payroll", response_model=List[dict])
 async def get_payroll_entries(
     month: Optional[date] = None,
+    start_month: Optional[date] = None,
+    end_month: Optional[date] = None,
     employee_id: Optional[str] = None,
     db: Session = Depends(get_db),
-    company_filter = Depends(get_company_filter)
+    company_filter = Depends(get_company_filter),
+    company_id: str = Depends(get_current_company_id)
 ):
-    """Get payroll entries for the current company, optionally filtered by month and employee"""
-    query = db.query(PayrollEntry).filter(company_filter(PayrollEntry))
-    
-    if month:
-        query = query.filter(PayrollEntry.report_month == month)
-    
-    if employee_id:
-        query = query.filter(PayrollEntry.employee_id == employee_id)
-    
-    entries = query.all()
+    """Get payroll entries for the current company, optionally filtered by month (or an inclusive month range) and employee"""
+    # A closed month is served from its snapshot
+    if month and not start_month and not end_month:
+        rows = closed_period_rows(db, company_id, month)
+        if rows is not None:
+            return [row for row in rows if not employee_id or row["employee_id"] == employee_id]
+
+    entries = payroll_query(db, company_filter, month, start_month, end_month, employee_id).all()
     return [entry.to_dict() for entry in entries]
 
+@router.get("/payroll/payslips")
+async def download_payslips(
+    month: date,
+    db: Session = Depends(get_db),
+    company_id: str = Depends(get_current_company_id)
+):
+    """Download the payslips of the current company for a month as a ZIP of HTML files"""
+    rows = closed_period_rows(db, company_id, month)
+    if rows is not None:
+        entries = [SimpleNamespace(**{**row, "report_month": month}) for row in rows]
+    else:
+        entries = payslip_entries_query(db, company_id, month).all()
+    if not entries:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No payroll entries found for this month"
+        )
+
+    company = db.query(Company).filter(Company.id == company_id).first()
+    contexts = [payslip_context(entry, company.name if company else "") for entry in entries]
+    return StreamingResponse(
+        stream_zip(generate_payslips(contexts)),
+        media_type="application/zip",
+        headers={"Content-Disposition": f"attachment; filename=payslips_{month.strftime('%Y_%m')}.zip"}
+    )
+
+def closed_period_rows(db: Session, company_id: str, month: date):
+    """Entries of a closed month from its snapshot, or None if the month is open."""
+    try:
+        return period_snapshots.rows(db, company_id, month)
+    except SnapshotChecksumError as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+# Payroll period endpoints: closing a month freezes its entries into a snapshot
+@router.get("/payroll/periods", response_model=List[dict])
+async def get_payroll_periods(
+    db: Session = Depends(get_db),
+    company_id: str = Depends(get_current_company_id)
+):
+    """Get the closed and reopened payroll periods of the current company, with the totals of closed ones"""
+    return [period.to_dict() for period in period_snapshots.list_periods(db, company_id)]
+
+@router.post("/payroll/periods/{month}/close", response_model=dict)
+async def close_payroll_period(
+    month: date,
+    db: Session = Depends(get_db),
+    company_id: str = Depends(get_current_company_id)
+):
+    """Close a payroll month of the current company, freezing its entries"""
+    try:
+        period = period_snapshots.close(db, company_id, month)
+    except PeriodClosedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+    return period.to_dict()
+
+@router.post("/payroll/periods/{month}/reopen", response_model=dict)
+async def reopen_payroll_period(
+    month: date,
+    db: Session = Depends(get_db),
+    company_id: str = Depends(get_current_company_id)
+):
+    """Reopen a closed payroll month of the current company, dropping its snapshot"""
+    period = period_snapshots.reopen(db, company_id, month)
+    if period is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payroll period has not been closed"
+        )
+    return period.to_dict()
+
 # Excel upload endpoint with company isolation
 @router.post("/upload-excel", response_model=dict)
 async def upload_excel(
@@ -191,6 +321,8 @@ async def upload_excel(
     try:
         # Parse report month
         month_date = datetime.strptime(report_month, "%Y-%m-%d").date()
+        if period_snapshots.is_closed(db, company_id, month_date):
+            raise PeriodClosedError("Payroll period is closed; reopen it before uploading")
         
         # Read Excel file
         df = pd.read_excel(file.file)
@@ -198,50 +330,51 @@ async def upload_excel(
         # Process the data (simplified example)
         # In a real implementation, you would have more complex logic here
         
-        # Create payroll entries for each row
-        entries_created = 0
+        # Look up the company's employees once; new employees and the payroll
+        # entries are then inserted in bulk
+        known_employees = {
+            employee_id for (employee_id,) in
+            db.query(Employee.employee_id).filter(Employee.company_id == company_id)
+        }
+        new_employees = []
+        entries = []
         for _, row in df.iterrows():
             # Extract employee data
             employee_id = str(row.get('employee_id', ''))
             name = str(row.get('name', ''))
             days_worked = float(row.get('days_worked', 0))
             
-            # Check if employee exists, create if not
-            employee = db.query(Employee).filter(
-                Employee.company_id == company_id,
-                Employee.employee_id == employee_id
-            ).first()
-            
-            if not employee and employee_id and name:
-                employee = Employee(
-                    company_id=company_id,
-                    employee_id=employee_id,
-                    name=name,
-                    basic_rate=0.0  # Default value, update as needed
-                )
-                db.add(employee)
-                db.commit()
+            # Create the employee if it does not exist yet
+            if employee_id not in known_employees and employee_id and name:
+                new_employees.append({
+                    'employee_id': employee_id,
+                    'name': name,
+                    'basic_rate': 0.0  # Default value, update as needed
+                })
+                known_employees.add(employee_id)
             
-            if employee:
-                # Create payroll entry
-                entry = PayrollEntry(
-                    company_id=company_id,
-                    employee_id=employee_id,
-                    name=name,
-                    report_month=month_date,
-                    days_worked=days_worked,
+            if employee_id in known_employees:
+                entries.append({
+                    'employee_id': employee_id,
+                    'name': name,
+                    'report_month': month_date,
+                    'days_worked': days_worked,
                     # Add other fields as needed
-                )
-                db.add(entry)
-                entries_created += 1
+                })
         
+        # Bulk inserts skip the flush hook that stamps company_id
+        db.bulk_insert_mappings(Employee, stamp_company_id(new_employees, Employee, company_id))
+        db.bulk_insert_mappings(PayrollEntry, stamp_company_id(entries, PayrollEntry, company_id))
         db.commit()
+        entries_created = len(entries)
         
         return {
             "message": "Excel file processed successfully",
             "entries_created": entries_created
         }
     
+    except PeriodClosedError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
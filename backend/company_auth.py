@@ -4,15 +4,20 @@
 from jose import JWTError, jwt
 from typing import Optional
 from datetime import datetime, timedelta
+from functools import lru_cache
 import os
+import time
 
 from .database import get_db
 from .updated_payroll_models import Company, Employee
+from .company_context import get_current_token_payload
 
 # JWT configuration
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Decoded tokens kept per worker; a token is reused for every request of a session
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "4096"))
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
@@ -33,23 +38,44 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
+@lru_cache(maxsize=TOKEN_CACHE_SIZE)
+def _decode_token(token: str) -> Optional[dict]:
+    try:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        return None
+
+def decode_access_token(token: str) -> Optional[dict]:
+    """Decode and verify an access token; None when invalid or expired.
+
+    Decoding is cached per token, so expiry is checked again on every call.
+    The returned payload is shared between calls and must not be modified.
+    """
+    payload = _decode_token(token)
+    if payload is None:
+        return None
+    expire = payload.get("exp")
+    if expire is not None and expire <= time.time():
+        return None
+    return payload
+
 async def get_current_user_token(token: str = Depends(oauth2_scheme)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: str = payload.get("sub")
-        company_id: str = payload.get("company_id")
-        role: str = payload.get("role", "user")
-        if user_id is None:
-            raise credentials_exception
-        token_data = TokenData(user_id=user_id, company_id=company_id, role=role)
-        return token_data
-    except JWTError:
+    # CompanyContextMiddleware has already decoded the token of this request
+    payload = get_current_token_payload() or decode_access_token(token)
+    if payload is None:
         raise credentials_exception
+    user_id: str = payload.get("sub")
+    company_id: str = payload.get("company_id")
+    role: str = payload.get("role", "user")
+    if user_id is None:
+        raise credentials_exception
+    token_data = TokenData(user_id=user_id, company_id=company_id, role=role)
+    return token_data
 
 async def get_current_company_id(token_data: TokenData = Depends(get_current_user_token)):
     if not token_data.company_id:
@@ -1,11 +1,13 @@
 from sqlalchemy import event
-from sqlalchemy.orm import Session
 from contextvars import ContextVar
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
 # Context variable to store the current company ID
 current_company_id: ContextVar[Optional[str]] = ContextVar('current_company_id', default=None)
 
+# Decoded access token of the current request, set by CompanyContextMiddleware
+current_token_payload: ContextVar[Optional[Dict[str, Any]]] = ContextVar('current_token_payload', default=None)
+
 def set_current_company_id(company_id: str):
     """Set the current company ID in the context"""
     current_company_id.set(company_id)
@@ -18,66 +20,140 @@ def clear_current_company_id():
     """Clear the current company ID from the context"""
     current_company_id.set(None)
 
+def get_current_token_payload() -> Optional[Dict[str, Any]]:
+    """Get the decoded access token of the current request (treat as read-only)"""
+    return current_token_payload.get()
+
 # Models that should have company_id automatically set
 company_models = []
 
+# Exact classes stamped on flush, so the per-object check is one set lookup;
+# subclasses of registered models are added the first time they are seen
+_stamped_types = set()
+_unstamped_types = set()
+
 def register_company_model(model_class):
     """Register a model to have company_id automatically set"""
     company_models.append(model_class)
+    _stamped_types.add(model_class)
+    _unstamped_types.clear()
     return model_class
 
-# SQLAlchemy event listeners to automatically set company_id
-@event.listens_for(Session, 'before_flush')
+def is_company_model(cls) -> bool:
+    """Whether instances of ``cls`` get company_id stamped"""
+    if cls in _stamped_types:
+        return True
+    if cls in _unstamped_types:
+        return False
+    if any(issubclass(cls, model) for model in company_models):
+        _stamped_types.add(cls)
+        return True
+    _unstamped_types.add(cls)
+    return False
+
 def set_company_id_before_flush(session, flush_context, instances):
     company_id = get_current_company_id_from_context()
     if company_id is None:
         return
-    
+
     # Set company_id on all new objects of registered models
     for obj in session.new:
-        if any(isinstance(obj, model) for model in company_models):
-            if hasattr(obj, 'company_id') and obj.company_id is None:
-                obj.company_id = company_id
+        if is_company_model(type(obj)) and obj.company_id is None:
+            obj.company_id = company_id
+
+def enable_tenant_stamping(target):
+    """Stamp company_id on new objects flushed by ``target``.
+
+    ``target`` is a sessionmaker, a Session subclass or a single Session;
+    sessions that did not opt in pay nothing on flush.
+    """
+    if not event.contains(target, 'before_flush', set_company_id_before_flush):
+        event.listen(target, 'before_flush', set_company_id_before_flush)
+    return target
+
+def stamp_company_id(rows, model_class=None, company_id: Optional[str] = None):
+    """Fill in company_id for bulk inserts, which bypass flush events.
+
+    ``rows`` are model instances (for Session.bulk_save_objects) or, with
+    ``model_class``, dicts (for Session.bulk_insert_mappings). Rows that
+    already have a company_id are left alone.
+    """
+    company_id = company_id or get_current_company_id_from_context()
+    if company_id is None:
+        return rows
+    if model_class is not None:
+        if is_company_model(model_class):
+            for row in rows:
+                if row.get('company_id') is None:
+                    row['company_id'] = company_id
+        return rows
+    for row in rows:
+        if is_company_model(type(row)) and row.company_id is None:
+            row.company_id = company_id
+    return rows
+
+# Routes served without a tenant: auth, health, docs and metrics (anything
+# outside /api is static files)
+PUBLIC_PATHS = frozenset({
+    "/api/token", "/api/health", "/api/docs", "/api/redoc", "/api/openapi.json", "/api/metrics",
+})
 
 # FastAPI middleware to set and clear company_id
 class CompanyContextMiddleware:
-    def __init__(self, app):
+    """Pure ASGI middleware binding the tenant of the bearer token to the request.
+
+    The token is decoded once per request with ``decode_token`` (which
+    returns the payload, or None for an invalid token, and may cache), and
+    both the payload and its company_id are put in context variables, so
+    dependencies read them instead of decoding again.
+    """
+
+    def __init__(self, app, decode_token: Callable[[str], Optional[Dict[str, Any]]], public_paths=PUBLIC_PATHS):
         self.app = app
-    
+        self.decode_token = decode_token
+        self.public_paths = public_paths
+
     async def __call__(self, scope, receive, send):
-        # Extract company_id from request (e.g., from JWT token)
-        # This is a simplified example - in a real app, you would extract it from the token
-        company_id = None
-        if scope["type"] == "http":
-            # In a real implementation, you would extract the token from headers
-            # and decode it to get the company_id
-            # For now, we'll just use a placeholder
-            company_id = "placeholder_company_id"
-        
-        # Set company_id in context if available
-        if company_id:
-            set_current_company_id(company_id)
-        
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if not path.startswith("/api/") or path in self.public_paths:
+            await self.app(scope, receive, send)
+            return
+
+        # Scan the raw header list for Authorization; no header dict is built
+        payload = None
+        for key, value in scope["headers"]:
+            if key == b"authorization":
+                if value[:7].lower() == b"bearer ":
+                    payload = self.decode_token(value[7:].decode("latin-1"))
+                break
+
+        company_token = current_company_id.set(payload.get("company_id") if payload else None)
+        payload_token = current_token_payload.set(payload)
         try:
-            # Process the request
             await self.app(scope, receive, send)
         finally:
-            # Clear company_id from context
-            clear_current_company_id()
+            current_token_payload.reset(payload_token)
+            current_company_id.reset(company_token)
 
 # Example usage in FastAPI app:
 """
 from fastapi import FastAPI
-from .company_context import CompanyContextMiddleware, register_company_model
+from .company_auth import decode_access_token
+from .company_context import CompanyContextMiddleware, register_company_model, enable_tenant_stamping
+from .database import SessionLocal
 from .updated_payroll_models import Employee, AttendanceRecord, PayrollEntry
 
 app = FastAPI()
 
 # Add middleware
-app.add_middleware(CompanyContextMiddleware)
+app.add_middleware(CompanyContextMiddleware, decode_token=decode_access_token)
 
-# Register models
+# Register models and opt the app's sessions in to company_id stamping
 register_company_model(Employee)
 register_company_model(AttendanceRecord)
 register_company_model(PayrollEntry)
+enable_tenant_stamping(SessionLocal)
 """
@@ -1,14 +1,15 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
-# SQLite for development, can be changed to PostgreSQL/MySQL for production
-SQLALCHEMY_DATABASE_URL = "sqlite:///./payroll.db"
+# SQLite for development; set DATABASE_URL for PostgreSQL/MySQL in production
+SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./payroll.db")
 
-# Create engine
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+# Create engine (check_same_thread only applies to SQLite)
+connect_args = {"check_same_thread": False} if SQLALCHEMY_DATABASE_URL.startswith("sqlite") else {}
+engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args=connect_args)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
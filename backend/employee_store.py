@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional
+
+# Compatibility fields that normally repeat another field of the same employee
+FIELD_ALIASES = {
+    'basic_rate': 'daily_salary',
+    'earned_wage': 'monthly_salary',
+    'basic': 'monthly_salary',
+    'gross_salary': 'total_b',
+    'net_salary': 'bank_transfer',
+    'overtime_hours': 'ot_days',
+}
+
+_MISSING = object()
+
+
+def _build_column(values: List[Any]):
+    """Pick the most compact representation for one field of every record.
+
+    Returns a tuple of (kind, data) where kind is 'constant', 'numeric',
+    'category' or 'object'.
+    """
+    first = values[0]
+    if all(value is first or (type(value) is type(first) and value == first) for value in values):
+        return 'constant', first
+
+    if all(isinstance(value, bool) for value in values):
+        return 'numeric', np.array(values, dtype=bool)
+    if all(isinstance(value, (int, np.integer)) and not isinstance(value, bool) for value in values):
+        return 'numeric', np.array(values, dtype=np.int64)
+    if all(isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool) for value in values):
+        return 'numeric', np.array(values, dtype=np.float64)
+    if all(isinstance(value, str) for value in values):
+        return 'category', pd.Categorical(values)
+    return 'object', np.array(values, dtype=object)
+
+
+class EmployeeTable:
+    """Columnar, typed storage for the processed employees of one company.
+
+    Numeric fields are NumPy arrays, text fields (name, employee_id, ...)
+    are categoricals, fields with a single value are stored once, and the
+    compatibility aliases (``basic_rate``, ``net_salary``, ...) are views of
+    the field they repeat. Records are only rendered as dicts for the page
+    being returned.
+    """
+
+    def __init__(self, fields: List[str], columns: Dict[str, tuple], aliases: Dict[str, str], length: int):
+        self.fields = fields
+        self.columns = columns
+        self.aliases = aliases
+        self.length = length
+
+    @classmethod
+    def from_records(cls, records: List[Dict[str, Any]]) -> 'EmployeeTable':
+        """Build a table from employee dictionaries as produced by excel_processor."""
+        fields: List[str] = []
+        for record in records:
+            for field in record:
+                if field not in fields:
+                    fields.append(field)
+
+        columns: Dict[str, tuple] = {}
+        aliases: Dict[str, str] = {}
+        for field in fields:
+            values = [record.get(field, _MISSING) for record in records]
+            if any(value is _MISSING for value in values):
+                columns[field] = ('object', np.array([None if value is _MISSING else value for value in values], dtype=object))
+                continue
+            kind, data = _build_column(values)
+
+            # Alias fields become views only while they still repeat their source
+            source = FIELD_ALIASES.get(field)
+            if source in columns and columns[source][0] == kind:
+                source_data = columns[source][1]
+                if kind == 'numeric' and np.array_equal(data, source_data):
+                    aliases[field] = source
+                    continue
+                if kind == 'constant' and data == source_data:
+                    aliases[field] = source
+                    continue
+            columns[field] = (kind, data)
+
+        return cls(fields, columns, aliases, len(records))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def column(self, field: str) -> np.ndarray:
+        """Values of one field for every employee (a view for aliases and numeric fields)."""
+        kind, data = self.columns[self.aliases.get(field, field)]
+        if kind == 'constant':
+            return np.full(self.length, data, dtype=object if isinstance(data, str) else None)
+        if kind == 'category':
+            return np.asarray(data)
+        return data
+
+    def sum(self, field: str) -> float:
+        """Sum of a numeric field without rendering any records."""
+        kind, data = self.columns[self.aliases.get(field, field)]
+        if kind == 'constant':
+            return data * self.length
+        return data.sum().item()
+
+    def _page_values(self, field: str, start: int, stop: int) -> List[Any]:
+        kind, data = self.columns[self.aliases.get(field, field)]
+        if kind == 'constant':
+            return [data] * (stop - start)
+        if kind == 'category':
+            return list(data[start:stop])
+        return data[start:stop].tolist()
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Render the employees in [start, stop) as dictionaries."""
+        stop = self.length if stop is None else min(stop, self.length)
+        start = max(0, min(start, stop))
+        page = [self._page_values(field, start, stop) for field in self.fields]
+        return [dict(zip(self.fields, row)) for row in zip(*page)]
+
+    def iter_records(self, batch_size: int = 1000) -> Iterator[Dict[str, Any]]:
+        """Yield every employee as a dictionary, rendering one batch at a time."""
+        for start in range(0, self.length, batch_size):
+            yield from self.records(start, start + batch_size)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the column data."""
+        total = 0
+        for kind, data in self.columns.values():
+            if kind == 'numeric' or kind == 'object':
+                total += data.nbytes
+            elif kind == 'category':
+                total += data.codes.nbytes + sum(len(str(value)) for value in data.categories)
+        return total
+
+
+class DataStore:
+    """In-memory storage of the latest processed employees per company."""
+
+    def __init__(self):
+        self.companies: Dict[str, EmployeeTable] = {}
+
+    def set_company(self, company_name: str, employees: List[Dict[str, Any]]):
+        """Replace the stored employees of a company."""
+        if employees:
+            self.companies[company_name] = EmployeeTable.from_records(employees)
+        else:
+            self.companies.pop(company_name, None)
+
+    def employees(self, company_name: Optional[str] = None, skip: int = 0, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Render a page of employees for one company or across all companies."""
+        tables = [self.companies[company_name]] if company_name else list(self.companies.values())
+        page = []
+        for table in tables:
+            if limit is not None and len(page) >= limit:
+                break
+            if skip >= len(table):
+                skip -= len(table)
+                continue
+            stop = None if limit is None else skip + (limit - len(page))
+            page.extend(table.records(skip, stop))
+            skip = 0
+        return page
+
+    def clear(self):
+        """Remove all stored companies."""
+        self.companies.clear()
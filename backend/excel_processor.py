@@ -1,20 +1,71 @@
 import pandas as pd
-from typing import Dict, List, Any
-import sys
+from typing import Callable, Dict, List, Any, Optional
 import json
+import hashlib
+import logging
+import time
+
+from column_coercion import coerce_columns, invalid_cell_report
+from row_classifier import classify_rows, dropped_row_report
+from header_detection import HeaderMatcher
+import pipeline_metrics
+
+# Per-row details are logged at DEBUG; upload traces keep them (see log_utils)
+logger = logging.getLogger(__name__)
+
+# Numeric input fields read from the sheet, with the value used for blank or invalid cells
+NUMERIC_INPUT_DEFAULTS = {
+    'net_salary': 0.0,
+    'attendance': 26.0,
+    'daily_allowance': 0.0,
+    'nh_fh_days': 0.0,
+    'ot_days': 0.0,
+    'uniform_deduction': 0.0,
+    'pt': 0.0,
+    'lwf_employee_bool': 0.0,
+    'lwf_employer_bool': 0.0,
+}
+
+# Day counts and flags without a range check: stray text makes the cell invalid
+# instead of yielding the first number in it
+STRICT_NUMERIC_FIELDS = frozenset({'nh_fh_days', 'ot_days', 'lwf_employee_bool', 'lwf_employer_bool'})
+
+# Column names of the standard attendance workbook, so repeated header rows
+# can be told apart from employee rows (see row_classifier.classify_rows)
+POSITION_HEADER_PATTERNS = {
+    'employee_id': ['card no', 'emp id', 'employee id', 'emp no', 'employee no', 'employee number', 'id'],
+    'name': ['name', 'employee name', 'emp name', 'full name'],
+    'attendance': ['attendance', 'attendance days', 'days', 'days worked', 'present days', 'total days'],
+    'net_salary': ['basic rate', 'basic', 'rate', 'daily rate', 'salary', 'net salary'],
+    'daily_allowance': ['daily allowance', 'allowance', 'da'],
+    'nh_fh_days': ['nh fh', 'nh fh days', 'nh', 'fh', 'holidays'],
+    'ot_days': ['ot days', 'ot', 'overtime', 'ot hours'],
+    'uniform_deduction': ['uniform', 'uniform deduction'],
+    'pt': ['pt', 'professional tax'],
+    'lwf_employee_bool': ['lwf40', 'lwf 40', 'lwf employee'],
+    'lwf_employer_bool': ['lwf60', 'lwf 60', 'lwf employer'],
+}
+POSITION_HEADER_MATCHER = HeaderMatcher(POSITION_HEADER_PATTERNS)
+
+# Default position mapping for all sheets, based on the standard attendance workbook
+DEFAULT_COLUMN_MAPPINGS = {
+    'default': {
+        'employee_id': 0,        # Column 1 - Card No (GO1529)
+        'name': 1,               # Column 2 - Name (ASHOK KUMAR N V)
+        'attendance': 2,         # Column 3 - Total days attended (22.0)
+        'net_salary': 3,         # Column 4 - Basic Rate (daily salary)
+        'daily_allowance': 4,    # Column 5 - Daily Allowance
+        'nh_fh_days': 5,         # Column 6 - NH/FH days
+        'ot_days': 6,            # Column 7 - OT days
+        'uniform_deduction': 7,  # Column 8 - Uniform Deduction
+        'pt': 8,                 # Column 9 - Professional Tax (PT)
+        'lwf_employee_bool': 9,  # Column 10 - LWF40 (boolean)
+        'lwf_employer_bool': 10  # Column 11 - LWF60 (boolean)
+    }
+}
 
-# Fix for LogCapture issue
-class LogCapture:
-    def __init__(self):
-        self.original_stdout = sys.stdout
-
-    def write(self, message, end=''):
-        self.original_stdout.write(message)
-        if end:
-            self.original_stdout.write(end)
-
-    def flush(self):
-        self.original_stdout.flush()
+# Bump when the payroll formulas change so delta uploads recompute every row
+CALCULATION_VERSION = '1'
 
 
 def get_column_index(column_identifier) -> int:
@@ -37,10 +88,82 @@ def get_column_index(column_identifier) -> int:
     else:
         raise ValueError(f"Unsupported column identifier type: {type(column_identifier)}")
 
+def resolve_column_mappings(column_mappings: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, int]]:
+    """Convert every column identifier in a set of sheet mappings to a 0-based index.
+
+    Resolving once per upload (or once per saved mapping) avoids repeating the
+    letter conversion for every sheet.
+
+    Args:
+        column_mappings: Dictionary mapping company names to column letters or indices
+
+    Returns:
+        The same mappings with integer column indices
+    """
+    resolved = {}
+    for sheet_name, mapping in column_mappings.items():
+        if not isinstance(mapping, dict):
+            raise ValueError(f"Column mapping for {sheet_name} must be an object of field -> column")
+        resolved_mapping = {}
+        for field, column_identifier in mapping.items():
+            if isinstance(column_identifier, str) and not column_identifier.isalpha():
+                raise ValueError(f"Invalid column letter for {sheet_name}.{field}: {column_identifier!r}")
+            try:
+                resolved_mapping[field] = get_column_index(column_identifier)
+            except Exception as e:
+                raise ValueError(f"Error converting column identifier for {sheet_name}.{field}: {str(e)}")
+        resolved[sheet_name] = resolved_mapping
+    return resolved
+
+def _text_column(df: pd.DataFrame, column_index: Optional[int]) -> List[str]:
+    """Stripped text of one column ('' for blank cells or a column outside the sheet)."""
+    if column_index is None or column_index >= len(df.columns):
+        return [''] * len(df)
+    column = df.iloc[:, column_index]
+    return column.where(column.notna(), '').astype(str).str.strip().tolist()
+
+
+def row_input_hashes(
+    df: pd.DataFrame,
+    column_indices: Dict[str, int],
+    numeric_values: Dict[str, Any]
+) -> List[str]:
+    """Hash each row's payroll inputs: ID, name, rate, attendance, allowance,
+    NH/FH and OT days, deductions and LWF flags, plus CALCULATION_VERSION.
+
+    Two rows with the same hash produce the same employee record, which is
+    what lets a delta upload reuse results from the previous upload.
+    """
+    ids = _text_column(df, column_indices.get('employee_id'))
+    names = _text_column(df, column_indices.get('name'))
+    numeric_fields = list(NUMERIC_INPUT_DEFAULTS)
+    hashes = []
+    for pos in range(len(df)):
+        values = [CALCULATION_VERSION, ids[pos], names[pos]]
+        values.extend(repr(float(numeric_values[field][pos])) for field in numeric_fields)
+        hashes.append(hashlib.blake2b('\x1f'.join(values).encode('utf-8'), digest_size=16).hexdigest())
+    return hashes
+
+
+def change_report(previous: List[Dict[str, Any]], employees: List[Dict[str, Any]], recomputed: List[str]) -> Dict[str, Any]:
+    """Summarize a delta upload against the previous upload of the same company-month."""
+    previous_ids = {employee['employee_id'] for employee in previous}
+    current_ids = {employee['employee_id'] for employee in employees}
+    return {
+        'unchanged': len(employees) - len(recomputed),
+        'changed': sorted(employee_id for employee_id in set(recomputed) if employee_id in previous_ids),
+        'added': sorted(employee_id for employee_id in set(recomputed) if employee_id not in previous_ids),
+        'removed': sorted(previous_ids - current_ids),
+    }
+
+
 def parse_excel_by_position(
     df: pd.DataFrame,
     company_name: str,
-    column_mappings: Dict[str, Dict[str, str]]
+    column_mappings: Dict[str, Dict[str, str]],
+    report: Optional[Dict[str, Any]] = None,
+    previous: Optional[List[Dict[str, Any]]] = None,
+    input_hashes: Optional[List[str]] = None
 ) -> List[Dict]:
     """
     Parse Excel sheet using column positions instead of column names.
@@ -50,19 +173,28 @@ def parse_excel_by_position(
         company_name: Name of the company (sheet name)
         column_mappings: Dictionary mapping company names to column positions
             e.g. {'Company1': {'employee_id': 'B', 'name': 'E', 'net_salary': 'AH'}}
+        report: Optional dictionary that receives data quality details for the sheet
+            (``invalid_cells``: field -> 1-based row numbers that held no number)
+        previous: Employees of the previous upload of this sheet (delta mode). Rows
+            whose input hash matches one of them are reused instead of recomputed,
+            and ``report['changes']`` lists the changed, added and removed IDs.
+            Their hashes come in each employee's ``input_hash`` field.
+        input_hashes: Optional list that receives the input hash of each returned
+            employee, in order. The hashes are kept out of the employee dicts so
+            they never reach API responses.
 
     Returns:
         List of employee dictionaries
     """
     try:
-        print(f"\nProcessing sheet by position: {company_name}")
+        logger.info(f"Processing sheet by position: {company_name}")
 
         # Get column mapping for this company
         company_mapping = column_mappings.get(company_name)
 
         # If no specific mapping found, try to use the default mapping
         if not company_mapping and 'default' in column_mappings:
-            print(f"No specific mapping found for sheet: {company_name}, using default mapping")
+            logger.info(f"No specific mapping found for sheet: {company_name}, using default mapping")
             company_mapping = column_mappings['default']
 
         # If still no mapping found, raise an error
@@ -74,18 +206,43 @@ def parse_excel_by_position(
         for field, column_identifier in company_mapping.items():
             try:
                 column_indices[field] = get_column_index(column_identifier)
-                print(f"Mapped field '{field}' to column index {column_indices[field]}")
+                logger.debug(f"Mapped field '{field}' to column index {column_indices[field]}")
             except Exception as e:
-                print(f"Error mapping field '{field}': {str(e)}")
+                logger.warning(f"Error mapping field '{field}': {str(e)}")
                 raise ValueError(f"Error converting column identifier for {field}: {str(e)}")
 
-        print(f"Using column indices: {column_indices}")
+        logger.info(f"Using column indices: {column_indices}")
+
+        with pipeline_metrics.stage('parse', rows=len(df)):
+            # Coerce every mapped numeric column once instead of parsing cell by cell
+            numeric_values, invalid_cells = coerce_columns(df, column_indices, NUMERIC_INPUT_DEFAULTS, STRICT_NUMERIC_FIELDS)
+            invalid_report = invalid_cell_report(invalid_cells)
+            if invalid_report:
+                logger.warning(f"Invalid numeric cells in sheet {company_name}: {invalid_report}")
+            # Classify empty, total, repeated header and outlier rows once for the whole sheet
+            row_reasons = classify_rows(df, value_column=numeric_values['net_salary'], header_matcher=POSITION_HEADER_MATCHER)
+            dropped_rows = dropped_row_report(row_reasons)
+            if dropped_rows:
+                logger.info(f"Rows skipped in sheet {company_name}: {dropped_rows}")
+            if report is not None:
+                report['invalid_cells'] = invalid_report
+                report['dropped_rows'] = dropped_rows
+
+            # Hash every row's inputs so unchanged rows can be reused in delta mode
+            row_hashes = row_input_hashes(df, column_indices, numeric_values)
+            previous_rows = None
+            if previous is not None:
+                previous_rows = {
+                    employee['input_hash']: {field: value for field, value in employee.items() if field != 'input_hash'}
+                    for employee in previous if employee.get('input_hash')
+                }
+            recomputed = []
 
         # Extract data
         employees = []
 
         # Debug: Print the first 10 rows of the dataframe to understand its structure
-        print(f"\nDEBUG - First 10 rows of dataframe:")
+        logger.debug(f"First 10 rows of dataframe:")
         for i in range(min(10, len(df))):
             row_values = []
             for j in range(min(10, len(df.columns))):
@@ -94,533 +251,356 @@ def parse_excel_by_position(
                     row_values.append(f"Col {j+1}: {value} (Type: {type(value).__name__})")
                 except Exception as e:
                     row_values.append(f"Col {j+1}: ERROR - {str(e)}")
-            print(f"Row {i+1}: {', '.join(row_values)}")
-        for idx, row in df.iterrows():
-            # Process all rows, including headers
-            print(f"Processing row {idx+1} (0-based index: {idx}) - NOT SKIPPING ANY ROWS")
-
-            print(f"\n===========================================")
-            print(f"Processing row {idx+1} (0-based index: {idx})")
-            # Print the first 10 values of the row for debugging
-            row_values = []
-            for i in range(min(10, len(row))):
-                try:
-                    value = row.iloc[i]
-                    row_values.append(f"Col {i+1}: {value} (Type: {type(value).__name__})")
-                except Exception as e:
-                    row_values.append(f"Col {i+1}: ERROR - {str(e)}")
-            print("Row data: " + ", ".join(row_values))
-            try:
-                # Skip completely empty rows
-                if row.isna().all():
-                    continue
+            logger.debug(f"Row {i+1}: {', '.join(row_values)}")
+        with pipeline_metrics.stage('calculate', rows=len(df)):
+            for pos, (idx, row) in enumerate(df.iterrows()):
+                # Delta mode: reuse the previous result when the row's inputs are unchanged
+                if previous_rows is not None and not row_reasons.iat[pos]:
+                    unchanged = previous_rows.get(row_hashes[pos])
+                    if unchanged is not None:
+                        employees.append(dict(unchanged, company=company_name))
+                        if input_hashes is not None:
+                            input_hashes.append(row_hashes[pos])
+                        continue
 
                 # Process all rows, including headers
-                print(f"Processing row {idx+1} in the inner loop (not skipping)")
+                logger.debug(f"Processing row {idx+1} (0-based index: {idx}) - NOT SKIPPING ANY ROWS")
 
-                # Check if this is the last row (total row)
-                # We can identify it by checking if it contains words like "Total" or "Sum"
-                row_as_string = ' '.join(str(val).lower() for val in row if pd.notna(val))
-                if any(keyword in row_as_string for keyword in ['total', 'sum', 'grand total']):
-                    print(f"Skipping total row: {row_as_string[:50]}...")
-                    continue
-
-                # Get values by column index with better error handling
+                logger.debug(f"===========================================")
+                logger.debug(f"Processing row {idx+1} (0-based index: {idx})")
+                # Print the first 10 values of the row for debugging
+                row_values = []
+                for i in range(min(10, len(row))):
+                    try:
+                        value = row.iloc[i]
+                        row_values.append(f"Col {i+1}: {value} (Type: {type(value).__name__})")
+                    except Exception as e:
+                        row_values.append(f"Col {i+1}: ERROR - {str(e)}")
+                logger.debug("Row data: " + ", ".join(row_values))
                 try:
-                    # For employee_id, try to get the value and handle any errors
+                    # Skip empty, total, repeated header and outlier rows
+                    if row_reasons.iat[pos]:
+                        logger.debug(f"Skipping row {idx+1}: {row_reasons.iat[pos]}")
+                        continue
+
+                    logger.debug(f"Processing row {idx+1} in the inner loop (not skipping)")
+
+                    # Get values by column index with better error handling
                     try:
-                        if column_indices['employee_id'] < len(row):
-                            employee_id_value = row.iloc[column_indices['employee_id']]
-                            if pd.notna(employee_id_value):
-                                employee_id = str(employee_id_value).strip()
-                                print(f"Found employee_id: '{employee_id}' at column index {column_indices['employee_id']} (Column {column_indices['employee_id']+1})")
-
-                                # Special debug for specific employee IDs
-                                if employee_id in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
-                                    print(f"SPECIAL DEBUG - Found target employee ID: {employee_id}")
-                                    print(f"SPECIAL DEBUG - Row data: {row.iloc[:5].tolist()}")
-                                    print(f"SPECIAL DEBUG - Row index: {idx}")
-
-                                # Check if this is a total row by looking at the employee ID
-                                if any(keyword in employee_id.lower() for keyword in ['total', 'sum', 'grand', 'subtotal']):
-                                    print(f"Skipping total row with ID: {employee_id}")
-                                    continue
+                        # For employee_id, try to get the value and handle any errors
+                        try:
+                            if column_indices['employee_id'] < len(row):
+                                employee_id_value = row.iloc[column_indices['employee_id']]
+                                if pd.notna(employee_id_value):
+                                    employee_id = str(employee_id_value).strip()
+                                    logger.debug(f"Found employee_id: '{employee_id}' at column index {column_indices['employee_id']} (Column {column_indices['employee_id']+1})")
+
+                                    # Special debug for specific employee IDs
+                                    if employee_id in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
+                                        logger.debug(f"SPECIAL DEBUG - Found target employee ID: {employee_id}")
+                                        logger.debug(f"SPECIAL DEBUG - Row data: {row.iloc[:5].tolist()}")
+                                        logger.debug(f"SPECIAL DEBUG - Row index: {idx}")
+                                else:
+                                    logger.debug(f"Employee ID is NaN or None at column index {column_indices['employee_id']} (Column {column_indices['employee_id']+1})")
+                                    employee_id = ""
                             else:
-                                print(f"Employee ID is NaN or None at column index {column_indices['employee_id']} (Column {column_indices['employee_id']+1})")
+                                logger.debug(f"Employee ID column index {column_indices['employee_id']} is out of bounds for row with {len(row)} columns")
                                 employee_id = ""
-                        else:
-                            print(f"Employee ID column index {column_indices['employee_id']} is out of bounds for row with {len(row)} columns")
+                        except (IndexError, KeyError) as e:
+                            logger.warning(f"Error accessing employee_id column: {str(e)}")
                             employee_id = ""
-                    except (IndexError, KeyError) as e:
-                        print(f"Error accessing employee_id column: {str(e)}")
-                        employee_id = ""
 
-                    # For name, try to get the value and handle any errors
-                    try:
-                        if column_indices['name'] < len(row):
-                            name_value = row.iloc[column_indices['name']]
-                            if pd.notna(name_value):
-                                name = str(name_value).strip()
-                                # Print the name for debugging
-                                print(f"Found name: '{name}' at column index {column_indices['name']} (Column {column_indices['name']+1})")
-
-                                # Check if this is a total row by looking at the name
-                                if any(keyword in name.lower() for keyword in ['total', 'sum', 'grand', 'subtotal']):
-                                    print(f"Skipping total row with name: {name}")
-                                    continue
+                        # For name, try to get the value and handle any errors
+                        try:
+                            if column_indices['name'] < len(row):
+                                name_value = row.iloc[column_indices['name']]
+                                if pd.notna(name_value):
+                                    name = str(name_value).strip()
+                                    # Print the name for debugging
+                                    logger.debug(f"Found name: '{name}' at column index {column_indices['name']} (Column {column_indices['name']+1})")
+                                else:
+                                    logger.debug(f"Name is NaN or None at column index {column_indices['name']} (Column {column_indices['name']+1})")
+                                    name = ""
                             else:
-                                print(f"Name is NaN or None at column index {column_indices['name']} (Column {column_indices['name']+1})")
+                                logger.debug(f"Name column index {column_indices['name']} is out of bounds for row with {len(row)} columns")
                                 name = ""
-                        else:
-                            print(f"Name column index {column_indices['name']} is out of bounds for row with {len(row)} columns")
+                        except (IndexError, KeyError) as e:
+                            logger.warning(f"Error accessing name column: {str(e)}")
                             name = ""
-                    except (IndexError, KeyError) as e:
-                        print(f"Error accessing name column: {str(e)}")
+                    except Exception as e:
+                        logger.warning(f"Unexpected error getting employee data: {str(e)}")
+                        employee_id = ""
                         name = ""
-                except Exception as e:
-                    print(f"Unexpected error getting employee data: {str(e)}")
-                    employee_id = ""
-                    name = ""
 
-                # Handle salary - convert to float with more flexible parsing
-                try:
-                    # Check if the salary column index is valid
-                    if column_indices['net_salary'] < len(row):
-                        salary_value = row.iloc[column_indices['net_salary']]
-                        if pd.isna(salary_value):
-                            salary = 0
-                        else:
-                            # Print the raw salary value for debugging
-                            print(f"Raw salary value: '{salary_value}' at column index {column_indices['net_salary']}")
-
-                            # Check if this is a total row by looking at the salary value
-                            # If the salary is much larger than typical values, it might be a total
-                            salary_str = str(salary_value)
-                            if any(keyword in salary_str.lower() for keyword in ['total', 'sum']):
-                                print(f"Skipping total row with salary description: {salary_str}")
-                                continue
-
-                            # More flexible salary parsing
-                            # Remove any non-numeric characters except decimal point
-                            salary_str = ''.join(c for c in salary_str if c.isdigit() or c == '.' or c == '-')
-                            # Handle case where there might be multiple decimal points
-                            if salary_str.count('.') > 1:
-                                parts = salary_str.split('.')
-                                salary_str = parts[0] + '.' + ''.join(parts[1:])
-
-                            try:
-                                salary = float(salary_str) if salary_str else 0
-                                print(f"Parsed salary: {salary} (This is the basic rate)")
-
-                                # If this is the last row and the salary is significantly higher than previous rows,
-                                # it might be a total row
-                                if idx == len(df) - 1 and len(employees) > 0:
-                                    avg_salary = sum(emp['net_salary'] for emp in employees) / len(employees)
-                                    if salary > avg_salary * 5:  # If salary is 5x the average, likely a total
-                                        print(f"Skipping likely total row with unusually high salary: {salary}")
-                                        continue
-
-                                # If salary is negative or unreasonably large, set to 0
-                                if salary < 0 or salary > 10000000:  # 1 crore limit
-                                    print(f"Warning: Unreasonable salary value in row {idx+1}: {salary}")
-                                    salary = 0
-                                else:
-                                    print(f"Parsed salary: {salary}")
-                            except ValueError:
-                                print(f"Warning: Invalid salary value in row {idx+1}: {salary_str}")
-                                salary = 0  # Set default instead of skipping
-                    else:
-                        print(f"Salary column index {column_indices['net_salary']} is out of bounds for row with {len(row)} columns")
+                    # Salary (the basic daily rate) is already coerced for the whole column
+                    salary = float(numeric_values['net_salary'][pos])
+                    logger.debug(f"Parsed salary: {salary} (This is the basic rate)")
+
+                    # If salary is negative or unreasonably large, set to 0
+                    if salary < 0 or salary > 10000000:  # 1 crore limit
+                        logger.warning(f"Unreasonable salary value in row {idx+1}: {salary}")
                         salary = 0
-                except Exception as e:
-                    print(f"Error processing salary in row {idx+1}: {str(e)}")
-                    salary = 0  # Set default instead of skipping
 
-                # Get attendance days from the Excel file if available
-                attendance_days = 26.0  # Default value as float
-                try:
-                    if 'attendance' in column_indices and column_indices['attendance'] < len(row):
-                        attendance_value = row.iloc[column_indices['attendance']]
-                        if pd.notna(attendance_value):
-                            try:
-                                # CRITICAL: Ensure attendance is treated as a float with decimal precision
-                                # First, convert to string to handle any format
-                                attendance_str = str(attendance_value).replace(',', '').strip()
-
-                                # Then convert to float - this is the critical step
-                                # We need to ensure we're using the exact float value for all calculations
-                                attendance_days = float(attendance_str)
-
-                                # Debug the decimal part to ensure it's preserved
-                                if '.' in attendance_str and attendance_str.split('.')[-1] != '0':
-                                    print(f"DECIMAL PRESERVATION - Value has decimal part: {attendance_str} -> {attendance_days}")
-                                else:
-                                    print(f"DECIMAL PRESERVATION - Value is whole number or .0: {attendance_str} -> {attendance_days}")
-
-                                print(f"Found attendance days: {attendance_days} (Type: {type(attendance_days).__name__})"
-                                      f" - Original value: {attendance_value} (Type: {type(attendance_value).__name__})")
-
-                                # Special debug for specific employee IDs
-                                if employee_id in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
-                                    print(f"\n==== CRITICAL DEBUG FOR {employee_id} =====")
-                                    print(f"1. Raw attendance value: {attendance_value} (Type: {type(attendance_value).__name__})")
-                                    print(f"2. Converted to string: '{attendance_str}'")
-                                    print(f"3. Final float value: {attendance_days} (Type: {type(attendance_days).__name__})")
-                                    print(f"4. Verification - float('{attendance_str}') = {float(attendance_str)}")
-                                    print(f"5. String representation: str({attendance_days}) = '{str(attendance_days)}'")
-                                    print(f"6. Format with 2 decimal places: {attendance_days:.2f}")
-                                    print(f"==== END DEBUG FOR {employee_id} =====")
-                                # Validate attendance days (should be between 0 and 31)
-                                if attendance_days < 0 or attendance_days > 31:
-                                    print(f"Invalid attendance days: {attendance_days}, using default 26")
-                                    attendance_days = 26.0
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting attendance value to float: {attendance_value}, error: {str(e)}")
-                                # Try to continue with default value
-                except Exception as e:
-                    print(f"Error processing attendance days: {str(e)}")
-                    # Continue with default value
-
-                # Get the basic parameters
-                daily_salary = salary  # Basic daily rate
-                print(f"Using daily_salary: {daily_salary}, attendance_days: {attendance_days}")
-
-                # Fixed wages calculations
-                vda_rate = 135.32  # Fixed VDA Rate
-                print(f"VDA Rate: {vda_rate}")
-
-                pl = (daily_salary + vda_rate) / 30 * 1.5  # PL: (Daily salary + VDA rate)/30 * 1.5
-                print(f"PL: {pl}")
-
-                bonus_rate = (daily_salary + vda_rate) * 0.0833  # Bonus rate: (Daily salary + VDA rate)*8.33%
-                print(f"Bonus rate: {bonus_rate}")
-
-                # Monthly calculations based on attendance
-                # CRITICAL: Ensure we're using the float value of attendance_days
-                print(f"\nCALCULATION DEBUG - Before monthly salary calculation:")
-                print(f"Daily salary: {daily_salary} (Type: {type(daily_salary).__name__})")
-                print(f"Attendance days: {attendance_days} (Type: {type(attendance_days).__name__})")
-
-                monthly_salary = daily_salary * attendance_days  # Monthly salary: Daily salary * Attendance
-                print(f"Monthly salary: {monthly_salary} = {daily_salary} * {attendance_days} (Type: {type(monthly_salary).__name__})")
-
-                # Special debug for specific employee IDs
-                if employee_id in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
-                    print(f"\n==== CALCULATION DEBUG FOR {employee_id} =====")
-                    print(f"1. Daily salary: {daily_salary} (Type: {type(daily_salary).__name__})")
-                    print(f"2. Attendance days: {attendance_days} (Type: {type(attendance_days).__name__})")
-                    print(f"3. Calculation: {daily_salary} * {attendance_days} = {daily_salary * attendance_days}")
-                    print(f"4. Monthly salary result: {monthly_salary} (Type: {type(monthly_salary).__name__})")
-                    print(f"5. Verification - {daily_salary:.2f} * {attendance_days:.2f} = {(daily_salary * attendance_days):.2f}")
-                    print(f"==== END CALCULATION DEBUG FOR {employee_id} =====")
-
-                vda = vda_rate * attendance_days  # VDA: VDA Rate * Attendance
-                print(f"VDA: {vda}")
-
-                # Get daily allowance from Excel if available
-                daily_allowance = 0  # Default value
-                try:
-                    if 'daily_allowance' in column_indices and column_indices['daily_allowance'] < len(row):
-                        daily_allowance_value = row.iloc[column_indices['daily_allowance']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(daily_allowance_value) and daily_allowance_value != '':
-                            try:
-                                daily_allowance = float(str(daily_allowance_value).replace(',', ''))
-                                print(f"Found daily allowance: {daily_allowance}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting daily allowance to float: {daily_allowance_value}, error: {str(e)}")
-                        else:
-                            print("Daily allowance cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing daily allowance: {str(e)}")
+                    # Get attendance days (defaults to 26 when the cell is empty or invalid)
+                    attendance_days = float(numeric_values['attendance'][pos])
+                    # Validate attendance days (should be between 0 and 31)
+                    if attendance_days < 0 or attendance_days > 31:
+                        logger.warning(f"Invalid attendance days: {attendance_days}, using default 26")
+                        attendance_days = 26.0
+                    logger.debug(f"Found attendance days: {attendance_days}")
 
-                allowance = daily_allowance * attendance_days  # Allowance: Daily allowance(if any) * Attendance
-                print(f"Allowance: {allowance}")
+                    # Get the basic parameters
+                    daily_salary = salary  # Basic daily rate
+                    logger.debug(f"Using daily_salary: {daily_salary}, attendance_days: {attendance_days}")
 
-                bonus = bonus_rate * attendance_days  # Bonus: Bonus rate * Attendance
-                print(f"Bonus: {bonus}")
+                    # Fixed wages calculations
+                    vda_rate = 135.32  # Fixed VDA Rate
+                    logger.debug(f"VDA Rate: {vda_rate}")
+
+                    pl = (daily_salary + vda_rate) / 30 * 1.5  # PL: (Daily salary + VDA rate)/30 * 1.5
+                    logger.debug(f"PL: {pl}")
+
+                    bonus_rate = (daily_salary + vda_rate) * 0.0833  # Bonus rate: (Daily salary + VDA rate)*8.33%
+                    logger.debug(f"Bonus rate: {bonus_rate}")
 
-                pl_daily_rate = ((monthly_salary + vda) * 1.3) / 26  # PL daily rate: ((Monthly salary+VDA)*1.3)/26
-                print(f"PL daily rate: {pl_daily_rate}")
+                    # Monthly calculations based on attendance
+                    # CRITICAL: Ensure we're using the float value of attendance_days
+                    logger.debug(f"CALCULATION DEBUG - Before monthly salary calculation:")
+                    logger.debug(f"Daily salary: {daily_salary} (Type: {type(daily_salary).__name__})")
+                    logger.debug(f"Attendance days: {attendance_days} (Type: {type(attendance_days).__name__})")
 
-                # Get NH/FH days from Excel if available
-                nh_fh_days = 0.0  # Default value as float
-                try:
-                    if 'nh_fh_days' in column_indices and column_indices['nh_fh_days'] < len(row):
-                        nh_fh_days_value = row.iloc[column_indices['nh_fh_days']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(nh_fh_days_value) and nh_fh_days_value != '':
-                            try:
-                                nh_fh_days = float(str(nh_fh_days_value).replace(',', ''))
-                                print(f"Found NH/FH days: {nh_fh_days}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting NH/FH days to float: {nh_fh_days_value}, error: {str(e)}")
-                        else:
-                            print("NH/FH days cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing NH/FH days: {str(e)}")
+                    monthly_salary = daily_salary * attendance_days  # Monthly salary: Daily salary * Attendance
+                    logger.debug(f"Monthly salary: {monthly_salary} = {daily_salary} * {attendance_days} (Type: {type(monthly_salary).__name__})")
+
+                    # Special debug for specific employee IDs
+                    if employee_id in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
+                        logger.debug(f"==== CALCULATION DEBUG FOR {employee_id} =====")
+                        logger.debug(f"1. Daily salary: {daily_salary} (Type: {type(daily_salary).__name__})")
+                        logger.debug(f"2. Attendance days: {attendance_days} (Type: {type(attendance_days).__name__})")
+                        logger.debug(f"3. Calculation: {daily_salary} * {attendance_days} = {daily_salary * attendance_days}")
+                        logger.debug(f"4. Monthly salary result: {monthly_salary} (Type: {type(monthly_salary).__name__})")
+                        logger.debug(f"5. Verification - {daily_salary:.2f} * {attendance_days:.2f} = {(daily_salary * attendance_days):.2f}")
+                        logger.debug(f"==== END CALCULATION DEBUG FOR {employee_id} =====")
 
-                nh_fh_amt = (daily_salary + vda_rate + pl + bonus_rate) * nh_fh_days  # NH/FH Amt: (Daily Salary+VDA Rate+PL+Bonus rate)*NH/FH days
-                print(f"NH/FH Amt: {nh_fh_amt}")
+                    vda = vda_rate * attendance_days  # VDA: VDA Rate * Attendance
+                    logger.debug(f"VDA: {vda}")
 
-                # Get OT days from Excel if available
-                ot_days = 0.0  # Default value as float
-                try:
-                    if 'ot_days' in column_indices and column_indices['ot_days'] < len(row):
-                        ot_days_value = row.iloc[column_indices['ot_days']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(ot_days_value) and ot_days_value != '':
-                            try:
-                                ot_days = float(str(ot_days_value).replace(',', ''))
-                                print(f"Found OT days: {ot_days}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting OT days to float: {ot_days_value}, error: {str(e)}")
-                        else:
-                            print("OT days cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing OT days: {str(e)}")
+                    # Get daily allowance from Excel if available (empty cells count as 0)
+                    daily_allowance = float(numeric_values['daily_allowance'][pos])
+                    logger.debug(f"Daily allowance: {daily_allowance}")
 
-                ot_wages = ((daily_salary + vda_rate + daily_allowance) * ot_days) * 2  # OT wages: ((Daily rate+VDA Rate+Daily allowance)* OT days)*2
-                print(f"OT wages: {ot_wages}")
+                    allowance = daily_allowance * attendance_days  # Allowance: Daily allowance(if any) * Attendance
+                    logger.debug(f"Allowance: {allowance}")
 
-                # PPE cost
-                ppe_cost = attendance_days * 3  # PPE's cost: Attendance*3
-                print(f"PPE's cost: {ppe_cost}")
+                    bonus = bonus_rate * attendance_days  # Bonus: Bonus rate * Attendance
+                    logger.debug(f"Bonus: {bonus}")
 
-                # Calculate Total-B
-                total_b = monthly_salary + vda + allowance + pl_daily_rate + bonus + nh_fh_amt + ot_wages + ppe_cost
-                print(f"Total-B: {total_b}")
+                    pl_daily_rate = ((monthly_salary + vda) * 1.3) / 26  # PL daily rate: ((Monthly salary+VDA)*1.3)/26
+                    logger.debug(f"PL daily rate: {pl_daily_rate}")
 
-                # Deductions
-                # Calculate ESI base amount first
-                esi_base = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance + pl + 3) + ot_wages)
-                print(f"ESI base amount: {esi_base}")
+                    # Get NH/FH days from Excel if available (empty cells count as 0)
+                    nh_fh_days = float(numeric_values['nh_fh_days'][pos])
+                    logger.debug(f"NH/FH days: {nh_fh_days}")
 
-                # Then calculate ESI employee contribution (0.75%)
-                esi_employee = esi_base * 0.0075  # ESI 0.75% (0.0075 as decimal)
-                print(f"ESI 0.75%: {esi_employee}")
+                    nh_fh_amt = (daily_salary + vda_rate + pl + bonus_rate) * nh_fh_days  # NH/FH Amt: (Daily Salary+VDA Rate+PL+Bonus rate)*NH/FH days
+                    logger.debug(f"NH/FH Amt: {nh_fh_amt}")
 
-                pf_employee = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance) * 0.12)  # PF 12%
-                print(f"PF 12%: {pf_employee}")
+                    # Get OT days from Excel if available (empty cells count as 0)
+                    ot_days = float(numeric_values['ot_days'][pos])
+                    logger.debug(f"OT days: {ot_days}")
 
-                # Get Uniform Deduction from Excel if available
-                uniform_deduction = 0  # Default value
-                try:
-                    if 'uniform_deduction' in column_indices and column_indices['uniform_deduction'] < len(row):
-                        uniform_deduction_value = row.iloc[column_indices['uniform_deduction']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(uniform_deduction_value) and uniform_deduction_value != '':
-                            try:
-                                uniform_deduction = float(str(uniform_deduction_value).replace(',', ''))
-                                print(f"Found Uniform Deduction: {uniform_deduction}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting Uniform Deduction to float: {uniform_deduction_value}, error: {str(e)}")
-                        else:
-                            print("Uniform Deduction cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing Uniform Deduction: {str(e)}")
+                    ot_wages = ((daily_salary + vda_rate + daily_allowance) * ot_days) * 2  # OT wages: ((Daily rate+VDA Rate+Daily allowance)* OT days)*2
+                    logger.debug(f"OT wages: {ot_wages}")
 
-                # Get Professional Tax (PT) from Excel if available
-                pt = 0  # Default value
-                try:
-                    if 'pt' in column_indices and column_indices['pt'] < len(row):
-                        pt_value = row.iloc[column_indices['pt']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(pt_value) and pt_value != '':
-                            try:
-                                pt = float(str(pt_value).replace(',', ''))
-                                print(f"Found Professional Tax (PT): {pt}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting Professional Tax to float: {pt_value}, error: {str(e)}")
-                        else:
-                            print("Professional Tax cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing Professional Tax: {str(e)}")
+                    # PPE cost
+                    ppe_cost = attendance_days * 3  # PPE's cost: Attendance*3
+                    logger.debug(f"PPE's cost: {ppe_cost}")
 
-                # Get LWF employee boolean from Excel if available
-                lwf_employee = 0  # Default value
-                try:
-                    if 'lwf_employee_bool' in column_indices and column_indices['lwf_employee_bool'] < len(row):
-                        lwf_employee_bool_value = row.iloc[column_indices['lwf_employee_bool']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(lwf_employee_bool_value) and lwf_employee_bool_value != '':
-                            try:
-                                lwf_employee_bool = int(float(str(lwf_employee_bool_value).replace(',', '')))
-                                print(f"Found LWF employee bool: {lwf_employee_bool}")
-                                # If LWF40 is 1, set lwf_employee to 40, otherwise 0
-                                lwf_employee = 40 if lwf_employee_bool == 1 else 0
-                                print(f"LWF employee contribution: {lwf_employee}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting LWF employee bool to int: {lwf_employee_bool_value}, error: {str(e)}")
-                        else:
-                            print("LWF employee bool cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing LWF employee bool: {str(e)}")
+                    # Calculate Total-B
+                    total_b = monthly_salary + vda + allowance + pl_daily_rate + bonus + nh_fh_amt + ot_wages + ppe_cost
+                    logger.debug(f"Total-B: {total_b}")
 
-                # Calculate total deductions
-                deduction_total = esi_employee + pf_employee + uniform_deduction + pt + lwf_employee
-                print(f"Total Deduction: {deduction_total}")
+                    # Deductions
+                    # Calculate ESI base amount first
+                    esi_base = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance + pl + 3) + ot_wages)
+                    logger.debug(f"ESI base amount: {esi_base}")
 
-                # Calculate Bank Transfer (Net Salary)
-                bank_transfer = round(total_b - deduction_total, 0)
-                print(f"Bank Transfer: {bank_transfer}")
+                    # Then calculate ESI employee contribution (0.75%)
+                    esi_employee = esi_base * 0.0075  # ESI 0.75% (0.0075 as decimal)
+                    logger.debug(f"ESI 0.75%: {esi_employee}")
 
-                # Employer contributions
-                # Use the same ESI base amount for employer contribution (3.25%)
-                esi_employer = esi_base * 0.0325  # ESI 3.25% (0.0325 as decimal)
-                print(f"ESI 3.25%: {esi_employer}")
+                    pf_employee = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance) * 0.12)  # PF 12%
+                    logger.debug(f"PF 12%: {pf_employee}")
 
-                pf_employer = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance) * 0.13)  # PF 13%
-                print(f"PF 13%: {pf_employer}")
+                    # Get Uniform Deduction from Excel if available (empty cells count as 0)
+                    uniform_deduction = float(numeric_values['uniform_deduction'][pos])
+                    logger.debug(f"Uniform Deduction: {uniform_deduction}")
 
-                commission = 25 * attendance_days  # Commission: 25*Attendance
-                print(f"Commission: {commission}")
+                    # Get Professional Tax (PT) from Excel if available (empty cells count as 0)
+                    pt = float(numeric_values['pt'][pos])
+                    logger.debug(f"Professional Tax (PT): {pt}")
 
-                # Get LWF employer boolean from Excel if available
-                lwf_employer = 0  # Default value
-                try:
-                    if 'lwf_employer_bool' in column_indices and column_indices['lwf_employer_bool'] < len(row):
-                        lwf_employer_bool_value = row.iloc[column_indices['lwf_employer_bool']]
-                        # If cell is empty or NaN, consider it as 0
-                        if pd.notna(lwf_employer_bool_value) and lwf_employer_bool_value != '':
-                            try:
-                                lwf_employer_bool = int(float(str(lwf_employer_bool_value).replace(',', '')))
-                                print(f"Found LWF employer bool: {lwf_employer_bool}")
-                                # If LWF60 is 1, set lwf_employer to 60, otherwise 0
-                                lwf_employer = 60 if lwf_employer_bool == 1 else 0
-                                print(f"LWF employer contribution: {lwf_employer}")
-                            except (ValueError, TypeError) as e:
-                                print(f"Error converting LWF employer bool to int: {lwf_employer_bool_value}, error: {str(e)}")
-                        else:
-                            print("LWF employer bool cell is empty, using default value 0")
-                except Exception as e:
-                    print(f"Error processing LWF employer bool: {str(e)}")
-
-                # Calculate CTC
-                ctc = commission + pf_employer + esi_employer + total_b + lwf_employer
-                print(f"CTC: {ctc}")
-
-                # For compatibility with existing code
-                basic = monthly_salary
-                gross_salary = total_b
-                net_salary = bank_transfer
-                earned_wage = monthly_salary
-
-                # CRITICAL: Store attendance_days as a float to ensure it's used correctly in calculations
-                # This is the key change - we're storing it as a float, not a string
-
-                # Special debug for specific employee IDs
-                if employee_id in ['GO1492', 'GO1510', 'GO1511', 'GO1515', 'GO1520']:
-                    print(f"\n==== ATTENDANCE DEBUG FOR {employee_id} =====")
-                    print(f"1. Original attendance_days: {attendance_days} (Type: {type(attendance_days).__name__})")
-                    print(f"2. Float representation: {float(attendance_days)}")
-                    print(f"3. Will be stored in employee object as float: {attendance_days}")
-                    print(f"==== END ATTENDANCE DEBUG FOR {employee_id} =====")
-
-                employee = {
-                    'employee_id': employee_id.strip(),
-                    'name': name.strip(),
-                    'daily_salary': daily_salary,
-                    'attendance_days': attendance_days,  # Store as float for calculations
-                    'vda_rate': vda_rate,
-                    'pl': pl,
-                    'bonus_rate': bonus_rate,
-                    'monthly_salary': monthly_salary,
-                    'vda': vda,
-                    'daily_allowance': daily_allowance,
-                    'allowance': allowance,
-                    'bonus': bonus,
-                    'pl_daily_rate': pl_daily_rate,
-                    'nh_fh_days': nh_fh_days,
-                    'nh_fh_amt': nh_fh_amt,
-                    'ot_days': ot_days,
-                    'ot_wages': ot_wages,
-                    'ppe_cost': ppe_cost,
-                    'total_b': total_b,
-                    'esi_employee': esi_employee,
-                    'pf_employee': pf_employee,
-                    'uniform_deduction': uniform_deduction,
-                    'pt': pt,
-                    'lwf_employee': lwf_employee,
-                    'deduction_total': deduction_total,
-                    'bank_transfer': bank_transfer,
-                    'esi_employer': esi_employer,
-                    'pf_employer': pf_employer,
-                    'commission': commission,
-                    'lwf_employer': lwf_employer,
-                    'ctc': ctc,
-                    # For compatibility with existing code
-                    'basic_rate': daily_salary,
-                    'earned_wage': monthly_salary,
-                    'basic': basic,
-                    'gross_salary': gross_salary,
-                    'net_salary': net_salary,
-                    'hours_worked': 0,  # Default values
-                    'overtime_hours': ot_days,
-                    'bank_account': '',
-                    'company': company_name
-                }
+                    # Get LWF employee boolean from Excel if available
+                    # If LWF40 is 1, set lwf_employee to 40, otherwise 0
+                    lwf_employee = 40 if int(numeric_values['lwf_employee_bool'][pos]) == 1 else 0
+                    logger.debug(f"LWF employee contribution: {lwf_employee}")
 
-                # Skip rows with empty names
-                if not employee['name']:
-                    print(f"Skipping row with empty name, ID: {employee['employee_id']}")
-                    continue
+                    # Calculate total deductions
+                    deduction_total = esi_employee + pf_employee + uniform_deduction + pt + lwf_employee
+                    logger.debug(f"Total Deduction: {deduction_total}")
 
-                # Only process employees with IDs starting with GO
-                # Convert to string and strip any whitespace
-                emp_id = str(employee['employee_id']).strip()
-                print(f"Checking employee ID: '{emp_id}'")
+                    # Calculate Bank Transfer (Net Salary)
+                    bank_transfer = round(total_b - deduction_total, 0)
+                    logger.debug(f"Bank Transfer: {bank_transfer}")
 
-                # No longer requiring IDs to start with GO
-                print(f"Processing employee with ID: {emp_id} - {employee['name']}")
+                    # Employer contributions
+                    # Use the same ESI base amount for employer contribution (3.25%)
+                    esi_employer = esi_base * 0.0325  # ESI 3.25% (0.0325 as decimal)
+                    logger.debug(f"ESI 3.25%: {esi_employer}")
 
-                # Check if the employee has a name
-                if not employee['name'] or employee['name'] == '':
-                    print(f"Skipping employee with empty name: {emp_id}")
-                    continue
+                    pf_employer = ((attendance_days + nh_fh_days) * (daily_salary + vda_rate + daily_allowance) * 0.13)  # PF 13%
+                    logger.debug(f"PF 13%: {pf_employer}")
 
-                # Update the employee_id with the cleaned version
-                employee['employee_id'] = emp_id
-                print(f"Processing employee: {emp_id} - {employee['name']}")
-
-                # Add the employee if we have a name and either an ID or salary
-                # Special debug for specific employee IDs
-                if employee['employee_id'] in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
-                    print(f"\n==== FINAL EMPLOYEE OBJECT DEBUG FOR {employee['employee_id']} =====")
-                    print(f"1. Employee ID: {employee['employee_id']}")
-                    print(f"2. Name: {employee['name']}")
-                    print(f"3. Attendance days: {employee['attendance_days']} (Type: {type(employee['attendance_days']).__name__})")
-                    print(f"4. Daily salary: {employee['daily_salary']}")
-                    print(f"5. Monthly salary: {employee['monthly_salary']} = {employee['daily_salary']} * {employee['attendance_days']}")
-                    print(f"6. Verification - {employee['daily_salary']:.2f} * {employee['attendance_days']:.2f} = {(employee['daily_salary'] * employee['attendance_days']):.2f}")
-                    print(f"7. Will be added: {bool(employee['name'] and (employee['employee_id'] or employee['net_salary'] > 0))}")
-                    print(f"8. JSON representation: {json.dumps({'attendance': employee['attendance_days']}, default=float)}")
-                    print(f"==== END FINAL DEBUG FOR {employee['employee_id']} =====")
-
-                if employee['name'] and (employee['employee_id'] or employee['net_salary'] > 0):
-                    # If we don't have a valid salary, set a default
-                    if employee['net_salary'] <= 0:
-                        employee['net_salary'] = 10000  # Default salary
-                        print(f"Setting default salary for employee: {employee['name']}")
-
-                    # If we don't have a valid ID, generate one
-                    if not employee['employee_id']:
-                        employee['employee_id'] = f"EMP-{company_name[:3].upper()}-{len(employees) + 1}"
-                        print(f"Generated ID {employee['employee_id']} for employee: {employee['name']}")
-
-                    # Add the employee to the list
-                    print(f"Adding employee: {employee['name']} (ID: {employee['employee_id']}, Salary: {employee['net_salary']})")
-                    employees.append(employee)
+                    commission = 25 * attendance_days  # Commission: 25*Attendance
+                    logger.debug(f"Commission: {commission}")
 
-            except Exception as e:
-                print(f"Warning: Error processing row {idx+1}: {str(e)}")
-                continue
+                    # Get LWF employer boolean from Excel if available
+                    # If LWF60 is 1, set lwf_employer to 60, otherwise 0
+                    lwf_employer = 60 if int(numeric_values['lwf_employer_bool'][pos]) == 1 else 0
+                    logger.debug(f"LWF employer contribution: {lwf_employer}")
+
+                    # Calculate CTC
+                    ctc = commission + pf_employer + esi_employer + total_b + lwf_employer
+                    logger.debug(f"CTC: {ctc}")
+
+                    # For compatibility with existing code
+                    basic = monthly_salary
+                    gross_salary = total_b
+                    net_salary = bank_transfer
+                    earned_wage = monthly_salary
+
+                    # CRITICAL: Store attendance_days as a float to ensure it's used correctly in calculations
+                    # This is the key change - we're storing it as a float, not a string
+
+                    # Special debug for specific employee IDs
+                    if employee_id in ['GO1492', 'GO1510', 'GO1511', 'GO1515', 'GO1520']:
+                        logger.debug(f"==== ATTENDANCE DEBUG FOR {employee_id} =====")
+                        logger.debug(f"1. Original attendance_days: {attendance_days} (Type: {type(attendance_days).__name__})")
+                        logger.debug(f"2. Float representation: {float(attendance_days)}")
+                        logger.debug(f"3. Will be stored in employee object as float: {attendance_days}")
+                        logger.debug(f"==== END ATTENDANCE DEBUG FOR {employee_id} =====")
+
+                    employee = {
+                        'employee_id': employee_id.strip(),
+                        'name': name.strip(),
+                        'daily_salary': daily_salary,
+                        'attendance_days': attendance_days,  # Store as float for calculations
+                        'vda_rate': vda_rate,
+                        'pl': pl,
+                        'bonus_rate': bonus_rate,
+                        'monthly_salary': monthly_salary,
+                        'vda': vda,
+                        'daily_allowance': daily_allowance,
+                        'allowance': allowance,
+                        'bonus': bonus,
+                        'pl_daily_rate': pl_daily_rate,
+                        'nh_fh_days': nh_fh_days,
+                        'nh_fh_amt': nh_fh_amt,
+                        'ot_days': ot_days,
+                        'ot_wages': ot_wages,
+                        'ppe_cost': ppe_cost,
+                        'total_b': total_b,
+                        'esi_employee': esi_employee,
+                        'pf_employee': pf_employee,
+                        'uniform_deduction': uniform_deduction,
+                        'pt': pt,
+                        'lwf_employee': lwf_employee,
+                        'deduction_total': deduction_total,
+                        'bank_transfer': bank_transfer,
+                        'esi_employer': esi_employer,
+                        'pf_employer': pf_employer,
+                        'commission': commission,
+                        'lwf_employer': lwf_employer,
+                        'ctc': ctc,
+                        # For compatibility with existing code
+                        'basic_rate': daily_salary,
+                        'earned_wage': monthly_salary,
+                        'basic': basic,
+                        'gross_salary': gross_salary,
+                        'net_salary': net_salary,
+                        'hours_worked': 0,  # Default values
+                        'overtime_hours': ot_days,
+                        'bank_account': '',
+                        'company': company_name
+                    }
+
+                    # Skip rows with empty names
+                    if not employee['name']:
+                        logger.debug(f"Skipping row with empty name, ID: {employee['employee_id']}")
+                        continue
+
+                    # Only process employees with IDs starting with GO
+                    # Convert to string and strip any whitespace
+                    emp_id = str(employee['employee_id']).strip()
+                    logger.debug(f"Checking employee ID: '{emp_id}'")
+
+                    # No longer requiring IDs to start with GO
+                    logger.debug(f"Processing employee with ID: {emp_id} - {employee['name']}")
+
+                    # Check if the employee has a name
+                    if not employee['name'] or employee['name'] == '':
+                        logger.debug(f"Skipping employee with empty name: {emp_id}")
+                        continue
+
+                    # Update the employee_id with the cleaned version
+                    employee['employee_id'] = emp_id
+                    logger.debug(f"Processing employee: {emp_id} - {employee['name']}")
+
+                    # Add the employee if we have a name and either an ID or salary
+                    # Special debug for specific employee IDs
+                    if employee['employee_id'] in ['EMP1492', 'EMP1510', 'EMP1511', 'EMP1515', 'EMP1520']:
+                        logger.debug(f"==== FINAL EMPLOYEE OBJECT DEBUG FOR {employee['employee_id']} =====")
+                        logger.debug(f"1. Employee ID: {employee['employee_id']}")
+                        logger.debug(f"2. Name: {employee['name']}")
+                        logger.debug(f"3. Attendance days: {employee['attendance_days']} (Type: {type(employee['attendance_days']).__name__})")
+                        logger.debug(f"4. Daily salary: {employee['daily_salary']}")
+                        logger.debug(f"5. Monthly salary: {employee['monthly_salary']} = {employee['daily_salary']} * {employee['attendance_days']}")
+                        logger.debug(f"6. Verification - {employee['daily_salary']:.2f} * {employee['attendance_days']:.2f} = {(employee['daily_salary'] * employee['attendance_days']):.2f}")
+                        logger.debug(f"7. Will be added: {bool(employee['name'] and (employee['employee_id'] or employee['net_salary'] > 0))}")
+                        logger.debug(f"8. JSON representation: {json.dumps({'attendance': employee['attendance_days']}, default=float)}")
+                        logger.debug(f"==== END FINAL DEBUG FOR {employee['employee_id']} =====")
+
+                    if employee['name'] and (employee['employee_id'] or employee['net_salary'] > 0):
+                        # If we don't have a valid salary, set a default
+                        if employee['net_salary'] <= 0:
+                            employee['net_salary'] = 10000  # Default salary
+                            logger.debug(f"Setting default salary for employee: {employee['name']}")
+
+                        # If we don't have a valid ID, generate one
+                        if not employee['employee_id']:
+                            employee['employee_id'] = f"EMP-{company_name[:3].upper()}-{len(employees) + 1}"
+                            logger.debug(f"Generated ID {employee['employee_id']} for employee: {employee['name']}")
+
+                        # Add the employee to the list
+                        logger.debug(f"Adding employee: {employee['name']} (ID: {employee['employee_id']}, Salary: {employee['net_salary']})")
+                        employees.append(employee)
+                        recomputed.append(employee['employee_id'])
+                        if input_hashes is not None:
+                            input_hashes.append(row_hashes[pos])
+
+                except Exception as e:
+                    logger.warning(f"Error processing row {idx+1}: {str(e)}")
+                    continue
+
+        if previous is not None and report is not None:
+            report['changes'] = change_report(previous, employees, recomputed)
+            logger.info(f"Delta upload for sheet {company_name}: {report['changes']}")
 
         # Don't raise an error if no employees are found, just return an empty list
         if not employees:
-            print(f"Warning: No valid employee data found in sheet {company_name}")
+            logger.warning(f"No valid employee data found in sheet {company_name}")
             # Return an empty list instead of creating dummy employees
-            print(f"No dummy employees will be created for {company_name}")
+            logger.info(f"No dummy employees will be created for {company_name}")
 
         return employees
 
@@ -629,7 +609,9 @@ def parse_excel_by_position(
 
 def process_excel_file_by_position(
     excel_file: pd.ExcelFile,
-    column_mappings: Dict[str, Dict[str, str]]
+    column_mappings: Dict[str, Dict[str, str]],
+    previous_upload: Optional[Callable[[str], List[Dict[str, Any]]]] = None,
+    input_hashes: Optional[Dict[str, List[str]]] = None
 ) -> Dict[str, Any]:
     """
     Process Excel file with multiple sheets using column positions.
@@ -637,6 +619,10 @@ def process_excel_file_by_position(
     Args:
         excel_file: pandas ExcelFile object
         column_mappings: Dictionary mapping company names to column positions
+        previous_upload: Optional function returning the previous upload's employees
+            of a sheet; enables delta mode (see parse_excel_by_position)
+        input_hashes: Optional dictionary that receives, per company, the input
+            hashes of its employees in order (for payroll_archive.archive_upload)
 
     Returns:
         Dictionary with processed data and log file path if create_log is True
@@ -651,9 +637,15 @@ def process_excel_file_by_position(
         }
     }
 
+    started = time.perf_counter()
+    sheets_read = 0
+
+    # Resolve column letters to indices once for all sheets
+    column_mappings = resolve_column_mappings(column_mappings)
+
     # Print debug info
-    print(f"Processing Excel file with {len(excel_file.sheet_names)} sheets")
-    print(f"Sheet names: {excel_file.sheet_names}")
+    logger.info(f"Processing Excel file with {len(excel_file.sheet_names)} sheets")
+    logger.info(f"Sheet names: {excel_file.sheet_names}")
 
     for sheet_name in excel_file.sheet_names:
         try:
@@ -661,32 +653,31 @@ def process_excel_file_by_position(
             if not sheet_name.strip():
                 continue
 
-            print(f"\nProcessing sheet: {sheet_name}")
-            # Read Excel file with explicit options to preserve decimal places
-            # Set converters for column 3 (index 2) to force float conversion with decimal preservation
-            # This is critical for attendance values like 23.38
-            converters = {2: lambda x: float(str(x).replace(',', ''))}  # Column 3 (index 2) is attendance
-
+            logger.info(f"Processing sheet: {sheet_name}")
+            # Read the sheet as-is; numeric columns (including decimal attendance values
+            # like 23.38) are coerced per mapped column in parse_excel_by_position
             # Use pandas options to ensure float precision is preserved
-            with pd.option_context('display.precision', 10):
-                df = pd.read_excel(excel_file, sheet_name=sheet_name, converters=converters, dtype={2: float})
+            with pd.option_context('display.precision', 10), pipeline_metrics.stage('read_excel') as read_timer:
+                df = pd.read_excel(excel_file, sheet_name=sheet_name)
+                read_timer.rows = len(df)
+            sheets_read += 1
 
             # Print raw data for debugging
-            print("\nRAW DATA DEBUG - First 10 rows with attendance values:")
+            logger.debug("RAW DATA DEBUG - First 10 rows with attendance values:")
             for i in range(min(10, len(df))):
                 try:
                     raw_value = df.iloc[i, 2]  # Column 3 (index 2) is attendance
-                    print(f"Row {i+1} - Raw attendance: {raw_value} (Type: {type(raw_value).__name__})")
+                    logger.debug(f"Row {i+1} - Raw attendance: {raw_value} (Type: {type(raw_value).__name__})")
                 except Exception as e:
-                    print(f"Row {i+1} - Error reading attendance: {str(e)}")
+                    logger.debug(f"Row {i+1} - Error reading attendance: {str(e)}")
 
             # Skip empty sheets
             if df.empty:
-                print(f"Sheet appears empty: {sheet_name}, skipping")
+                logger.info(f"Sheet appears empty: {sheet_name}, skipping")
                 continue
 
             # Debug: Print the first 10 rows of the sheet to understand its structure
-            print(f"\nDEBUG - First 10 rows of sheet {sheet_name}:")
+            logger.debug(f"First 10 rows of sheet {sheet_name}:")
             for i in range(min(10, len(df))):
                 row_values = []
                 for j in range(min(5, len(df.columns))):
@@ -694,38 +685,52 @@ def process_excel_file_by_position(
                         row_values.append(f"Col {j+1}: {df.iloc[i, j]}")
                     except:
                         row_values.append(f"Col {j+1}: ERROR")
-                print(f"Row {i+1}: {', '.join(row_values)}")
+                logger.debug(f"Row {i+1}: {', '.join(row_values)}")
 
             # Process sheet using column positions
-            employees = parse_excel_by_position(df, sheet_name, column_mappings)
-
-            if employees:
-                company_data = {
-                    "name": sheet_name,
-                    "employees": employees,
-                    "summary": {
-                        "employee_count": len(employees),
-                        "total_salary": sum(emp["net_salary"] for emp in employees),
-                        "total_overtime_hours": sum(emp["overtime_hours"] for emp in employees)
+            sheet_report = {}
+            sheet_hashes = []
+            previous = previous_upload(sheet_name) if previous_upload else None
+            employees = parse_excel_by_position(
+                df, sheet_name, column_mappings, report=sheet_report, previous=previous, input_hashes=sheet_hashes
+            )
+
+            with pipeline_metrics.stage('summarize', rows=len(df)):
+                if employees:
+                    company_data = {
+                        "name": sheet_name,
+                        "employees": employees,
+                        "summary": {
+                            "employee_count": len(employees),
+                            "total_salary": sum(emp["net_salary"] for emp in employees),
+                            "total_overtime_hours": sum(emp["overtime_hours"] for emp in employees)
+                        },
+                        "data_quality": sheet_report
                     }
-                }
-                processed_data["companies"].append(company_data)
+                    processed_data["companies"].append(company_data)
+                    if input_hashes is not None:
+                        input_hashes[sheet_name] = sheet_hashes
 
-                # Update overall summary
-                processed_data["summary"]["total_companies"] += 1
-                processed_data["summary"]["total_employees"] += len(employees)
-                processed_data["summary"]["total_salary"] += company_data["summary"]["total_salary"]
-                processed_data["summary"]["total_overtime_hours"] += company_data["summary"]["total_overtime_hours"]
+                    # Update overall summary
+                    processed_data["summary"]["total_companies"] += 1
+                    processed_data["summary"]["total_employees"] += len(employees)
+                    processed_data["summary"]["total_salary"] += company_data["summary"]["total_salary"]
+                    processed_data["summary"]["total_overtime_hours"] += company_data["summary"]["total_overtime_hours"]
 
         except Exception as e:
-            print(f"Error processing sheet {sheet_name}: {str(e)}")
+            logger.warning(f"Error processing sheet {sheet_name}: {str(e)}")
             continue
 
     # Just log a warning if no data was found
     if not processed_data["companies"]:
-        print("Warning: No valid data was found in any sheet")
-
-    print(f"Processed data summary: {processed_data['summary']}")
+        logger.warning("No valid data was found in any sheet")
+
+    logger.info(f"Processed data summary: {processed_data['summary']}")
+    pipeline_metrics.record_throughput(
+        processed_data["summary"]["total_employees"],
+        sheets_read,
+        time.perf_counter() - started
+    )
     return processed_data
 
 
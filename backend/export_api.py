@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import FileResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import tempfile
+from urllib.parse import quote
+
+import payroll_archive
+from bank_export import BANK_FORMATS, EXPORT_COLUMNS, stream_bank_file
+from xlsx_report import remove_file, statement_companies, write_statement
+from mapping_api import get_tenant_id
+
+router = APIRouter()
+
+def attachment_headers(filename: str) -> dict:
+    """Content-Disposition header for a download with a non-ASCII safe filename."""
+    return {"Content-Disposition": f"attachment; filename*=UTF-8''{quote(filename)}"}
+
+@router.get("/exports/bank-transfer/{company}/{month}")
+async def export_bank_transfer(
+    company: str,
+    month: str,
+    format: str = 'csv',
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Stream the bank upload file of an archived company-month"""
+    if format not in BANK_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown bank format '{format}'. Available: {', '.join(BANK_FORMATS)}"
+        )
+    try:
+        month = payroll_archive.normalize_month(month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    root = payroll_archive.archive_root(tenant_id)
+    if not payroll_archive.company_month_exists(company, month, root):
+        raise HTTPException(status_code=404, detail=f"No payroll archived for {company} in {month}")
+
+    bank_format = BANK_FORMATS[format]()
+    employees = payroll_archive.iter_company_month(company, month, columns=EXPORT_COLUMNS, root=root)
+    return StreamingResponse(
+        stream_bank_file(employees, bank_format, company, month),
+        media_type=bank_format.media_type,
+        headers=attachment_headers(f"bank_transfer_{company}_{month}.{bank_format.extension}")
+    )
+
+@router.get("/reports/{company}/{month}.xlsx")
+async def export_payroll_statement(
+    company: str,
+    month: str,
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Excel payroll statement of a company-month; use 'all' for one sheet per company"""
+    try:
+        month = payroll_archive.normalize_month(month)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    root = payroll_archive.archive_root(tenant_id)
+    companies = statement_companies(company, month, root)
+    if not companies:
+        raise HTTPException(status_code=404, detail=f"No payroll archived for {company} in {month}")
+
+    # The workbook is built on disk in constant memory, then sent in chunks
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as report_file:
+        path = report_file.name
+    try:
+        await run_in_threadpool(write_statement, path, month, companies, root)
+    except Exception:
+        remove_file(path)
+        raise
+
+    return FileResponse(
+        path,
+        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        headers=attachment_headers(f"payroll_{company}_{month}.xlsx"),
+        background=BackgroundTask(remove_file, path)
+    )
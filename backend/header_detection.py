@@ -0,0 +1,77 @@
+import re
+import pandas as pd
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Number of rows scanned from the top of a sheet when looking for the header
+HEADER_SCAN_ROWS = 15
+
+_SEPARATORS = re.compile(r'[^0-9a-z]+')
+
+
+def normalize_label(value) -> str:
+    """Normalize a header cell or synonym for lookup ("Emp. ID" -> "emp id")."""
+    return _SEPARATORS.sub(' ', str(value).lower()).strip()
+
+
+class HeaderMatcher:
+    """Column synonym patterns compiled into a single lookup table.
+
+    Every synonym is normalized once into a dict keyed by label, so matching
+    a row costs one dict lookup per cell instead of scanning each pattern list.
+    """
+
+    def __init__(self, patterns: Dict[str, List[str]], min_matches: int = 3):
+        self.min_matches = min_matches
+        self.lookup: Dict[str, str] = {}
+        for field, synonyms in patterns.items():
+            for synonym in synonyms:
+                # The first field listing a synonym keeps it
+                self.lookup.setdefault(normalize_label(synonym), field)
+
+    def match_row(self, cells: Iterable) -> Dict[str, int]:
+        """Resolve the fields found in a row of cells.
+
+        Returns:
+            Field name to 0-based column index, keeping the leftmost column per field
+        """
+        mapping = {}
+        for position, cell in enumerate(cells):
+            if pd.isna(cell):
+                continue
+            field = self.lookup.get(normalize_label(cell))
+            if field is not None and field not in mapping:
+                mapping[field] = position
+        return mapping
+
+    def find_header(self, rows: pd.DataFrame) -> Tuple[Optional[int], Dict[str, int]]:
+        """Find the first row matching at least ``min_matches`` fields.
+
+        Returns:
+            Tuple of (0-based row index or None, field -> column index)
+        """
+        for idx, row in enumerate(rows.itertuples(index=False, name=None)):
+            mapping = self.match_row(row)
+            if len(mapping) >= self.min_matches:
+                return idx, mapping
+        return None, {}
+
+
+def detect_header(
+    excel_source,
+    sheet_name,
+    matcher: HeaderMatcher,
+    max_rows: int = HEADER_SCAN_ROWS
+) -> Tuple[Optional[int], Dict[str, int]]:
+    """Locate the header of a sheet by reading only its top rows.
+
+    Args:
+        excel_source: pandas ExcelFile (preferred, so the workbook is parsed once) or file-like object
+        sheet_name: Sheet name or 0-based sheet position
+        matcher: Compiled header patterns
+        max_rows: Number of rows read from the top of the sheet
+
+    Returns:
+        Tuple of (0-based sheet row of the header or None, field -> column index)
+    """
+    top_rows = pd.read_excel(excel_source, sheet_name=sheet_name, header=None, nrows=max_rows)
+    return matcher.find_header(top_rows)
@@ -0,0 +1,19 @@
+"""HTTP load tests for the FastAPI apps.
+
+Run from the backend directory so the flat imports resolve:
+
+    python -m loadtest.run --app production --users 20 --duration 60
+    python -m loadtest.run --app company --users 20 --duration 60
+
+By default the app is imported in-process and driven through an ASGI
+transport against a throwaway SQLite database. Pass ``--database-url`` to use
+a local Postgres instead, e.g. one started with
+
+    docker run -d -p 5432:5432 -e POSTGRES_PASSWORD=postgres postgres:14
+
+or ``--url`` to load a server that is already running (uvicorn/gunicorn).
+Tenants and employees are seeded over HTTP first, then virtual users replay
+the weighted request mix of ``loadtest.scenarios``. Latency percentiles and
+throughput are reported per endpoint and checked against ``budgets.json``;
+the exit status is 1 when a budget is exceeded.
+"""
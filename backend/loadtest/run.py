@@ -0,0 +1,216 @@
+"""Seed an app, replay a request mix with concurrent virtual users and check budgets.
+
+    python -m loadtest.run [--app production|company] [--url URL]
+                           [--database-url URL] [--users N] [--duration SECONDS]
+                           [--tenants N] [--employees N] [--budgets PATH]
+                           [--report PATH]
+
+With --url against main_production, export the server's ADMIN_API_TOKEN so
+the archive and analytics requests are let through.
+"""
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+from loadtest import scenarios
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BUDGETS = os.path.join(os.path.dirname(__file__), 'budgets.json')
+
+APPS = {
+    'production': (scenarios.seed_production, scenarios.PRODUCTION_MIX),
+    'company': (scenarios.seed_company, scenarios.COMPANY_MIX),
+}
+
+
+def load_app(name: str, workdir: str, database_url: Optional[str]):
+    """Import an app in-process against a database and working directory of its own.
+
+    The environment is set before the import because the engine and the
+    archive location are resolved when the modules load.
+    """
+    os.environ['DATABASE_URL'] = database_url or f"sqlite:///{os.path.join(workdir, 'loadtest.db')}"
+    os.environ.setdefault('PAYROLL_ARCHIVE_DIR', os.path.join(workdir, 'payroll_archive'))
+    os.environ.setdefault('PAYSLIP_CACHE_DIR', os.path.join(workdir, 'payslips'))
+    os.environ.setdefault('LOG_DIR', os.path.join(workdir, 'logs'))
+    os.environ.setdefault('ADMIN_API_TOKEN', uuid.uuid4().hex)
+    os.chdir(workdir)
+    if BACKEND_DIR not in sys.path:
+        sys.path.insert(0, BACKEND_DIR)
+    if name == 'production':
+        import main_production
+        return main_production.app
+    # main_with_company uses package-relative imports
+    sys.path.insert(0, os.path.dirname(BACKEND_DIR))
+    from backend import main_with_company
+    return main_with_company.app
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, math.ceil(pct / 100 * len(values)) - 1))]
+
+
+async def virtual_user(
+    client: httpx.AsyncClient,
+    state: scenarios.LoadState,
+    operations: List[scenarios.Operation],
+    deadline: float,
+    samples: Dict[str, List[Tuple[float, bool]]],
+    think_time: float
+):
+    weights = [operation.weight for operation in operations]
+    while time.perf_counter() < deadline:
+        operation = state.rng.choices(operations, weights)[0]
+        started = time.perf_counter()
+        try:
+            response = await operation.call(client, state)
+            ok = response.status_code < 400
+        except httpx.HTTPError:
+            ok = False
+        samples[operation.name].append((time.perf_counter() - started, ok))
+        if think_time:
+            await asyncio.sleep(think_time)
+
+
+def summarize(samples: Dict[str, List[Tuple[float, bool]]], elapsed: float) -> Dict[str, Dict[str, Any]]:
+    report = {}
+    for name, observed in samples.items():
+        if not observed:
+            continue
+        latencies = sorted(seconds * 1000 for seconds, _ in observed)
+        errors = sum(1 for _, ok in observed if not ok)
+        report[name] = {
+            'requests': len(observed),
+            'errors': errors,
+            'error_rate': round(errors / len(observed), 4),
+            'rps': round(len(observed) / elapsed, 2),
+            'p50_ms': round(percentile(latencies, 50), 1),
+            'p95_ms': round(percentile(latencies, 95), 1),
+            'p99_ms': round(percentile(latencies, 99), 1),
+            'max_ms': round(latencies[-1], 1),
+        }
+    return report
+
+
+def check_budgets(report: Dict[str, Dict[str, Any]], budgets: Dict[str, Dict[str, float]]) -> List[str]:
+    """Budget breaches; per-endpoint budgets override the "*" defaults.
+
+    Latency and error-rate budgets are upper bounds, ``min_rps`` a lower bound.
+    """
+    breaches = []
+    for name, stats in report.items():
+        budget = {**budgets.get('*', {}), **budgets.get(name, {})}
+        for key, limit in budget.items():
+            if key == 'min_rps':
+                if stats['rps'] < limit:
+                    breaches.append(f"{name}: rps {stats['rps']} < {limit}")
+            elif stats[key] > limit:
+                breaches.append(f"{name}: {key} {stats[key]} > {limit}")
+    return breaches
+
+
+async def run_load(args, app=None) -> Dict[str, Dict[str, Any]]:
+    seed, operations = APPS[args.app]
+    if app is not None:
+        client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest")
+    else:
+        client = httpx.AsyncClient(base_url=args.url)
+    client.timeout = httpx.Timeout(args.timeout)
+
+    # ASGITransport sends no lifespan events; run the app's startup and shutdown handlers here
+    lifespan = app.router.lifespan_context(app) if app is not None else contextlib.nullcontext()
+    async with lifespan, client:
+        state = scenarios.LoadState(args.tenants, args.employees, args.month, args.seed)
+        print(f"Seeding {args.tenants} tenants x {args.employees} employees...", file=sys.stderr)
+        await seed(client, state)
+
+        samples = {operation.name: [] for operation in operations}
+        print(f"Running {args.users} users for {args.duration}s...", file=sys.stderr)
+        started = time.perf_counter()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            virtual_user(client, state, operations, deadline, samples, args.think_time)
+            for _ in range(args.users)
+        ))
+        return summarize(samples, time.perf_counter() - started)
+
+
+def print_report(report: Dict[str, Dict[str, Any]]):
+    print(f"{'endpoint':42s} {'reqs':>7s} {'err%':>6s} {'rps':>8s} "
+          f"{'p50':>8s} {'p95':>8s} {'p99':>8s} {'max':>8s}")
+    for name, stats in sorted(report.items()):
+        print(f"{name:42s} {stats['requests']:7d} {stats['error_rate'] * 100:6.2f} {stats['rps']:8.2f} "
+              f"{stats['p50_ms']:8.1f} {stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} {stats['max_ms']:8.1f}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test the payroll APIs")
+    parser.add_argument('--app', choices=list(APPS), default='production',
+                        help="production = main_production.app, company = main_with_company.app")
+    parser.add_argument('--url', default=None, help="Load a running server instead of the in-process app")
+    parser.add_argument('--database-url', default=None,
+                        help="Database for the in-process app (default: SQLite in the work directory)")
+    parser.add_argument('--workdir', default=None, help="Working directory of the in-process app")
+    parser.add_argument('--users', type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument('--duration', type=float, default=30, help="Seconds to run the mix")
+    parser.add_argument('--think-time', type=float, default=0.0, help="Seconds each user waits between requests")
+    parser.add_argument('--tenants', type=int, default=5, help="Tenants to seed")
+    parser.add_argument('--employees', type=int, default=200, help="Employees seeded per tenant")
+    parser.add_argument('--month', default="January 2026", help="Month the uploads are filed under")
+    parser.add_argument('--timeout', type=float, default=60, help="Per-request timeout in seconds")
+    parser.add_argument('--seed', type=int, default=0, help="Random seed of the request mix")
+    parser.add_argument('--budgets', default=DEFAULT_BUDGETS, help="JSON file of latency/error budgets")
+    parser.add_argument('--report', default=None, help="Write the report as JSON to this file")
+    parser.add_argument('--verbose', action='store_true', help="Keep the app's stdout and request logs")
+    args = parser.parse_args(argv)
+
+    if args.report:
+        args.report = os.path.abspath(args.report)
+    with open(args.budgets) as f:
+        budgets = json.load(f)
+
+    app = None
+    workdir = None
+    if not args.url:
+        workdir = args.workdir or tempfile.mkdtemp(prefix='payroll-loadtest-')
+        os.makedirs(workdir, exist_ok=True)
+        app = load_app(args.app, workdir, args.database_url)
+    if not args.verbose:
+        logging.getLogger('httpx').setLevel(logging.WARNING)
+    try:
+        with open(os.devnull, 'w') as devnull, \
+                contextlib.redirect_stdout(sys.stdout if args.verbose else devnull):
+            report = asyncio.run(run_load(args, app))
+    finally:
+        if workdir and not args.workdir:
+            os.chdir(BACKEND_DIR)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    breaches = check_budgets(report, budgets)
+    for breach in breaches:
+        print(f"BUDGET EXCEEDED {breach}")
+    return 1 if breaches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
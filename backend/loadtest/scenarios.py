@@ -0,0 +1,231 @@
+"""Seeding and weighted request mixes for the load tests.
+
+Each app has a seed coroutine that creates tenants and employees over HTTP
+(so the same code loads an in-process app or a running server) and a mix of
+operations that virtual users pick from by weight.
+"""
+import io
+import json
+import os
+import random
+from datetime import date
+from typing import Any, Awaitable, Callable, Dict, List
+
+import httpx
+import xlsxwriter
+
+from benchmarks import workbooks
+from excel_processor import DEFAULT_COLUMN_MAPPINGS
+
+ADMIN_USERNAME = "admin@payrollpro.com"
+ADMIN_PASSWORD = "admin123"
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+class Operation:
+    """One kind of request in a mix; ``call`` sends it and returns the response."""
+
+    def __init__(self, name: str, weight: int, call: Callable[..., Awaitable[httpx.Response]]):
+        self.name = name
+        self.weight = weight
+        self.call = call
+
+
+class LoadState:
+    """What seeding produced and the operations share while the test runs."""
+
+    def __init__(self, tenants: int, employees: int, month: str, seed: int = 0):
+        self.tenants = tenants
+        self.employees = employees
+        self.month = month
+        self.rng = random.Random(seed)
+        self.companies: List[Dict[str, Any]] = []
+        self.admin_token = None
+        self.upload = b''
+        # Attendance posts walk (employee, month) pairs from a random offset so
+        # reruns against a persistent database do not collide
+        self.attendance_offset = self.rng.randrange(0, 12 * 5000)
+        self.attendance_posted = 0
+
+    def company(self) -> Dict[str, Any]:
+        return self.rng.choice(self.companies)
+
+
+def _xlsx(rows: List[List[Any]]) -> bytes:
+    buffer = io.BytesIO()
+    workbook = xlsxwriter.Workbook(buffer, {'in_memory': True})
+    worksheet = workbook.add_worksheet('Sheet1')
+    for index, row in enumerate(rows):
+        worksheet.write_row(index, 0, row)
+    workbook.close()
+    return buffer.getvalue()
+
+
+def _bearer(token: str) -> Dict[str, str]:
+    return {"Authorization": f"Bearer {token}"}
+
+
+def _admin() -> Dict[str, str]:
+    # The archive and analytics endpoints of main_production need ADMIN_API_TOKEN
+    return {"X-Admin-Token": os.getenv("ADMIN_API_TOKEN", "")}
+
+
+def _check(response: httpx.Response, *allowed: int):
+    if response.status_code >= 400 and response.status_code not in allowed:
+        raise RuntimeError(f"Seeding failed: {response.request.method} {response.request.url} "
+                           f"returned {response.status_code}: {response.text[:200]}")
+
+
+# main_production: tenants are the companies (sheets) of an uploaded workbook
+
+async def _upload_position_workbook(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.post(
+        "/api/upload_excel_by_position",
+        files={"file": ("loadtest.xlsx", state.upload, XLSX_MEDIA_TYPE)},
+        data={"column_mappings": json.dumps(DEFAULT_COLUMN_MAPPINGS), "month": state.month}
+    )
+
+
+async def seed_production(client: httpx.AsyncClient, state: LoadState):
+    buffer = io.BytesIO()
+    workbooks.write_position_workbook(buffer, state.tenants, state.employees)
+    state.upload = buffer.getvalue()
+    _check(await _upload_position_workbook(client, state))
+
+    response = await client.get("/api/companies")
+    _check(response)
+    state.companies = response.json()
+
+
+async def _health(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/health")
+
+
+async def _companies(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/companies")
+
+
+async def _employees_page(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    skip = state.rng.randrange(0, max(1, state.tenants * state.employees - 50))
+    return await client.get("/api/employees", params={"skip": skip, "limit": 50})
+
+
+async def _company_employees(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/employees", params={"company_id": state.company()["id"]})
+
+
+async def _monthly_totals(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get(
+        "/api/archive/monthly-totals", params={"start_month": state.month, "end_month": state.month},
+        headers=_admin()
+    )
+
+
+async def _ctc_trend(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get(
+        "/api/analytics/reports/ctc-trend", params={"start_month": state.month, "end_month": state.month},
+        headers=_admin()
+    )
+
+
+PRODUCTION_MIX = [
+    Operation("GET /api/health", 5, _health),
+    Operation("GET /api/companies", 30, _companies),
+    Operation("GET /api/employees", 25, _employees_page),
+    Operation("GET /api/employees?company_id", 20, _company_employees),
+    Operation("GET /api/archive/monthly-totals", 8, _monthly_totals),
+    Operation("GET /api/analytics/reports/ctc-trend", 8, _ctc_trend),
+    Operation("POST /api/upload_excel_by_position", 4, _upload_position_workbook),
+]
+
+
+# main_with_company: tenants are Company rows, each with its own token
+
+def _employee_id(index: int) -> str:
+    return f"E{index:05d}"
+
+
+async def _issue_token(client: httpx.AsyncClient, username: str, password: str = "loadtest") -> httpx.Response:
+    return await client.post("/api/token", data={"username": username, "password": password})
+
+
+async def seed_company(client: httpx.AsyncClient, state: LoadState, prefix: str = "Loadtest"):
+    response = await _issue_token(client, ADMIN_USERNAME, ADMIN_PASSWORD)
+    _check(response)
+    state.admin_token = response.json()["access_token"]
+
+    for tenant in range(state.tenants):
+        name = f"{prefix} {tenant + 1}"
+        # 400 means the company exists from an earlier run against the same database
+        _check(await client.post("/api/companies", params={"name": name},
+                                 headers=_bearer(state.admin_token)), 400)
+        response = await _issue_token(client, name)
+        _check(response)
+        company = {"name": name, "token": response.json()["access_token"]}
+        for index in range(state.employees):
+            _check(await client.post(
+                "/api/employees",
+                params={"employee_id": _employee_id(index), "name": f"EMPLOYEE {index}",
+                        "basic_rate": 500.0 + index % 400},
+                headers=_bearer(company["token"])
+            ), 400)
+        state.companies.append(company)
+
+    state.upload = _xlsx(
+        [["employee_id", "name", "days_worked"]]
+        + [[_employee_id(index), f"EMPLOYEE {index}", 26] for index in range(min(state.employees, 50))]
+    )
+
+
+async def _token(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await _issue_token(client, state.company()["name"])
+
+
+async def _users_me(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/users/me", headers=_bearer(state.company()["token"]))
+
+
+async def _tenant_employees(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/employees", headers=_bearer(state.company()["token"]))
+
+
+async def _attendance(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/attendance", headers=_bearer(state.company()["token"]))
+
+
+async def _payroll(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.get("/api/payroll", headers=_bearer(state.company()["token"]))
+
+
+async def _post_attendance(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    posted = state.attendance_offset + state.attendance_posted
+    state.attendance_posted += 1
+    months = posted // state.employees
+    month = date(2000 + months // 12, months % 12 + 1, 1)
+    return await client.post(
+        "/api/attendance",
+        params={"employee_id": _employee_id(posted % state.employees), "month": month.isoformat(),
+                "days_worked": state.rng.randint(10, 26), "ot_hours": float(state.rng.randint(0, 16))},
+        headers=_bearer(state.company()["token"])
+    )
+
+
+async def _upload_excel(client: httpx.AsyncClient, state: LoadState) -> httpx.Response:
+    return await client.post(
+        "/api/upload-excel",
+        files={"file": ("loadtest.xlsx", state.upload, XLSX_MEDIA_TYPE)},
+        data={"report_month": date.today().replace(day=1).isoformat()},
+        headers=_bearer(state.company()["token"])
+    )
+
+
+COMPANY_MIX = [
+    Operation("POST /api/token", 10, _token),
+    Operation("GET /api/users/me", 5, _users_me),
+    Operation("GET /api/employees", 30, _tenant_employees),
+    Operation("GET /api/attendance", 15, _attendance),
+    Operation("GET /api/payroll", 15, _payroll),
+    Operation("POST /api/attendance", 20, _post_attendance),
+    Operation("POST /api/upload-excel", 2, _upload_excel),
+]
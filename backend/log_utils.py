@@ -1,56 +1,143 @@
-import os
-import sys
+import io
+import uuid
+import logging
 import datetime
 from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
 
-def create_log_file():
-    """Create a log file with a timestamp."""
-    # Create a timestamp for the log file name
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-    log_filename = f"excel_processing_log_{timestamp}.txt"
-    
-    # Create logs directory if it doesn't exist
-    log_dir = "logs"
-    os.makedirs(log_dir, exist_ok=True)
-    log_filepath = os.path.join(log_dir, log_filename)
-    
-    return log_filepath
+import upload_traces
+from company_context import get_current_company_id_from_context
+
+# Upload log of the current context; log records go there
+_current_log: ContextVar[Optional["UploadLog"]] = ContextVar('upload_log', default=None)
+
+# Loggers of the processing path; their DEBUG records are kept in upload
+# traces whatever the configured log level
+TRACE_LOGGERS = ('log_utils', 'excel_processor')
+
+logger = logging.getLogger(__name__)
+
+class UploadLog:
+    """Trace of one upload: everything logged while it was processed."""
+
+    def __init__(self, upload_id: Optional[str] = None, path: Optional[str] = None, max_chars: Optional[int] = None):
+        self.upload_id = upload_id or uuid.uuid4().hex
+        self.path = path
+        self.stream = open(path, 'w') if path else io.StringIO()
+        # Output past max_chars is counted in dropped_chars instead of kept
+        self.max_chars = max_chars
+        self.chars = 0
+        self.dropped_chars = 0
+
+    def write(self, text: str) -> int:
+        if self.max_chars is not None and self.chars + len(text) > self.max_chars:
+            kept = max(0, self.max_chars - self.chars)
+            self.dropped_chars += len(text) - kept
+            text = text[:kept]
+        self.chars += len(text)
+        self.stream.write(text)
+        return len(text)
+
+    def getvalue(self) -> str:
+        """Text captured so far (only for in-memory logs)."""
+        return self.stream.getvalue() if isinstance(self.stream, io.StringIO) else ''
+
+    def close(self):
+        if self.path:
+            self.stream.close()
+
+class UploadLogHandler(logging.Handler):
+    """Root logging handler writing records to the upload log of the current context."""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter('%(levelname)s - %(message)s'))
+
+    def emit(self, record):
+        log = _current_log.get()
+        if log is not None:
+            try:
+                log.write(self.format(record) + '\n')
+            except Exception:
+                self.handleError(record)
+
+class UploadTraceFilter(logging.Filter):
+    """Pass records below the root logger's level only while an upload is being captured."""
+
+    def filter(self, record):
+        return _current_log.get() is not None or record.levelno >= logging.getLogger().getEffectiveLevel()
+
+def install():
+    """Route log records to the upload log of each context (idempotent).
+
+    The trace loggers are opened up to DEBUG behind an UploadTraceFilter, so
+    outside a capture they log at the root level as before. The app still
+    needs a console handler of its own: with this handler on the root
+    logger, logging.lastResort no longer prints warnings.
+    """
+    root = logging.getLogger()
+    if not any(isinstance(handler, UploadLogHandler) for handler in root.handlers):
+        root.addHandler(UploadLogHandler())
+    for name in TRACE_LOGGERS:
+        trace_logger = logging.getLogger(name)
+        if not any(isinstance(log_filter, UploadTraceFilter) for log_filter in trace_logger.filters):
+            trace_logger.addFilter(UploadTraceFilter())
+            trace_logger.setLevel(logging.DEBUG)
+
+def current_upload_log() -> Optional[UploadLog]:
+    return _current_log.get()
 
 @contextmanager
-def capture_stdout(output_file):
-    """Capture stdout to a file."""
-    # Save the original stdout
-    original_stdout = sys.stdout
-    
+def capture_upload_log(upload_id: Optional[str] = None, path: Optional[str] = None, max_chars: Optional[int] = None):
+    """Capture the log records of the current context into their own UploadLog.
+
+    The log is bound to a context variable, so work handed to the threadpool
+    with run_in_threadpool (which copies the context) is captured as well.
+    """
+    install()
+    log = UploadLog(upload_id, path, max_chars)
+    token = _current_log.set(log)
     try:
-        # Open the output file
-        with open(output_file, 'w') as f:
-            # Redirect stdout to the file
-            sys.stdout = f
-            yield
+        yield log
     finally:
-        # Restore the original stdout
-        sys.stdout = original_stdout
+        _current_log.reset(token)
+        log.close()
 
 def process_excel_with_log(excel_file_path, process_func, *args, **kwargs):
-    """Process an Excel file and save the console output to a log file."""
-    # Create a log file
-    log_file_path = create_log_file()
-    
-    # Capture stdout to the log file
-    with capture_stdout(log_file_path):
-        print(f"Processing Excel file: {excel_file_path}")
-        print(f"Log created at: {datetime.datetime.now()}")
-        print()
-        
-        # Process the Excel file
-        result = process_func(*args, **kwargs)
-        
-        print()
-        print(f"Processing completed at: {datetime.datetime.now()}")
-    
-    # Add the log file path to the result
+    """Process an Excel file and keep its log records as an upload trace.
+
+    The trace is stored in upload_traces.trace_buffer under a new upload id,
+    which is added to the result as ``upload_id`` (and set on the exception
+    when processing fails).
+    """
+    started = datetime.datetime.now()
+    status = "error"
+    with capture_upload_log(max_chars=upload_traces.UPLOAD_TRACE_MAX_CHARS) as upload_log:
+        try:
+            logger.info(f"Processing Excel file: {excel_file_path}")
+            logger.info(f"Log created at: {started}")
+
+            # Process the Excel file
+            result = process_func(*args, **kwargs)
+            status = "completed"
+
+            logger.info(f"Processing completed at: {datetime.datetime.now()}")
+        except Exception as e:
+            e.upload_id = upload_log.upload_id
+            raise
+        finally:
+            upload_traces.trace_buffer.add(upload_log.upload_id, upload_log.getvalue(), {
+                "filename": excel_file_path,
+                "tenant_id": get_current_company_id_from_context(),
+                "status": status,
+                "started_at": started.isoformat(),
+                "finished_at": datetime.datetime.now().isoformat(),
+                "dropped_chars": upload_log.dropped_chars,
+            })
+
+    # Add the upload id to the result so the trace can be fetched
     if isinstance(result, dict):
-        result['log_file_path'] = log_file_path
-    
+        result['upload_id'] = upload_log.upload_id
+
     return result
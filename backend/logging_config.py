@@ -1,39 +1,175 @@
+import atexit
+import copy
+import json
 import logging
 import os
+import queue
+import random
 import sys
-from logging.handlers import RotatingFileHandler
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, Optional
+
+# Correlation id of the request being handled, stamped on every log record
+request_id: ContextVar[Optional[str]] = ContextVar('request_id', default=None)
+
+# Listener thread writing the queued records; replaced on every setup_logging call
+_listener: Optional[QueueListener] = None
+# Handler feeding the listener; its dropped count is reported when the listener stops
+_queue_handler: Optional["NonBlockingQueueHandler"] = None
+
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Copy the current request id onto the record, on the calling thread before it is queued."""
+
+    def filter(self, record):
+        record.request_id = request_id.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a share of the records at the sampled levels.
+
+    ``rates`` maps a level number to the share kept (0.0-1.0); levels not
+    listed, and WARNING and above, are always kept.
+    """
+
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates = {level: rate for level, rate in rates.items() if level < logging.WARNING}
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno)
+        return rate is None or random.random() < rate
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full.
+
+    Unlike QueueHandler.prepare, the traceback is kept apart from the message
+    in ``exc_text``, so the handlers on the listener thread can still format
+    it their own way (JsonFormatter puts it in the ``exc_info`` field).
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        # Merged message and formatted traceback survive pickling; the rest need not
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class DrainingQueueListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of failing."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with the request id and any ``extra`` fields."""
+
+    def format(self, record):
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None),
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        return json.dumps(entry, default=str)
+
+
+def parse_sample_rates(value: str) -> Dict[int, float]:
+    """Parse LOG_SAMPLE_RATES, e.g. "DEBUG=0.01,INFO=0.25"."""
+    rates = {}
+    for item in filter(None, (part.strip() for part in value.split(','))):
+        level, _, rate = item.partition('=')
+        rates[logging.getLevelName(level.strip().upper())] = float(rate)
+    return rates
+
+
+def stop_logging():
+    """Flush the queued records, report any dropped ones and stop the listener thread."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        if _queue_handler is not None and _queue_handler.dropped:
+            # Written straight to the handlers: the queue may still be full
+            record = logging.LogRecord(
+                __name__, logging.WARNING, __file__, 0,
+                "Dropped %d log records because the log queue was full", (_queue_handler.dropped,), None
+            )
+            record.request_id = None
+            for handler in _listener.handlers:
+                handler.handle(record)
+        _listener = None
+        _queue_handler = None
+
 
 def setup_logging():
-    """Configure logging for the application"""
+    """Configure logging for the application
+
+    Records are put on a queue by the calling thread and written to the
+    console and the rotating file by a listener thread, so a log call on the
+    event loop never waits for I/O. The file (payroll.log in LOG_DIR,
+    default: the repository's logs directory) gets JSON lines; set
+    LOG_FORMAT=json to get JSON on the console too.
+    """
+    global _listener, _queue_handler
     log_level_str = os.getenv("LOG_LEVEL", "INFO").upper()
     log_level = getattr(logging, log_level_str, logging.INFO)
-    
-    # Create logs directory if it doesn't exist
-    log_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "logs")
+
+    # Create logs directory if it doesn't exist; LOG_DIR moves it out of the repository
+    log_dir = os.getenv("LOG_DIR") or os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs")
     os.makedirs(log_dir, exist_ok=True)
-    
+
     # Configure root logger
     logger = logging.getLogger()
     logger.setLevel(log_level)
-    
+
     # Remove existing handlers to avoid duplicates
     for handler in logger.handlers[:]:
         logger.removeHandler(handler)
-    
+    stop_logging()
+
     # Create formatters
-    verbose_formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-    )
+    json_formatter = JsonFormatter()
     simple_formatter = logging.Formatter(
         '%(levelname)s - %(message)s'
     )
-    
+
     # Console handler
     console_handler = logging.StreamHandler(sys.stdout)
     console_handler.setLevel(log_level)
-    console_handler.setFormatter(simple_formatter)
-    logger.addHandler(console_handler)
-    
+    console_handler.setFormatter(json_formatter if os.getenv("LOG_FORMAT") == "json" else simple_formatter)
+
     # File handler with rotation
     file_handler = RotatingFileHandler(
         os.path.join(log_dir, "payroll.log"),
@@ -41,14 +177,65 @@ def setup_logging():
         backupCount=10
     )
     file_handler.setLevel(log_level)
-    file_handler.setFormatter(verbose_formatter)
-    logger.addHandler(file_handler)
-    
+    file_handler.setFormatter(json_formatter)
+
+    # Both handlers run on the listener thread; the root logger only enqueues
+    queue_handler = NonBlockingQueueHandler(queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000"))))
+    # Records below the level never reach the queue (upload traces open some loggers up to DEBUG)
+    queue_handler.setLevel(log_level)
+    queue_handler.addFilter(RequestIdFilter())
+    sample_rates = parse_sample_rates(os.getenv("LOG_SAMPLE_RATES", ""))
+    if sample_rates:
+        queue_handler.addFilter(SamplingFilter(sample_rates))
+    logger.addHandler(queue_handler)
+
+    _listener = DrainingQueueListener(queue_handler.queue, console_handler, file_handler, respect_handler_level=True)
+    _queue_handler = queue_handler
+    _listener.start()
+
     # Set specific loggers
     logging.getLogger("uvicorn").setLevel(log_level)
     logging.getLogger("uvicorn.access").setLevel(log_level)
-    
+
     # Suppress noisy loggers
     logging.getLogger("sqlalchemy.engine").setLevel(logging.WARNING)
-    
+
     return logger
+
+
+atexit.register(stop_logging)
+
+
+class RequestIdMiddleware:
+    """Bind a correlation id to each request for the log records it produces.
+
+    The id is taken from the X-Request-ID header when the caller sends one
+    and echoed back on the response.
+    """
+
+    def __init__(self, app, header: str = "x-request-id"):
+        self.app = app
+        self.header = header.encode()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        current = None
+        for key, value in scope.get("headers", ()):
+            if key == self.header:
+                current = value.decode("latin-1")[:128]
+                break
+        current = current or uuid.uuid4().hex
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(self.header, current.encode("latin-1"))]
+            await send(message)
+
+        token = request_id.set(current)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id.reset(token)
@@ -2,6 +2,8 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, FileResponse
 from fastapi.staticfiles import StaticFiles
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from typing import List, Dict, Optional
 import pandas as pd
 import io
@@ -14,7 +16,23 @@
 
 # Import the excel processor module
 import excel_processor
-from logging_config import setup_logging
+import log_utils
+from column_coercion import clean_numeric
+from shared_store import create_data_store
+from sqlalchemy.orm import Session
+from database import get_db, engine
+from mapping_registry import COMPANY_COLUMN_NAMES, mapping_registry, create_tables as create_mapping_tables
+from mapping_api import router as mapping_router, get_tenant_id, admin_token_required
+from archive_api import router as archive_router
+from analytics_api import router as analytics_router
+from export_api import router as export_router
+from trace_api import router as trace_router
+import payroll_archive
+import analytics
+import pipeline_metrics
+import request_profiler
+from header_detection import HeaderMatcher, HEADER_SCAN_ROWS
+from logging_config import setup_logging, RequestIdMiddleware
 
 # Load environment variables
 load_dotenv()
@@ -42,15 +60,39 @@
     allow_headers=["*"],
 )
 
+# Correlation id for the log records of each request (X-Request-ID)
+app.add_middleware(RequestIdMiddleware)
+
 # Add Prometheus monitoring
 Instrumentator().instrument(app).expose(app, endpoint="/api/metrics", include_in_schema=False)
 
-# In-memory storage
-class DataStore:
-    def __init__(self):
-        self.companies: Dict[str, List[Dict]] = {}
-
-data_store = DataStore()
+# Per-stage timings of Excel processing, exposed on /api/metrics as well
+if os.getenv("PIPELINE_METRICS", "true").lower() == "true":
+    pipeline_metrics.enable()
+
+# Employee storage (columnar, see employee_store.EmployeeTable); shared by all
+# workers through memory-mapped files when DATA_STORE_DIR is set
+data_store = create_data_store()
+
+# Saved column mappings live in the database; uploads can reference them by id
+@app.on_event("startup")
+def create_column_mapping_tables():
+    # Created on startup rather than at import, so importing the app touches no database
+    create_mapping_tables(engine)
+
+# No tenants here, so every caller would see and change all tenants' data:
+# these routers need the X-Admin-Token header (ADMIN_API_TOKEN)
+admin_only = [Depends(admin_token_required)]
+app.include_router(mapping_router, prefix="/api", tags=["column-mappings"], dependencies=admin_only)
+app.include_router(archive_router, prefix="/api", tags=["archive"], dependencies=admin_only)
+app.include_router(analytics_router, prefix="/api", tags=["analytics"], dependencies=admin_only)
+app.include_router(export_router, prefix="/api", tags=["exports"], dependencies=admin_only)
+app.include_router(trace_router, prefix="/api", tags=["upload-traces"], dependencies=admin_only)
+
+# Opt-in request profiling (PROFILE_REQUESTS=true); profiles land in logs/profiles
+if request_profiler.enabled():
+    app.add_middleware(request_profiler.ProfilingMiddleware)
+app.include_router(request_profiler.profiles_router(), prefix="/api", tags=["profiling"])
 
 # Mount static files
 try:
@@ -96,76 +138,25 @@ def clean_column_name(col):
         return ''
     return str(col).strip().lower().replace(' ', '_').replace('/', '_').replace('-', '_')
 
+# Common variations of required column names, compiled once into a single lookup
+HEADER_PATTERNS = {
+    'employee_id': ['card no', 'emp id', 'employee id', 'id', 'emp. id', 'emp_id', 'employee number'],
+    'name': ['name', 'employee name', 'emp name', 'emp. name', 'full name'],
+    'total': ['total', 'total hours', 'hours', 'working hours', 'hrs', 'total hrs'],
+    'overtime': ['ot', 'overtime', 'ot hours', 'extra hours', 'additional hours'],
+    'net_salary': ['net salary', 'salary', 'net pay', 'take home', 'net amount', 'net'],
+    'bank_account': ['bank account', 'account', 'account no', 'bank ac', 'bank a/c', 'a/c no']
+}
+HEADER_MATCHER = HeaderMatcher(HEADER_PATTERNS, min_matches=3)
+
 def find_header_row(df: pd.DataFrame) -> int:
     """Find the actual header row containing column names."""
-    # Common variations of required column names
-    column_patterns = {
-        'employee_id': ['card no', 'emp id', 'employee id', 'id', 'emp. id', 'emp_id', 'employee number'],
-        'name': ['name', 'employee name', 'emp name', 'emp. name', 'full name'],
-        'total': ['total', 'total hours', 'hours', 'working hours', 'hrs', 'total hrs'],
-        'overtime': ['ot', 'overtime', 'ot hours', 'extra hours', 'additional hours'],
-        'net_salary': ['net salary', 'salary', 'net pay', 'take home', 'net amount', 'net'],
-        'bank_account': ['bank account', 'account', 'account no', 'bank ac', 'bank a/c', 'a/c no']
-    }
-
-    for idx, row in enumerate(df.iloc[0:15].values):  # Check first 15 rows
-        row_values = [str(cell).strip().lower() for cell in row if pd.notna(cell)]
-        matches = 0
-
-        for patterns in column_patterns.values():
-            if any(pattern in row_values for pattern in patterns):
-                matches += 1
-
-        if matches >= 3:  # Reduced required matches from 4 to 3
-            return idx
-
-    return 0  # Default to first row if no header found
+    header_row, _ = HEADER_MATCHER.find_header(df.iloc[0:HEADER_SCAN_ROWS])
+    return header_row if header_row is not None else 0  # Default to first row if no header found
 
 def get_company_specific_columns(company_name: str) -> Dict[str, str]:
     """Get company-specific column mappings."""
-    mappings = {
-        'Company1': {
-            'employee_id': 'Card No',
-            'name': 'NAME',
-            'net_salary': 'Bank Transfer'
-        },
-        'Naps': {
-            'employee_id': 'INTER ID',
-            'name': 'NAME',
-            'net_salary': 'Total Amount'
-        },
-        'Nayana': {
-            'employee_id': 'Employee Code',
-            'name': 'Name of the employee',
-            'net_salary': 'Net Payable'
-        },
-        'SG': {
-            'employee_id': 'card no',
-            'name': 'NAME',
-            'net_salary': 'Bank Transfer'
-        },
-        'Ink': {
-            'employee_id': 'Employee Code',
-            'name': 'Name of the employee',
-            'net_salary': 'Bank Transfer'
-        },
-        'golden eye': {
-            'employee_id': 'Emp Code',
-            'name': 'Names',
-            'net_salary': 'CTC'
-        },
-        'Genius': {
-            'employee_id': 'Card No',
-            'name': 'NAME',
-            'net_salary': 'BANK Transfer'
-        },
-        'Amigo': {
-            'employee_id': 'Emp Code',
-            'name': 'Names',
-            'net_salary': 'Bank Statement'
-        }
-    }
-    return mappings.get(company_name, {})
+    return COMPANY_COLUMN_NAMES.get(company_name, {})
 
 def parse_excel_sheet(df: pd.DataFrame, company_name: str) -> List[Dict]:
     """Parse a single Excel sheet and extract employee data."""
@@ -187,21 +178,19 @@ def parse_excel_sheet(df: pd.DataFrame, company_name: str) -> List[Dict]:
 
         # Extract data
         employees = []
+        # Convert the salary column to float once, handling currency symbols and commas
+        salaries, invalid_salaries = clean_numeric(df[column_mapping['net_salary']])
         for idx, row in df.iterrows():
             try:
                 # Skip completely empty rows
                 if row.isna().all():
                     continue
 
-                # Convert salary to float, handling common formats
-                salary_str = str(row[column_mapping['net_salary']])
-                # Remove common currency symbols and commas
-                salary_str = salary_str.replace('₹', '').replace(',', '').strip()
-                try:
-                    salary = float(salary_str) if salary_str else 0
-                except ValueError:
+                if invalid_salaries.at[idx]:
+                    salary_str = str(row[column_mapping['net_salary']])
                     logger.warning(f"Invalid salary value in row {idx+1}: {salary_str}")
                     continue
+                salary = float(salaries.at[idx])
 
                 employee = {
                     'employee_id': str(row[column_mapping['employee_id']]).strip(),
@@ -266,22 +255,7 @@ async def upload_excel(file: UploadFile, column_mappings: Optional[str] = None):
                 pass
         else:
             # If no column mappings provided, use default mappings
-            mappings = {
-                # Default mapping for all sheets based on actual Excel structure
-                'default': {
-                    'employee_id': 0,     # Column 1 (0-based: 0) - Card No (GO1529)
-                    'name': 1,            # Column 2 (0-based: 1) - Name (ASHOK KUMAR N V)
-                    'attendance': 2,      # Column 3 (0-based: 2) - Total days attended (22.0)
-                    'net_salary': 3,      # Column 4 (0-based: 3) - Basic Rate (daily salary)
-                    'daily_allowance': 4, # Column 5 (0-based: 4) - Daily Allowance
-                    'nh_fh_days': 5,     # Column 6 (0-based: 5) - NH/FH days
-                    'ot_days': 6,        # Column 7 (0-based: 6) - OT days
-                    'uniform_deduction': 7, # Column 8 (0-based: 7) - Uniform Deduction
-                    'pt': 8,             # Column 9 (0-based: 8) - Professional Tax (PT)
-                    'lwf_employee_bool': 9, # Column 10 (0-based: 9) - LWF40 (boolean)
-                    'lwf_employer_bool': 10  # Column 11 (0-based: 10) - LWF60 (boolean)
-                }
-            }
+            mappings = excel_processor.DEFAULT_COLUMN_MAPPINGS
             logger.info(f"Using default column mappings: {mappings}")
             # Use the excel_processor to process the file with column positions
             return excel_processor.process_excel_file_by_position(excel_file, mappings)
@@ -296,7 +270,15 @@ async def upload_excel(file: UploadFile, column_mappings: Optional[str] = None):
         )
 
 @app.post("/api/upload_excel_by_position")
-async def upload_excel_by_position(file: UploadFile, column_mappings: Optional[str] = Form(None), month: Optional[str] = Form(None)):
+async def upload_excel_by_position(
+    file: UploadFile,
+    column_mappings: Optional[str] = Form(None),
+    month: Optional[str] = Form(None),
+    mapping_id: Optional[int] = Form(None),
+    diff: bool = Form(False),
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
     """Upload and process Excel file using column positions instead of column names."""
     if not file.filename.endswith(('.xlsx', '.xls')):
         raise HTTPException(
@@ -308,7 +290,16 @@ async def upload_excel_by_position(file: UploadFile, column_mappings: Optional[s
         logger.info(f"Processing Excel file by position: {file.filename}")
         # Parse column mappings from JSON string
         mappings = {}
-        if column_mappings:
+        if mapping_id is not None:
+            # Saved mappings come from the registry cache with indices already resolved
+            mappings = mapping_registry.get(db, tenant_id, mapping_id)
+            if mappings is None:
+                raise HTTPException(
+                    status_code=404,
+                    detail="Column mapping not found"
+                )
+            logger.info(f"Using saved column mapping {mapping_id}")
+        elif column_mappings:
             try:
                 mappings = json.loads(column_mappings)
                 logger.info(f"Using column mappings: {mappings}")
@@ -330,8 +321,42 @@ async def upload_excel_by_position(file: UploadFile, column_mappings: Optional[s
                 detail="The Excel file contains no sheets"
             )
 
-        # Process the Excel file using column positions
-        processed_data = excel_processor.process_excel_file_by_position(excel_file, mappings)
+        # Delta mode: reuse rows whose inputs match the archived upload of the same company-month
+        previous_upload = None
+        if diff:
+            if not month:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Delta upload requires a month"
+                )
+            try:
+                archive_month = payroll_archive.normalize_month(month)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            archive_root = payroll_archive.archive_root(tenant_id)
+
+            def previous_upload(company_name):
+                return payroll_archive.read_company_month(company_name, archive_month, archive_root)
+
+        # Process the Excel file using column positions, off the event loop so
+        # uploads run in parallel; the processing trace is kept under the
+        # returned upload_id (see /api/upload-traces). Row input hashes are
+        # collected on the side for the archive and left out of the response
+        input_hashes = {}
+        processed_data = await run_in_threadpool(
+            log_utils.process_excel_with_log,
+            file.filename,
+            excel_processor.process_excel_file_by_position,
+            excel_file,
+            mappings,
+            previous_upload,
+            input_hashes
+        )
+        if diff:
+            processed_data["changes"] = {
+                company["name"]: company["data_quality"].get("changes")
+                for company in processed_data["companies"]
+            }
 
         # Add month information if provided
         if month:
@@ -343,7 +368,25 @@ async def upload_excel_by_position(file: UploadFile, column_mappings: Optional[s
                 for employee in company["employees"]:
                     employee["month"] = month
 
-        return processed_data
+        # Keep the latest upload per company in the columnar store
+        for company in processed_data["companies"]:
+            data_store.set_company(company["name"], company["employees"])
+
+        # Archive the committed month as Parquet for historic reporting
+        if month:
+            try:
+                payroll_archive.archive_upload(
+                    processed_data, month, payroll_archive.archive_root(tenant_id),
+                    only_changed=diff, input_hashes=input_hashes
+                )
+                analytics.report_cache.invalidate(tenant_id, payroll_archive.normalize_month(month))
+            except ValueError as e:
+                logger.warning(f"Not archiving upload: {str(e)}")
+
+        # Encode the response here so its cost shows up as the serialize stage
+        with pipeline_metrics.stage('serialize', rows=processed_data["summary"]["total_employees"]):
+            response = JSONResponse(content=jsonable_encoder(processed_data))
+        return response
 
     except HTTPException:
         raise
@@ -355,19 +398,17 @@ async def upload_excel_by_position(file: UploadFile, column_mappings: Optional[s
         )
 
 @app.get("/api/employees")
-async def get_employees(company_id: Optional[str] = None):
+async def get_employees(company_id: Optional[str] = None, skip: int = 0, limit: Optional[int] = None):
+    """Get a page of employees, rendered from the columnar store on demand"""
     try:
         if company_id:
             if company_id not in data_store.companies:
                 logger.warning(f"Company not found: {company_id}")
                 raise HTTPException(status_code=404, detail="Company not found")
-            return data_store.companies[company_id]
+            return data_store.employees(company_id, skip, limit)
 
         # If no company_id specified, return all employees
-        all_employees = []
-        for employees in data_store.companies.values():
-            all_employees.extend(employees)
-        return all_employees
+        return data_store.employees(None, skip, limit)
 
     except HTTPException:
         raise
@@ -379,13 +420,13 @@ async def get_employees(company_id: Optional[str] = None):
 async def get_companies():
     try:
         companies = []
-        for company_name, employees in data_store.companies.items():
+        for company_name, table in data_store.companies.items():
             companies.append({
                 "id": company_name,
                 "name": company_name,
-                "employee_count": len(employees),
-                "total_salary": sum(emp['net_salary'] for emp in employees),
-                "total_overtime": sum(emp['overtime_hours'] for emp in employees)
+                "employee_count": len(table),
+                "total_salary": table.sum('net_salary'),
+                "total_overtime": table.sum('overtime_hours')
             })
         return companies
 
@@ -398,7 +439,7 @@ async def clear_data():
     """Clear all data from the in-memory database"""
     try:
         # Clear the companies dictionary
-        data_store.companies.clear()
+        data_store.clear()
         logger.info("All data has been cleared successfully")
         return {"message": "All data has been cleared successfully"}
     except Exception as e:
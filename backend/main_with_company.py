@@ -5,19 +5,21 @@
 import os
 from datetime import timedelta
 
-from .database import get_db, engine
+from .database import get_db, engine, SessionLocal
 from .updated_payroll_models import Base, Company, Employee, AttendanceRecord, PayrollEntry
 from .company_api import router as company_router
-from .company_auth import create_access_token, get_current_user_token, ACCESS_TOKEN_EXPIRE_MINUTES
-from .company_context import CompanyContextMiddleware, register_company_model
+from .company_auth import create_access_token, decode_access_token, get_current_user_token, admin_required, ACCESS_TOKEN_EXPIRE_MINUTES
+from .company_context import CompanyContextMiddleware, register_company_model, enable_tenant_stamping
+from . import payslips, request_profiler
 
 # Initialize database
 Base.metadata.create_all(bind=engine)
 
-# Register models for automatic company_id attachment
+# Register models for automatic company_id attachment by the app's sessions
 register_company_model(Employee)
 register_company_model(AttendanceRecord)
 register_company_model(PayrollEntry)
+enable_tenant_stamping(SessionLocal)
 
 # Create FastAPI app
 app = FastAPI(title="Payroll Pro API", version="2.0.0")
@@ -31,12 +33,22 @@
     allow_headers=["*"],
 )
 
-# Add company context middleware
-app.add_middleware(CompanyContextMiddleware)
+# Add company context middleware (decodes the bearer token once per request)
+app.add_middleware(CompanyContextMiddleware, decode_token=decode_access_token)
 
 # Include company API router
 app.include_router(company_router, prefix="/api", tags=["company"])
 
+# Stop the payslip rendering workers with the app
+@app.on_event("shutdown")
+def shutdown_payslip_pool():
+    payslips.shutdown_pool()
+
+# Opt-in request profiling (PROFILE_REQUESTS=true); profiles land in logs/profiles
+if request_profiler.enabled():
+    app.add_middleware(request_profiler.ProfilingMiddleware)
+app.include_router(request_profiler.profiles_router(admin_required), prefix="/api", tags=["profiling"])
+
 # Authentication endpoint
 @app.post("/api/token")
 async def login_for_access_token(
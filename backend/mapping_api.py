@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, Form, Header
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import hmac
+import json
+import os
+
+from database import get_db
+from company_context import get_current_company_id_from_context
+from mapping_registry import mapping_registry, DuplicateMappingName
+
+router = APIRouter()
+
+# Token for the mapping, archive, analytics, export and upload trace endpoints
+# of the apps without their own authentication (main.py, main_production.py);
+# while it is unset those endpoints refuse every request
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+def admin_token_required(x_admin_token: Optional[str] = Header(None)):
+    """Guard for apps without authentication: the X-Admin-Token header must match ADMIN_API_TOKEN."""
+    if not ADMIN_API_TOKEN or x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+def get_tenant_id() -> Optional[str]:
+    """Tenant owning saved mappings; None (shared) when no company is in context.
+
+    The apps without authentication never have a company in context, so
+    their data is shared and these routers are mounted behind
+    admin_token_required there.
+    """
+    return get_current_company_id_from_context()
+
+def parse_column_mappings(column_mappings: str) -> dict:
+    """Parse the column mappings JSON sent by the upload form."""
+    try:
+        mappings = json.loads(column_mappings)
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Invalid column mappings format")
+    if not isinstance(mappings, dict):
+        raise HTTPException(status_code=400, detail="Column mappings must be a JSON object")
+    return mappings
+
+@router.get("/column-mappings", response_model=List[dict])
+async def list_column_mappings(
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """List the saved column mappings of the current tenant"""
+    return [record.to_dict() for record in mapping_registry.list_mappings(db, tenant_id)]
+
+@router.post("/column-mappings", response_model=dict)
+async def create_column_mapping(
+    name: str = Form(...),
+    column_mappings: str = Form(...),
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Save a position-based column mapping that uploads can reference by id"""
+    mappings = parse_column_mappings(column_mappings)
+    try:
+        record = mapping_registry.save(db, tenant_id, name, mappings)
+    except DuplicateMappingName as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return record.to_dict()
+
+@router.put("/column-mappings/{mapping_id}", response_model=dict)
+async def update_column_mapping(
+    mapping_id: int,
+    name: str = Form(...),
+    column_mappings: str = Form(...),
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Update a saved column mapping and invalidate its cached copy"""
+    mappings = parse_column_mappings(column_mappings)
+    try:
+        record = mapping_registry.save(db, tenant_id, name, mappings, mapping_id=mapping_id)
+    except DuplicateMappingName as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Column mapping not found")
+    return record.to_dict()
+
+@router.delete("/column-mappings/{mapping_id}")
+async def delete_column_mapping(
+    mapping_id: int,
+    db: Session = Depends(get_db),
+    tenant_id: Optional[str] = Depends(get_tenant_id)
+):
+    """Delete a saved column mapping"""
+    if not mapping_registry.delete(db, tenant_id, mapping_id):
+        raise HTTPException(status_code=404, detail="Column mapping not found")
+    return {"message": "Column mapping deleted successfully"}
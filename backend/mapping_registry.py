@@ -0,0 +1,177 @@
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from excel_processor import resolve_column_mappings
+from updated_payroll_models import ColumnMapping
+
+# Built-in name-based column mappings per company sheet (legacy upload path)
+COMPANY_COLUMN_NAMES = {
+    'Company1': {
+        'employee_id': 'Card No',
+        'name': 'NAME',
+        'net_salary': 'Bank Transfer'
+    },
+    'Naps': {
+        'employee_id': 'INTER ID',
+        'name': 'NAME',
+        'net_salary': 'Total Amount'
+    },
+    'Nayana': {
+        'employee_id': 'Employee Code',
+        'name': 'Name of the employee',
+        'net_salary': 'Net Payable'
+    },
+    'SG': {
+        'employee_id': 'card no',
+        'name': 'NAME',
+        'net_salary': 'Bank Transfer'
+    },
+    'Ink': {
+        'employee_id': 'Employee Code',
+        'name': 'Name of the employee',
+        'net_salary': 'Bank Transfer'
+    },
+    'golden eye': {
+        'employee_id': 'Emp Code',
+        'name': 'Names',
+        'net_salary': 'CTC'
+    },
+    'Genius': {
+        'employee_id': 'Card No',
+        'name': 'NAME',
+        'net_salary': 'BANK Transfer'
+    },
+    'Amigo': {
+        'employee_id': 'Emp Code',
+        'name': 'Names',
+        'net_salary': 'Bank Statement'
+    }
+}
+
+
+class DuplicateMappingName(Exception):
+    """The tenant already has a mapping with this name."""
+
+
+class MappingRegistry:
+    """Saved position-based column mappings per tenant, cached in process.
+
+    The cache holds mappings with column letters already resolved to integer
+    indices. Each row carries a version that is bumped on edit, so a cached
+    copy is reused only while its version matches the database. That check is
+    a single-column primary key lookup, and it keeps every worker consistent
+    without re-parsing the JSON on each upload.
+    """
+
+    def __init__(self):
+        self._cache: Dict[Tuple[Optional[str], int], Tuple[int, Dict[str, Dict[str, int]]]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _query(db: Session, company_id: Optional[str]):
+        return db.query(ColumnMapping).filter(ColumnMapping.company_id == company_id)
+
+    def list_mappings(self, db: Session, company_id: Optional[str]) -> List[ColumnMapping]:
+        """List the saved mappings of a tenant."""
+        return self._query(db, company_id).order_by(ColumnMapping.name).all()
+
+    def get(self, db: Session, company_id: Optional[str], mapping_id: int) -> Optional[Dict[str, Dict[str, int]]]:
+        """Get a saved mapping with resolved column indices, or None if it does not exist."""
+        version = db.query(ColumnMapping.version).filter(
+            ColumnMapping.company_id == company_id,
+            ColumnMapping.id == mapping_id
+        ).scalar()
+        if version is None:
+            self.invalidate(company_id, mapping_id)
+            return None
+
+        key = (company_id, mapping_id)
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        record = self._query(db, company_id).filter(ColumnMapping.id == mapping_id).first()
+        if record is None:
+            return None
+        resolved = resolve_column_mappings(json.loads(record.mappings))
+        with self._lock:
+            self._cache[key] = (record.version, resolved)
+        return resolved
+
+    def save(
+        self,
+        db: Session,
+        company_id: Optional[str],
+        name: str,
+        mappings: Dict[str, Dict[str, Any]],
+        mapping_id: Optional[int] = None
+    ) -> Optional[ColumnMapping]:
+        """Create a mapping, or update an existing one when mapping_id is given.
+
+        Raises ValueError if a column identifier cannot be resolved and
+        DuplicateMappingName if the tenant has another mapping with this name.
+        Returns None if mapping_id does not exist for this tenant.
+        """
+        resolved = resolve_column_mappings(mappings)
+
+        # The unique index does not cover shared mappings (company_id NULL), so check here too
+        duplicate = self._query(db, company_id).filter(ColumnMapping.name == name)
+        if mapping_id is not None:
+            duplicate = duplicate.filter(ColumnMapping.id != mapping_id)
+        if duplicate.first() is not None:
+            raise DuplicateMappingName(f"A column mapping named '{name}' already exists")
+
+        if mapping_id is None:
+            record = ColumnMapping(company_id=company_id, name=name, mappings=json.dumps(mappings), version=1)
+            db.add(record)
+        else:
+            record = self._query(db, company_id).filter(ColumnMapping.id == mapping_id).first()
+            if record is None:
+                return None
+            record.name = name
+            record.mappings = json.dumps(mappings)
+            record.version = (record.version or 0) + 1
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request saved the same name concurrently
+            db.rollback()
+            raise DuplicateMappingName(f"A column mapping named '{name}' already exists")
+        db.refresh(record)
+
+        with self._lock:
+            self._cache[(company_id, record.id)] = (record.version, resolved)
+        return record
+
+    def delete(self, db: Session, company_id: Optional[str], mapping_id: int) -> bool:
+        """Delete a saved mapping. Returns False if it does not exist."""
+        record = self._query(db, company_id).filter(ColumnMapping.id == mapping_id).first()
+        if record is None:
+            return False
+        db.delete(record)
+        db.commit()
+        self.invalidate(company_id, mapping_id)
+        return True
+
+    def invalidate(self, company_id: Optional[str] = None, mapping_id: Optional[int] = None):
+        """Drop cached mappings: one mapping, one tenant, or everything."""
+        with self._lock:
+            if mapping_id is not None:
+                self._cache.pop((company_id, mapping_id), None)
+            elif company_id is not None:
+                for key in [key for key in self._cache if key[0] == company_id]:
+                    del self._cache[key]
+            else:
+                self._cache.clear()
+
+
+def create_tables(engine):
+    """Create the column_mappings table if it does not exist yet."""
+    ColumnMapping.__table__.create(bind=engine, checkfirst=True)
+
+
+mapping_registry = MappingRegistry()
@@ -0,0 +1,43 @@
+"""Add saved column mappings
+
+Revision ID: add_column_mappings
+Revises: add_company_isolation
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_column_mappings'
+down_revision = 'add_company_isolation'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create column_mappings table
+    op.create_table(
+        'column_mappings',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id', name='fk_column_mappings_company_id'), nullable=True),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('mappings', sa.Text(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'))
+    )
+    op.create_index(op.f('ix_column_mappings_id'), 'column_mappings', ['id'])
+
+    # Create a unique index for the mapping name within a company
+    op.create_index('ix_column_mappings_company_id_name', 'column_mappings', ['company_id', 'name'], unique=True)
+
+
+def downgrade():
+    # Drop indexes
+    op.drop_index('ix_column_mappings_company_id_name', table_name='column_mappings')
+    op.drop_index(op.f('ix_column_mappings_id'), table_name='column_mappings')
+
+    # Drop column_mappings table
+    op.drop_table('column_mappings')
@@ -1,7 +1,7 @@
 """Add company isolation
 
 Revision ID: add_company_isolation
-Revises: previous_revision_id
+Revises:
 Create Date: 2023-07-15 10:00:00.000000
 
 """
@@ -9,69 +9,70 @@
 import sqlalchemy as sa
 import uuid
 
+import online_migrations
+
 
 # revision identifiers, used by Alembic.
 revision = 'add_company_isolation'
-down_revision = 'previous_revision_id'  # Replace with your actual previous revision ID
+down_revision = None
 branch_labels = None
 depends_on = None
 
 
 def upgrade():
-    # Create companies table
-    op.create_table(
-        'companies',
-        sa.Column('id', sa.String(36), primary_key=True),
-        sa.Column('name', sa.String(), nullable=False),
-        sa.Column('subscription_plan', sa.String(), nullable=False, server_default='basic'),
-        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
-        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()')),
-        sa.UniqueConstraint('name', name='uq_companies_name')
-    )
-    op.create_index(op.f('ix_companies_name'), 'companies', ['name'], unique=True)
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # Create companies table (already there when resuming an interrupted upgrade)
+    if not inspector.has_table('companies'):
+        op.create_table(
+            'companies',
+            sa.Column('id', sa.String(36), primary_key=True),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('subscription_plan', sa.String(), nullable=False, server_default='basic'),
+            sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
+            sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()')),
+            sa.UniqueConstraint('name', name='uq_companies_name')
+        )
+        op.create_index(op.f('ix_companies_name'), 'companies', ['name'], unique=True)
     
     # Create a default company for existing data
-    default_company_id = str(uuid.uuid4())
-    op.execute(f"INSERT INTO companies (id, name, subscription_plan) VALUES ('{default_company_id}', 'Default Company', 'basic')")
-    
-    # Add company_id column to employees table
-    op.add_column('employees', sa.Column('company_id', sa.String(36), nullable=True))
-    op.create_foreign_key('fk_employees_company_id', 'employees', 'companies', ['company_id'], ['id'])
-    
-    # Backfill company_id in employees table
-    op.execute(f"UPDATE employees SET company_id = '{default_company_id}'")
-    
-    # Make company_id not nullable
-    op.alter_column('employees', 'company_id', nullable=False)
-    
-    # Create a unique index for employee_id within a company
-    op.create_index('ix_employees_company_id_employee_id', 'employees', ['company_id', 'employee_id'], unique=True)
-    
-    # Add company_id column to attendance_records table
-    op.add_column('attendance_records', sa.Column('company_id', sa.String(36), nullable=True))
-    op.create_foreign_key('fk_attendance_records_company_id', 'attendance_records', 'companies', ['company_id'], ['id'])
-    
-    # Backfill company_id in attendance_records table
-    op.execute(f"UPDATE attendance_records SET company_id = '{default_company_id}'")
-    
-    # Make company_id not nullable
-    op.alter_column('attendance_records', 'company_id', nullable=False)
-    
-    # Create a compound index for attendance_records
-    op.create_index('ix_attendance_records_company_id_employee_id_month', 'attendance_records', ['company_id', 'employee_id', 'month'])
-    
-    # Add company_id column to payroll_entries table
-    op.add_column('payroll_entries', sa.Column('company_id', sa.String(36), nullable=True))
-    op.create_foreign_key('fk_payroll_entries_company_id', 'payroll_entries', 'companies', ['company_id'], ['id'])
-    
-    # Backfill company_id in payroll_entries table
-    op.execute(f"UPDATE payroll_entries SET company_id = '{default_company_id}'")
-    
-    # Make company_id not nullable
-    op.alter_column('payroll_entries', 'company_id', nullable=False)
-    
-    # Create a compound index for payroll_entries
-    op.create_index('ix_payroll_entries_company_id_employee_id_report_month', 'payroll_entries', ['company_id', 'employee_id', 'report_month'])
+    default_company_id = bind.execute(sa.text("SELECT id FROM companies WHERE name = 'Default Company'")).scalar()
+    if default_company_id is None:
+        default_company_id = str(uuid.uuid4())
+        op.execute(f"INSERT INTO companies (id, name, subscription_plan) VALUES ('{default_company_id}', 'Default Company', 'basic')")
+    
+    # Add a nullable company_id column to each table (no table rewrite)
+    for table in ('employees', 'attendance_records', 'payroll_entries'):
+        if 'company_id' not in {column['name'] for column in inspector.get_columns(table)}:
+            op.add_column(table, sa.Column('company_id', sa.String(36), nullable=True))
+    
+    # The rest commits step by step, so a rerun after an interruption resumes
+    # where it stopped, and never holds a lock on the large tables for long
+    with op.get_context().autocommit_block():
+        for table, foreign_key, index, columns, unique in (
+            # Unique index for employee_id within a company
+            ('employees', 'fk_employees_company_id',
+             'ix_employees_company_id_employee_id', ['company_id', 'employee_id'], True),
+            ('attendance_records', 'fk_attendance_records_company_id',
+             'ix_attendance_records_company_id_employee_id_month', ['company_id', 'employee_id', 'month'], False),
+            ('payroll_entries', 'fk_payroll_entries_company_id',
+             'ix_payroll_entries_company_id_employee_id_report_month', ['company_id', 'employee_id', 'report_month'], False),
+        ):
+            # Backfill company_id in batches
+            online_migrations.backfill(
+                f"add_company_isolation.{table}",
+                table,
+                "company_id = :company_id",
+                where="company_id IS NULL",
+                params={"company_id": default_company_id}
+            )
+            online_migrations.add_foreign_key(foreign_key, table, 'companies', ['company_id'], ['id'])
+            
+            # Make company_id not nullable
+            online_migrations.set_not_null(table, 'company_id', existing_type=sa.String(36))
+            
+            online_migrations.create_index(index, table, columns, unique=unique)
 
 
 def downgrade():
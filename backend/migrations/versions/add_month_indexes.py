@@ -0,0 +1,41 @@
+"""Add company/month indexes for the list endpoints
+
+Revision ID: add_month_indexes
+Revises: partition_payroll_tables
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+
+import online_migrations
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_month_indexes'
+down_revision = 'partition_payroll_tables'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Month listings of a company; the (company_id, employee_id, month)
+    # indexes only serve them by scanning every employee of the company.
+    # Built concurrently on PostgreSQL, so the tables stay writable
+    with op.get_context().autocommit_block():
+        online_migrations.create_index(
+            'ix_payroll_entries_company_id_report_month_employee_id',
+            'payroll_entries',
+            ['company_id', 'report_month', 'employee_id'],
+            postgresql_include=['net_salary', 'gross_salary', 'ctc']
+        )
+        online_migrations.create_index(
+            'ix_attendance_records_company_id_month',
+            'attendance_records',
+            ['company_id', 'month']
+        )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        online_migrations.drop_index('ix_attendance_records_company_id_month', 'attendance_records')
+        online_migrations.drop_index('ix_payroll_entries_company_id_report_month_employee_id', 'payroll_entries')
@@ -0,0 +1,49 @@
+"""Add payroll periods with closed-month snapshots
+
+Revision ID: add_payroll_periods
+Revises: add_month_indexes
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_payroll_periods'
+down_revision = 'add_month_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create payroll_periods table
+    op.create_table(
+        'payroll_periods',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('company_id', sa.String(36), sa.ForeignKey('companies.id', name='fk_payroll_periods_company_id'), nullable=False),
+        sa.Column('month', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False, server_default='closed'),
+        sa.Column('version', sa.Integer(), nullable=False, server_default='1'),
+        sa.Column('snapshot', sa.LargeBinary(), nullable=True),
+        sa.Column('checksum', sa.String(64), nullable=True),
+        sa.Column('row_count', sa.Integer(), nullable=True, server_default='0'),
+        sa.Column('totals', sa.Text(), nullable=True),
+        sa.Column('closed_at', sa.DateTime(), nullable=True),
+        sa.Column('reopened_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), server_default=sa.text('now()')),
+        sa.Column('updated_at', sa.DateTime(), server_default=sa.text('now()'))
+    )
+    op.create_index(op.f('ix_payroll_periods_id'), 'payroll_periods', ['id'])
+
+    # One period per company and month
+    op.create_index('ix_payroll_periods_company_id_month', 'payroll_periods', ['company_id', 'month'], unique=True)
+
+
+def downgrade():
+    # Drop indexes
+    op.drop_index('ix_payroll_periods_company_id_month', table_name='payroll_periods')
+    op.drop_index(op.f('ix_payroll_periods_id'), table_name='payroll_periods')
+
+    # Drop payroll_periods table
+    op.drop_table('payroll_periods')
@@ -0,0 +1,41 @@
+"""Partition the payroll tables on PostgreSQL
+
+Rebuilds each table under an ACCESS EXCLUSIVE lock; run it (and the
+downgrade) in a maintenance window with the app stopped.
+
+Revision ID: partition_payroll_tables
+Revises: add_column_mappings
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+
+import partitioning
+
+
+# revision identifiers, used by Alembic.
+revision = 'partition_payroll_tables'
+down_revision = 'add_column_mappings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    scheme = partitioning.partition_scheme()
+
+    # SQLite (and PAYROLL_PARTITIONING=none) keep the plain tables
+    if bind.dialect.name != 'postgresql' or scheme is None:
+        return
+
+    for table, month_column in partitioning.PARTITIONED_TABLES.items():
+        if not partitioning.is_partitioned(bind, table):
+            partitioning.partition_table(bind, table, month_column, scheme)
+
+
+def downgrade():
+    bind = op.get_bind()
+
+    for table in partitioning.PARTITIONED_TABLES:
+        if partitioning.is_partitioned(bind, table):
+            partitioning.unpartition_table(bind, table)
@@ -0,0 +1,298 @@
+"""Alembic helpers for schema changes on the large payroll tables without downtime.
+
+Run the helpers inside ``op.get_context().autocommit_block()`` so every
+step commits as it goes:
+
+- ``backfill`` updates rows in keyset-paginated batches, one short
+  transaction each, throttled and checkpointed so an interrupted run
+  resumes where it stopped;
+- ``create_index`` builds indexes CONCURRENTLY on PostgreSQL, one
+  partition at a time on partitioned tables;
+- ``add_foreign_key`` and ``set_not_null`` add their constraint NOT VALID
+  and validate it afterwards, so writes are only blocked for an instant.
+
+Every helper skips work that is already done, so a migration written with
+them can simply be run again after an interruption. Other databases get
+the plain alembic operations.
+"""
+import logging
+import os
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import sqlalchemy as sa
+from alembic import op
+
+# Under the alembic logger so the migration's logging config shows progress
+logger = logging.getLogger("alembic.online_migrations")
+
+# Rows updated per batch, i.e. per transaction
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", "5000"))
+# Pause between batches in seconds, leaving room for live traffic and replication
+MIGRATION_BATCH_PAUSE = float(os.getenv("MIGRATION_BATCH_PAUSE", "0.1"))
+# How long PostgreSQL DDL may wait for its table lock (queueing live queries
+# behind it) before giving up; it is retried with backoff MIGRATION_LOCK_RETRIES times
+MIGRATION_LOCK_TIMEOUT = os.getenv("MIGRATION_LOCK_TIMEOUT", "5s")
+MIGRATION_LOCK_RETRIES = int(os.getenv("MIGRATION_LOCK_RETRIES", "10"))
+
+# Checkpoints of running backfills
+PROGRESS_TABLE = 'online_migration_progress'
+
+_progress = sa.Table(
+    PROGRESS_TABLE, sa.MetaData(),
+    sa.Column('name', sa.String(200), primary_key=True),
+    sa.Column('last_key', sa.Integer, nullable=False),
+    sa.Column('rows', sa.Integer, nullable=False),
+    sa.Column('updated_at', sa.DateTime, nullable=False)
+)
+
+
+def _is_postgresql(bind) -> bool:
+    return bind.dialect.name == 'postgresql'
+
+
+def _autocommit(bind) -> bool:
+    # autocommit_block() switches the connection through its execution options
+    return bind.get_execution_options().get('isolation_level') == 'AUTOCOMMIT'
+
+
+def _save_progress(bind, name: str, last_key: int, rows: int):
+    values = {'last_key': last_key, 'rows': rows, 'updated_at': datetime.now()}
+    if not bind.execute(_progress.update().where(_progress.c.name == name).values(**values)).rowcount:
+        bind.execute(_progress.insert().values(name=name, **values))
+
+
+def backfill(
+    name: str,
+    table: str,
+    assignments: str,
+    where: Optional[str] = None,
+    params: Optional[Dict[str, Any]] = None,
+    key: str = 'id',
+    batch_size: int = MIGRATION_BATCH_SIZE,
+    pause: float = MIGRATION_BATCH_PAUSE
+) -> int:
+    """Run ``UPDATE table SET assignments WHERE where`` in batches of ``batch_size`` rows.
+
+    Batches walk the integer ``key`` in order (keyset pagination, so each
+    batch is an index range scan) and the last key done is checkpointed
+    under ``name``; a rerun after an interruption starts from the
+    checkpoint, which is removed once the backfill completes. A batch that
+    ran but was not checkpointed is redone, so ``where`` should exclude
+    rows that are already done. Rows inserted after the backfill starts
+    are not visited: the application must already write them correctly.
+
+    Returns the number of rows updated by this run.
+    """
+    bind = op.get_bind()
+    if not _autocommit(bind):
+        logger.warning("%s: not in an autocommit block, the batches commit together at the end", name)
+    _progress.create(bind, checkfirst=True)
+
+    first, last = bind.execute(sa.text(f"SELECT min({key}), max({key}) FROM {table}")).first()
+    if first is None:
+        return 0
+    checkpoint = bind.execute(
+        sa.select(_progress.c.last_key, _progress.c.rows).where(_progress.c.name == name)
+    ).first()
+    position, done = (checkpoint.last_key, checkpoint.rows) if checkpoint else (first - 1, 0)
+    if checkpoint:
+        logger.info("%s: resuming after %s=%s (%d rows already updated)", name, key, position, done)
+
+    condition = f"{key} > :position AND {key} <= :upper" + (f" AND ({where})" if where else "")
+    started = time.monotonic()
+    updated = 0
+    while position < last:
+        upper = bind.execute(sa.text(
+            f"SELECT max({key}) FROM (SELECT {key} FROM {table} WHERE {key} > :position "
+            f"ORDER BY {key} LIMIT :limit) batch"
+        ), {"position": position, "limit": batch_size}).scalar()
+        if upper is None:
+            break
+        result = bind.execute(
+            sa.text(f"UPDATE {table} SET {assignments} WHERE {condition}"),
+            {**(params or {}), "position": position, "upper": upper}
+        )
+        position = upper
+        updated += result.rowcount
+        _save_progress(bind, name, position, done + updated)
+
+        elapsed = time.monotonic() - started
+        share = min(1.0, (position - first + 1) / (last - first + 1))
+        logger.info(
+            "%s: %d rows updated, %.1f%% of %s, %.0f rows/s",
+            name, done + updated, share * 100, table, updated / elapsed if elapsed else 0
+        )
+        if pause:
+            time.sleep(pause)
+
+    bind.execute(_progress.delete().where(_progress.c.name == name))
+    return updated
+
+
+def execute_ddl(statement: str):
+    """Run a DDL statement that takes a table lock.
+
+    On PostgreSQL the statement waits at most MIGRATION_LOCK_TIMEOUT for its
+    lock, so a long transaction cannot make it hold up every query queued
+    behind it; in an autocommit block it is then retried with backoff.
+    """
+    bind = op.get_bind()
+    if not _is_postgresql(bind):
+        bind.execute(sa.text(statement))
+        return
+
+    autocommit = _autocommit(bind)
+    retries = MIGRATION_LOCK_RETRIES if autocommit else 0
+    bind.execute(
+        sa.text("SELECT set_config('lock_timeout', :timeout, :local)"),
+        {"timeout": MIGRATION_LOCK_TIMEOUT, "local": not autocommit}
+    )
+    try:
+        for attempt in range(retries + 1):
+            try:
+                bind.execute(sa.text(statement))
+                return
+            except sa.exc.OperationalError as e:
+                # 55P03: lock_not_available
+                if getattr(e.orig, 'pgcode', None) != '55P03' or attempt == retries:
+                    raise
+                delay = min(2 ** attempt, 30)
+                logger.warning("Lock not available for %r, retrying in %ss", statement, delay)
+                time.sleep(delay)
+    finally:
+        if autocommit:
+            bind.execute(sa.text("RESET lock_timeout"))
+
+
+def _relkind(bind, name: str) -> Optional[str]:
+    return bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": name}).scalar()
+
+
+def _index_valid(bind, name: str) -> Optional[bool]:
+    """None when the index does not exist, else whether it is usable."""
+    return bind.execute(
+        sa.text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)"), {"name": name}
+    ).scalar()
+
+
+def _partitions(bind, table: str) -> List[str]:
+    return [row[0] for row in bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table) ORDER BY c.relname"
+    ), {"table": table})]
+
+
+def _partition_index_name(name: str, table: str, partition: str) -> str:
+    suffix = partition[len(table) + 1:] if partition.startswith(f"{table}_") else partition
+    # PostgreSQL truncates identifiers to 63 characters
+    return f"{name[:62 - len(suffix)]}_{suffix}"
+
+
+def _create_index_concurrently(bind, name: str, table: str, definition: str, unique: bool):
+    if _relkind(bind, table) == 'p':
+        # CONCURRENTLY is not supported on partitioned tables: index each
+        # partition concurrently and attach it to an index on the parent
+        # alone, which becomes valid once every partition is attached
+        bind.execute(sa.text(
+            f"CREATE {'UNIQUE ' if unique else ''}INDEX IF NOT EXISTS {name} ON ONLY {table} {definition}"
+        ))
+        for partition in _partitions(bind, table):
+            partition_index = _partition_index_name(name, table, partition)
+            _create_index_concurrently(bind, partition_index, partition, definition, unique)
+            attached = bind.execute(sa.text(
+                "SELECT 1 FROM pg_inherits WHERE inhrelid = to_regclass(:index) AND inhparent = to_regclass(:parent)"
+            ), {"index": partition_index, "parent": name}).first()
+            if not attached:
+                bind.execute(sa.text(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}"))
+        return
+
+    valid = _index_valid(bind, name)
+    if valid:
+        return
+    if valid is False:
+        # Left behind by an interrupted concurrent build
+        bind.execute(sa.text(f"DROP INDEX CONCURRENTLY {name}"))
+    logger.info("Building index %s on %s", name, table)
+    bind.execute(sa.text(f"CREATE {'UNIQUE ' if unique else ''}INDEX CONCURRENTLY {name} ON {table} {definition}"))
+
+
+def create_index(name: str, table: str, columns: List[str], unique: bool = False,
+                 postgresql_include: Optional[List[str]] = None):
+    """Create an index unless it exists, without blocking writes on PostgreSQL."""
+    bind = op.get_bind()
+    if not _is_postgresql(bind):
+        if name not in {index['name'] for index in sa.inspect(bind).get_indexes(table)}:
+            op.create_index(name, table, columns, unique=unique)
+        return
+
+    if not _autocommit(bind):
+        raise RuntimeError("CREATE INDEX CONCURRENTLY must run inside op.get_context().autocommit_block()")
+    definition = f"({', '.join(columns)})"
+    if postgresql_include:
+        definition += f" INCLUDE ({', '.join(postgresql_include)})"
+    _create_index_concurrently(bind, name, table, definition, unique)
+
+
+def drop_index(name: str, table: str):
+    """Drop an index if it exists, CONCURRENTLY on PostgreSQL when the table is not partitioned."""
+    bind = op.get_bind()
+    if not _is_postgresql(bind):
+        if name in {index['name'] for index in sa.inspect(bind).get_indexes(table)}:
+            op.drop_index(name, table_name=table)
+        return
+    concurrently = _autocommit(bind) and _relkind(bind, table) != 'p'
+    bind.execute(sa.text(f"DROP INDEX {'CONCURRENTLY ' if concurrently else ''}IF EXISTS {name}"))
+
+
+def _constraint_validated(bind, name: str, table: str) -> Optional[bool]:
+    return bind.execute(sa.text(
+        "SELECT convalidated FROM pg_constraint WHERE conname = :name AND conrelid = to_regclass(:table)"
+    ), {"name": name, "table": table}).scalar()
+
+
+def add_foreign_key(name: str, table: str, referent: str, local_columns: List[str], remote_columns: List[str]):
+    """Add a foreign key unless it exists, checking the existing rows without blocking writes on PostgreSQL."""
+    bind = op.get_bind()
+    if not _is_postgresql(bind):
+        if name not in {foreign_key['name'] for foreign_key in sa.inspect(bind).get_foreign_keys(table)}:
+            op.create_foreign_key(name, table, referent, local_columns, remote_columns)
+        return
+
+    validated = _constraint_validated(bind, name, table)
+    if validated is None:
+        execute_ddl(
+            f"ALTER TABLE {table} ADD CONSTRAINT {name} FOREIGN KEY ({', '.join(local_columns)}) "
+            f"REFERENCES {referent} ({', '.join(remote_columns)}) NOT VALID"
+        )
+    if not validated:
+        execute_ddl(f"ALTER TABLE {table} VALIDATE CONSTRAINT {name}")
+
+
+def set_not_null(table: str, column: str, existing_type: sa.types.TypeEngine):
+    """Make ``column`` NOT NULL.
+
+    On PostgreSQL a NOT VALID check constraint is validated first (which
+    does not block writes), so SET NOT NULL can rely on it instead of
+    scanning the table under an exclusive lock; the check is dropped after.
+    """
+    bind = op.get_bind()
+    if not _is_postgresql(bind):
+        op.alter_column(table, column, nullable=False, existing_type=existing_type)
+        return
+
+    nullable = bind.execute(sa.text(
+        "SELECT NOT attnotnull FROM pg_attribute WHERE attrelid = to_regclass(:table) AND attname = :column"
+    ), {"table": table, "column": column}).scalar()
+    if not nullable:
+        return
+
+    check = f"{table}_{column}_not_null"[:63]
+    validated = _constraint_validated(bind, check, table)
+    if validated is None:
+        execute_ddl(f"ALTER TABLE {table} ADD CONSTRAINT {check} CHECK ({column} IS NOT NULL) NOT VALID")
+    if not validated:
+        execute_ddl(f"ALTER TABLE {table} VALIDATE CONSTRAINT {check}")
+    execute_ddl(f"ALTER TABLE {table} ALTER COLUMN {column} SET NOT NULL")
+    execute_ddl(f"ALTER TABLE {table} DROP CONSTRAINT {check}")
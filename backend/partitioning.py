@@ -0,0 +1,213 @@
+"""PostgreSQL declarative partitioning of the payroll tables.
+
+Large tenants make the shared ``payroll_entries`` and ``attendance_records``
+indexes bloat and vacuum slowly. On PostgreSQL these tables can be
+partitioned by ``company_id`` hash, by month range, or both (hash
+partitions subpartitioned by month range); SQLite keeps the plain tables.
+
+The scheme is chosen with PAYROLL_PARTITIONING (``none``, ``hash``,
+``range`` or ``hash_range``) when the ``partition_payroll_tables`` migration
+runs. Queries prune partitions as long as they filter on ``company_id``
+equality and on the month column (equality or a range), as company_api does.
+
+The rebuild is not an online migration: the table is renamed and copied in
+one statement inside the migration's transaction, holding an ACCESS
+EXCLUSIVE lock on it until the migration commits. Every read and write of
+the table waits meanwhile, so schedule the migration (and its downgrade) in
+a maintenance window with the app stopped. online_migrations.backfill does
+not help here: batches in the same transaction keep the lock, and copying
+across transactions would miss the writes made between batches.
+"""
+import os
+from datetime import date
+from typing import List, Optional
+
+import sqlalchemy as sa
+
+# Partitioned tables and their month column
+PARTITIONED_TABLES = {
+    'payroll_entries': 'report_month',
+    'attendance_records': 'month',
+}
+
+PARTITION_SCHEMES = ('hash', 'range', 'hash_range')
+
+# Number of company_id hash partitions
+HASH_PARTITIONS = int(os.getenv("PAYROLL_HASH_PARTITIONS", "8"))
+# First year with its own range partition; older months land in the default partition
+RANGE_START_YEAR = int(os.getenv("PAYROLL_RANGE_START_YEAR", "2020"))
+# Years ahead of the current one that get a partition up front
+RANGE_YEARS_AHEAD = int(os.getenv("PAYROLL_RANGE_YEARS_AHEAD", "2"))
+
+
+def partition_scheme() -> Optional[str]:
+    """The configured scheme, or None to keep plain tables."""
+    scheme = os.getenv("PAYROLL_PARTITIONING", "none").lower()
+    if scheme == "none":
+        return None
+    if scheme not in PARTITION_SCHEMES:
+        raise ValueError(f"PAYROLL_PARTITIONING must be one of none, {', '.join(PARTITION_SCHEMES)}")
+    return scheme
+
+
+def partition_years() -> range:
+    return range(RANGE_START_YEAR, date.today().year + RANGE_YEARS_AHEAD + 1)
+
+
+def is_partitioned(bind, table: str) -> bool:
+    if bind.dialect.name != 'postgresql':
+        return False
+    return bind.execute(
+        sa.text("SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"),
+        {"table": table}
+    ).first() is not None
+
+
+def _year_partitions_sql(parent: str, years) -> List[str]:
+    statements = [
+        f"CREATE TABLE {parent}_{year} PARTITION OF {parent} "
+        f"FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')"
+        for year in years
+    ]
+    # Rows outside the listed years (and NULL months) go to the default partition
+    statements.append(f"CREATE TABLE {parent}_default PARTITION OF {parent} DEFAULT")
+    return statements
+
+
+def partitions_sql(table: str, month_column: str, scheme: str, hash_partitions: int = HASH_PARTITIONS,
+                   years=None) -> List[str]:
+    """CREATE TABLE statements for the partitions of ``table``."""
+    years = partition_years() if years is None else years
+    if scheme == 'range':
+        return _year_partitions_sql(table, years)
+
+    statements = []
+    for remainder in range(hash_partitions):
+        partition = f"{table}_h{remainder}"
+        statement = (f"CREATE TABLE {partition} PARTITION OF {table} "
+                     f"FOR VALUES WITH (MODULUS {hash_partitions}, REMAINDER {remainder})")
+        if scheme == 'hash_range':
+            statements.append(f"{statement} PARTITION BY RANGE ({month_column})")
+            statements.extend(_year_partitions_sql(partition, years))
+        else:
+            statements.append(statement)
+    return statements
+
+
+def _partition_by(scheme: str, month_column: str) -> str:
+    if scheme == 'range':
+        return f"RANGE ({month_column})"
+    return "HASH (company_id)"
+
+
+def _saved_definitions(bind, table: str):
+    """Secondary index and foreign key definitions of ``table``, to recreate after a rebuild.
+
+    Indexes backing the primary key or a unique constraint are left out; the
+    rebuild sets up its own keys.
+    """
+    indexes = bind.execute(sa.text(
+        "SELECT i.relname, pg_get_indexdef(x.indexrelid) FROM pg_index x "
+        "JOIN pg_class i ON i.oid = x.indexrelid "
+        "WHERE x.indrelid = to_regclass(:table) "
+        "AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = x.indexrelid AND c.contype IN ('p', 'u'))"
+    ), {"table": table}).fetchall()
+    foreign_keys = bind.execute(sa.text(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(:table) AND contype = 'f'"
+    ), {"table": table}).fetchall()
+    return indexes, foreign_keys
+
+
+def _rebuild(bind, table: str, partition_by: Optional[str], partitions: List[str], primary_key: Optional[str],
+             unique: Optional[str] = None):
+    """Swap ``table`` for a new table with the same columns and data.
+
+    The id sequence moves to the new table before the old one is dropped,
+    and the saved indexes and foreign keys are recreated. Runs under an
+    ACCESS EXCLUSIVE lock on the table (see the module docstring).
+    """
+    indexes, foreign_keys = _saved_definitions(bind, table)
+    sequence = bind.execute(sa.text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": table}).scalar()
+    old = f"{table}_old"
+
+    bind.execute(sa.text(f"ALTER TABLE {table} RENAME TO {old}"))
+    bind.execute(sa.text(
+        f"CREATE TABLE {table} (LIKE {old} INCLUDING DEFAULTS)"
+        + (f" PARTITION BY {partition_by}" if partition_by else "")
+    ))
+    for statement in partitions:
+        bind.execute(sa.text(statement))
+    if primary_key:
+        bind.execute(sa.text(f"ALTER TABLE {table} ADD PRIMARY KEY ({primary_key})"))
+    if unique:
+        name = f"{table}_{unique.replace(', ', '_')}_key"
+        bind.execute(sa.text(f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE ({unique})"))
+
+    bind.execute(sa.text(f"INSERT INTO {table} SELECT * FROM {old}"))
+
+    if sequence:
+        bind.execute(sa.text(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id"))
+    bind.execute(sa.text(f"DROP TABLE {old}"))
+
+    # Index and constraint names were freed with the old table
+    for _, definition in indexes:
+        bind.execute(sa.text(definition))
+    for name, definition in foreign_keys:
+        bind.execute(sa.text(f"ALTER TABLE {table} ADD CONSTRAINT {name} {definition}"))
+
+
+def partition_table(bind, table: str, month_column: str, scheme: str):
+    """Rebuild ``table`` as a partitioned table under ``scheme`` (PostgreSQL only).
+
+    Unique constraints on a partitioned table must contain the partition
+    key, so the primary key becomes (id, company_id) for hash partitioning.
+    Month ranges admit NULL months, which a primary key cannot hold, so range
+    schemes get UNIQUE (id, <month>) and hash_range UNIQUE (id, company_id,
+    <month>) instead; their index also serves lookups by id.
+
+    Needs a maintenance window: the table is locked for the whole copy.
+    """
+    if scheme == 'hash':
+        primary_key, unique = "id, company_id", None
+    elif scheme == 'hash_range':
+        primary_key, unique = None, f"id, company_id, {month_column}"
+    else:
+        primary_key, unique = None, f"id, {month_column}"
+    _rebuild(
+        bind,
+        table,
+        _partition_by(scheme, month_column),
+        partitions_sql(table, month_column, scheme),
+        primary_key,
+        unique
+    )
+
+
+def unpartition_table(bind, table: str):
+    """Rebuild a partitioned ``table`` as a plain table with an id primary key (in a maintenance window)."""
+    _rebuild(bind, table, None, [], "id")
+
+
+def add_year_partitions(bind, table: str, year: int):
+    """Add the partitions of ``year`` to a range or hash_range partitioned table.
+
+    Run ahead of time (e.g. yearly): a year whose rows already sit in a
+    default partition cannot be split out without moving them first.
+    """
+    strategy = bind.execute(sa.text(
+        "SELECT partstrat FROM pg_partitioned_table WHERE partrelid = to_regclass(:table)"
+    ), {"table": table}).scalar()
+    if strategy == 'r':
+        parents = [table]
+    elif strategy == 'h':
+        parents = [row[0] for row in bind.execute(sa.text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_partitioned_table p ON p.partrelid = c.oid "
+            "WHERE i.inhparent = to_regclass(:table)"
+        ), {"table": table})]
+    else:
+        return
+    for parent in parents:
+        if bind.execute(sa.text("SELECT to_regclass(:name)"), {"name": f"{parent}_{year}"}).scalar() is None:
+            bind.execute(sa.text(_year_partitions_sql(parent, [year])[0]))
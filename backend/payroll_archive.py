@@ -0,0 +1,347 @@
+import os
+import re
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+from urllib.parse import quote, unquote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+# Root of the archive; one hive-style directory per company and month:
+#   <root>/company=<name>/month=<YYYY-MM>/part-0.parquet
+ARCHIVE_DIR = os.getenv("PAYROLL_ARCHIVE_DIR", "./payroll_archive")
+
+# Employee fields produced by excel_processor.parse_excel_by_position. The
+# compatibility aliases (basic_rate, earned_wage, basic, gross_salary,
+# overtime_hours) repeat one of these and are restored by ALIAS_FIELDS.
+# input_hash is not an employee field: it is passed next to the employees
+# (see archive_upload) and only read back for delta uploads.
+ARCHIVE_SCHEMA = pa.schema([
+    ('employee_id', pa.string()),
+    ('name', pa.string()),
+    ('daily_salary', pa.float64()),
+    ('attendance_days', pa.float64()),
+    ('vda_rate', pa.float64()),
+    ('pl', pa.float64()),
+    ('bonus_rate', pa.float64()),
+    ('monthly_salary', pa.float64()),
+    ('vda', pa.float64()),
+    ('daily_allowance', pa.float64()),
+    ('allowance', pa.float64()),
+    ('bonus', pa.float64()),
+    ('pl_daily_rate', pa.float64()),
+    ('nh_fh_days', pa.float64()),
+    ('nh_fh_amt', pa.float64()),
+    ('ot_days', pa.float64()),
+    ('ot_wages', pa.float64()),
+    ('ppe_cost', pa.float64()),
+    ('total_b', pa.float64()),
+    ('esi_employee', pa.float64()),
+    ('pf_employee', pa.float64()),
+    ('uniform_deduction', pa.float64()),
+    ('pt', pa.float64()),
+    ('lwf_employee', pa.int16()),
+    ('deduction_total', pa.float64()),
+    ('bank_transfer', pa.float64()),
+    ('esi_employer', pa.float64()),
+    ('pf_employer', pa.float64()),
+    ('commission', pa.float64()),
+    ('lwf_employer', pa.int16()),
+    ('ctc', pa.float64()),
+    ('net_salary', pa.float64()),
+    ('bank_account', pa.string()),
+    ('input_hash', pa.string()),
+])
+
+ALIAS_FIELDS = {
+    'basic_rate': 'daily_salary',
+    'earned_wage': 'monthly_salary',
+    'basic': 'monthly_salary',
+    'gross_salary': 'total_b',
+    'overtime_hours': 'ot_days',
+}
+
+PARTITIONING = ds.partitioning(
+    pa.schema([('company', pa.string()), ('month', pa.string())]),
+    flavor='hive'
+)
+
+MONTH_PATTERN = re.compile(r'^(\d{4})-(\d{2})(?:-\d{2})?$')
+
+# Touched on every write to a month, so readers in any worker can tell
+# whether results computed from that month are still current
+GENERATIONS_DIR = '_generations'
+
+
+def normalize_month(month: str) -> str:
+    """Normalize a month to YYYY-MM.
+
+    Accepts YYYY-MM, YYYY-MM-DD and the "January 2025" labels sent by the
+    upload page.
+    """
+    text = str(month).strip()
+    match = MONTH_PATTERN.match(text)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return f"{match.group(1)}-{match.group(2)}"
+    for label_format in ('%B %Y', '%b %Y'):
+        try:
+            return datetime.strptime(text, label_format).strftime('%Y-%m')
+        except ValueError:
+            continue
+    raise ValueError(f"Invalid month '{month}', expected YYYY-MM")
+
+
+def archive_root(tenant_id: Optional[str] = None) -> str:
+    """Archive directory of a tenant; the shared archive when tenant_id is None.
+
+    Tenant archives live under ``_tenants`` so that scans of the shared
+    archive (which skip names starting with ``_``) never include them.
+    """
+    if tenant_id is None:
+        return ARCHIVE_DIR
+    return os.path.join(ARCHIVE_DIR, '_tenants', quote(str(tenant_id), safe=''))
+
+
+def month_stamps(root: Optional[str] = None) -> Dict[str, int]:
+    """Last write time (ns) of every archived month."""
+    directory = os.path.join(root or ARCHIVE_DIR, GENERATIONS_DIR)
+    if not os.path.isdir(directory):
+        return {}
+    return {entry.name: entry.stat().st_mtime_ns for entry in os.scandir(directory)}
+
+
+def partition_path(company: str, month: str, root: Optional[str] = None) -> str:
+    """Directory holding one company-month of the archive."""
+    return os.path.join(
+        root or ARCHIVE_DIR,
+        f"company={quote(company, safe='')}",
+        f"month={normalize_month(month)}"
+    )
+
+
+def company_month_path(company: str, month: str, root: Optional[str] = None) -> str:
+    """Parquet file holding one company-month of the archive."""
+    return os.path.join(partition_path(company, month, root), 'part-0.parquet')
+
+
+def employees_to_table(employees: List[Dict[str, Any]], input_hashes: Optional[List[str]] = None) -> pa.Table:
+    """Convert processed employee dicts (and their input hashes) to an Arrow table with ARCHIVE_SCHEMA."""
+    arrays = []
+    for field in ARCHIVE_SCHEMA:
+        if field.name == 'input_hash':
+            values = input_hashes if input_hashes is not None else [None] * len(employees)
+        else:
+            values = [employee.get(field.name) for employee in employees]
+        arrays.append(pa.array(values, type=field.type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=ARCHIVE_SCHEMA)
+
+
+def archive_company_month(
+    company: str,
+    month: str,
+    employees: List[Dict[str, Any]],
+    root: Optional[str] = None,
+    input_hashes: Optional[List[str]] = None
+) -> str:
+    """Write (or replace) one company-month of the archive. Returns the file path."""
+    path = company_month_path(company, month, root)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+
+    # Write next to the target and rename, so readers never see a partial file
+    tmp_path = os.path.join(directory, f".part-{uuid.uuid4().hex}.tmp")
+    pq.write_table(employees_to_table(employees, input_hashes), tmp_path, compression='zstd')
+    os.replace(tmp_path, path)
+
+    generations = os.path.join(root or ARCHIVE_DIR, GENERATIONS_DIR)
+    os.makedirs(generations, exist_ok=True)
+    with open(os.path.join(generations, normalize_month(month)), 'w') as marker:
+        marker.write(uuid.uuid4().hex)
+    return path
+
+
+def has_changes(company: Dict[str, Any]) -> bool:
+    """Whether a company of a delta upload differs from its previous upload."""
+    changes = company.get("data_quality", {}).get("changes")
+    if changes is None:
+        return True
+    return bool(changes["changed"] or changes["added"] or changes["removed"])
+
+
+def archive_upload(
+    processed_data: Dict[str, Any],
+    month: str,
+    root: Optional[str] = None,
+    only_changed: bool = False,
+    input_hashes: Optional[Dict[str, List[str]]] = None
+) -> List[str]:
+    """Archive every company of a processed upload under the given month.
+
+    input_hashes holds the input hashes of each company's employees, as
+    filled in by excel_processor.process_excel_file_by_position; without
+    them the month cannot serve as the base of a delta upload.
+
+    With only_changed, companies of a delta upload that match their previous
+    upload are left untouched. A company with any change is still rewritten
+    whole rather than as a delta file: the dataset scans (monthly_totals,
+    DuckDB's read_parquet) read every file of a partition, so changed rows
+    stored beside the base file would be counted twice.
+    """
+    input_hashes = input_hashes or {}
+    return [
+        archive_company_month(company["name"], month, company["employees"], root, input_hashes.get(company["name"]))
+        for company in processed_data.get("companies", [])
+        if company.get("employees") and (not only_changed or has_changes(company))
+    ]
+
+
+def archive_dataset(root: Optional[str] = None) -> Optional[ds.Dataset]:
+    """The whole archive as a pyarrow dataset, or None if nothing was archived yet.
+
+    The dataset has a ``company`` and a ``month`` partition column, so filters
+    on either only open the matching files. DuckDB can query the same files
+    with ``read_parquet('<root>/*/*/*.parquet', hive_partitioning=1)``.
+    """
+    root = root or ARCHIVE_DIR
+    if not os.path.isdir(root):
+        return None
+    return ds.dataset(
+        root,
+        format='parquet',
+        partitioning=PARTITIONING
+    )
+
+
+def read_company_month(company: str, month: str, root: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Read one archived company-month back as employee dicts (aliases included).
+
+    The rows keep their ``input_hash`` for delta uploads; strip it before
+    returning them from an API.
+    """
+    path = company_month_path(company, month, root)
+    if not os.path.exists(path):
+        return []
+    employees = pq.read_table(path).to_pylist()
+    month = normalize_month(month)
+    for employee in employees:
+        for alias, source in ALIAS_FIELDS.items():
+            employee[alias] = employee[source]
+        employee['hours_worked'] = 0
+        employee['company'] = company
+        employee['month'] = month
+    return employees
+
+
+def iter_company_month(
+    company: str,
+    month: str,
+    columns: Optional[List[str]] = None,
+    root: Optional[str] = None,
+    batch_size: int = 1000
+) -> Iterator[Dict[str, Any]]:
+    """Yield the archived employees of a company-month one batch at a time.
+
+    Only ``batch_size`` rows are held in memory, so exports of large months
+    run in constant memory. Aliases are not restored; request source fields.
+    """
+    for batch in iter_company_month_batches(company, month, columns, root, batch_size):
+        yield from batch.to_pylist()
+
+
+def iter_company_month_batches(
+    company: str,
+    month: str,
+    columns: Optional[List[str]] = None,
+    root: Optional[str] = None,
+    batch_size: int = 1000
+) -> Iterator[pa.RecordBatch]:
+    """Yield the archived rows of a company-month as Arrow record batches."""
+    path = company_month_path(company, month, root)
+    if not os.path.exists(path):
+        return
+    parquet_file = pq.ParquetFile(path)
+    yield from parquet_file.iter_batches(batch_size=batch_size, columns=columns)
+
+
+def company_month_exists(company: str, month: str, root: Optional[str] = None) -> bool:
+    """Whether a company-month has been archived."""
+    return os.path.exists(company_month_path(company, month, root))
+
+
+def companies_for_month(month: str, root: Optional[str] = None) -> List[str]:
+    """Names of the companies archived for a month, sorted."""
+    root = root or ARCHIVE_DIR
+    if not os.path.isdir(root):
+        return []
+    companies = []
+    for entry in os.scandir(root):
+        if not entry.name.startswith('company='):
+            continue
+        company = unquote(entry.name[len('company='):])
+        if company_month_exists(company, month, root):
+            companies.append(company)
+    return sorted(companies)
+
+
+def monthly_totals(
+    start_month: str,
+    end_month: str,
+    companies: Optional[List[str]] = None,
+    fields: Optional[List[str]] = None,
+    root: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """Sum payroll fields per company and month over an inclusive month range.
+
+    Only the partitions in range and the requested columns are read; rows are
+    aggregated in Arrow without being converted to Python objects.
+    """
+    dataset = archive_dataset(root)
+    if dataset is None:
+        return []
+    fields = fields or ['net_salary', 'total_b', 'ctc', 'ot_wages']
+
+    condition = (ds.field('month') >= normalize_month(start_month)) & (ds.field('month') <= normalize_month(end_month))
+    if companies:
+        condition = condition & ds.field('company').isin(companies)
+    table = dataset.to_table(columns=['company', 'month'] + fields, filter=condition)
+
+    grouped = table.group_by(['company', 'month']).aggregate(
+        [(field, 'sum') for field in fields] + [('month', 'count')]
+    )
+    rows = [
+        dict(
+            company=row['company'],
+            month=row['month'],
+            employee_count=row['month_count'],
+            **{field: row[f"{field}_sum"] for field in fields}
+        )
+        for row in grouped.to_pylist()
+    ]
+    return sorted(rows, key=lambda row: (row['company'], row['month']))
+
+
+def year_over_year(year: int, fields: Optional[List[str]] = None, root: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Totals per company for a year next to the previous year, with the change in percent."""
+    fields = fields or ['net_salary', 'total_b', 'ctc', 'ot_wages']
+    totals: Dict[str, Dict[str, Any]] = {}
+    for row in monthly_totals(f"{year - 1}-01", f"{year}-12", fields=fields, root=root):
+        period = 'current' if row['month'].startswith(str(year)) else 'previous'
+        company = totals.setdefault(row['company'], {
+            'company': row['company'],
+            'current': {field: 0.0 for field in fields + ['employee_count']},
+            'previous': {field: 0.0 for field in fields + ['employee_count']},
+        })
+        for field in fields + ['employee_count']:
+            company[period][field] += row[field] or 0
+
+    report = []
+    for company in totals.values():
+        company['change_percent'] = {
+            field: (round((company['current'][field] - company['previous'][field]) / company['previous'][field] * 100, 2)
+                    if company['previous'][field] else None)
+            for field in fields
+        }
+        report.append(company)
+    return sorted(report, key=lambda company: company['company'])
@@ -5,6 +5,7 @@
 from sqlalchemy.orm import Session
 
 from payroll_models import Employee, AttendanceRecord, PayrollEntry
+from column_coercion import clean_numeric
 
 # Constants for calculations
 VDA_RATE = 100.0  # VDA rate per day
@@ -173,9 +174,19 @@ def process_excel_attendance(
             if col not in df.columns:
                 raise ValueError(f"Required column '{col}' not found in Excel file")
         
+        # Coerce numeric columns once; blank optional cells stay NaN so defaults apply
+        days_worked = clean_numeric(df['days_worked'], strict=True)[0]
+        ot_hours = clean_numeric(df['ot_hours'], strict=True)[0]
+        optional_fields = ['allowance', 'bonus', 'ppe_cost', 'uniform', 'lwf_40_flag', 'lwf_60_flag']
+        optional_values = {
+            field: clean_numeric(df[field], default=None)[0]
+            for field in optional_fields
+            if field in df.columns
+        }
+        
         # Convert to list of dictionaries
         attendance_data = []
-        for _, row in df.iterrows():
+        for idx, row in df.iterrows():
             # Skip rows with no employee_id
             if pd.isna(row['employee_id']):
                 continue
@@ -184,20 +195,21 @@ def process_excel_attendance(
             attendance = {
                 'employee_id': str(row['employee_id']),
                 'month': month,
-                'days_worked': int(row['days_worked']) if not pd.isna(row['days_worked']) else 0,
-                'ot_hours': float(row['ot_hours']) if not pd.isna(row['ot_hours']) else 0.0
+                'days_worked': int(days_worked.at[idx]),
+                'ot_hours': float(ot_hours.at[idx])
             }
             
             # Add optional fields if present
-            optional_fields = ['allowance', 'bonus', 'ppe_cost', 'uniform', 'lwf_40_flag', 'lwf_60_flag']
-            for field in optional_fields:
-                if field in df.columns and not pd.isna(row[field]):
-                    if field.endswith('_flag'):
-                        # Convert to boolean
-                        attendance[field] = bool(row[field])
-                    else:
-                        # Convert to float
-                        attendance[field] = float(row[field])
+            for field, values in optional_values.items():
+                value = values.at[idx]
+                if pd.isna(value):
+                    continue
+                if field.endswith('_flag'):
+                    # Convert to boolean
+                    attendance[field] = bool(value)
+                else:
+                    # Convert to float
+                    attendance[field] = float(value)
             
             attendance_data.append(attendance)
         
@@ -0,0 +1,228 @@
+"""Closing payroll periods into immutable snapshots.
+
+Closing a company-month freezes its payroll entries into one snapshot: the
+rows as a zstd-compressed Arrow IPC stream (columnar), its SHA-256 checksum
+and precomputed totals, stored on the payroll_periods row. Reads of a
+closed month are served from the snapshot through an in-process cache and
+never touch payroll_entries; uploads into a closed month are refused.
+Reopening drops the snapshot, and the version bump invalidates every
+worker's cached copy.
+"""
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import Boolean, Date, DateTime, Float, Integer
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .updated_payroll_models import PayrollEntry, PayrollPeriod
+
+# Closed months whose decoded snapshot is kept in memory per worker
+PAYROLL_SNAPSHOT_CACHE_SIZE = int(os.getenv("PAYROLL_SNAPSHOT_CACHE_SIZE", "32"))
+
+SNAPSHOT_COMPRESSION = 'zstd'
+
+# Fields summed into the totals of a closed month
+TOTAL_FIELDS = [
+    'gross_salary', 'deduction_total', 'net_salary', 'ctc',
+    'esi_employee', 'pf_employee', 'esi_employer', 'pf_employer', 'pt', 'lwf_40', 'lwf_60',
+]
+
+
+class PeriodClosedError(Exception):
+    """The payroll period is closed; reopen it before changing its entries."""
+
+
+class SnapshotChecksumError(Exception):
+    """A stored snapshot does not match its checksum."""
+
+
+def _arrow_type(column) -> pa.DataType:
+    if isinstance(column.type, Integer):
+        return pa.int64()
+    if isinstance(column.type, Float):
+        return pa.float64()
+    if isinstance(column.type, Boolean):
+        return pa.bool_()
+    if isinstance(column.type, DateTime):
+        return pa.timestamp('us')
+    if isinstance(column.type, Date):
+        return pa.date32()
+    return pa.string()
+
+
+# Every PayrollEntry column, so a snapshot row carries what to_dict returns
+SNAPSHOT_SCHEMA = pa.schema([(column.name, _arrow_type(column)) for column in PayrollEntry.__table__.columns])
+
+
+def encode_snapshot(entries: List[PayrollEntry]) -> Tuple[bytes, Dict[str, Any]]:
+    """Serialize entries into a compressed Arrow IPC stream; returns it with the totals."""
+    table = pa.table(
+        {field.name: pa.array([getattr(entry, field.name) for entry in entries], field.type)
+         for field in SNAPSHOT_SCHEMA},
+        schema=SNAPSHOT_SCHEMA
+    )
+    totals = {field: round(pc.sum(table[field]).as_py() or 0.0, 2) for field in TOTAL_FIELDS}
+    totals['employees'] = table.num_rows
+
+    sink = pa.BufferOutputStream()
+    options = pa.ipc.IpcWriteOptions(compression=SNAPSHOT_COMPRESSION)
+    with pa.ipc.new_stream(sink, SNAPSHOT_SCHEMA, options=options) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes(), totals
+
+
+def decode_snapshot(blob: bytes, checksum: str) -> List[Dict[str, Any]]:
+    """Verify and decode a snapshot into dicts shaped like PayrollEntry.to_dict()."""
+    if hashlib.sha256(blob).hexdigest() != checksum:
+        raise SnapshotChecksumError("Payroll snapshot does not match its checksum")
+    rows = pa.ipc.open_stream(blob).read_all().to_pylist()
+    for row in rows:
+        for field, value in row.items():
+            if isinstance(value, (date, datetime)):
+                row[field] = value.isoformat()
+    return rows
+
+
+class PeriodSnapshots:
+    """Close and reopen payroll periods, and serve closed months from their snapshots.
+
+    Decoded snapshots are cached per worker, least recently used first out.
+    Like the mapping registry, a cached copy is only used while its version
+    matches the payroll_periods row, a lookup on the (company_id, month)
+    index that never reads the snapshot blob or the entries.
+    """
+
+    def __init__(self, capacity: int = PAYROLL_SNAPSHOT_CACHE_SIZE):
+        self.capacity = capacity
+        self._cache: "OrderedDict[Tuple[str, date], Tuple[int, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _query(db: Session, company_id: str, month: date):
+        return db.query(PayrollPeriod).filter(PayrollPeriod.company_id == company_id, PayrollPeriod.month == month)
+
+    def list_periods(self, db: Session, company_id: str) -> List[PayrollPeriod]:
+        return db.query(PayrollPeriod).filter(PayrollPeriod.company_id == company_id).order_by(PayrollPeriod.month).all()
+
+    def get_period(self, db: Session, company_id: str, month: date) -> Optional[PayrollPeriod]:
+        return self._query(db, company_id, month).first()
+
+    def is_closed(self, db: Session, company_id: str, month: date) -> bool:
+        return db.query(PayrollPeriod.status).filter(
+            PayrollPeriod.company_id == company_id,
+            PayrollPeriod.month == month
+        ).scalar() == "closed"
+
+    def close(self, db: Session, company_id: str, month: date) -> PayrollPeriod:
+        """Freeze the month's payroll entries into a snapshot.
+
+        Raises PeriodClosedError if the month is already closed (also when a
+        concurrent first close of the month wins the insert) and ValueError if
+        it has no payroll entries.
+        """
+        period = self.get_period(db, company_id, month)
+        if period is not None and period.status == "closed":
+            raise PeriodClosedError("Payroll period is already closed")
+
+        entries = db.query(PayrollEntry).filter(
+            PayrollEntry.company_id == company_id,
+            PayrollEntry.report_month == month
+        ).order_by(PayrollEntry.employee_id).all()
+        if not entries:
+            raise ValueError("No payroll entries found for this month")
+
+        blob, totals = encode_snapshot(entries)
+        if period is None:
+            period = PayrollPeriod(company_id=company_id, month=month, version=0)
+            db.add(period)
+        period.status = "closed"
+        period.version = (period.version or 0) + 1
+        period.snapshot = blob
+        period.checksum = hashlib.sha256(blob).hexdigest()
+        period.row_count = len(entries)
+        period.totals = json.dumps(totals)
+        period.closed_at = datetime.now()
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request created the month's row first (unique company_id, month)
+            db.rollback()
+            raise PeriodClosedError("Payroll period is already closed")
+        db.refresh(period)
+
+        self._store((company_id, month), period.version, decode_snapshot(blob, period.checksum))
+        return period
+
+    def reopen(self, db: Session, company_id: str, month: date) -> Optional[PayrollPeriod]:
+        """Drop the snapshot of a closed month. Returns None if the month was never closed."""
+        period = self.get_period(db, company_id, month)
+        if period is None:
+            return None
+        if period.status == "closed":
+            period.status = "open"
+            period.version = (period.version or 0) + 1
+            period.snapshot = None
+            period.checksum = None
+            period.totals = None
+            period.row_count = 0
+            period.reopened_at = datetime.now()
+            db.commit()
+            db.refresh(period)
+        self.invalidate(company_id, month)
+        return period
+
+    def rows(self, db: Session, company_id: str, month: date) -> Optional[List[Dict[str, Any]]]:
+        """Entries of a closed month from its snapshot, or None if the month is not closed.
+
+        The list is shared with the cache; callers must not modify it.
+        """
+        key = (company_id, month)
+        state = db.query(PayrollPeriod.status, PayrollPeriod.version).filter(
+            PayrollPeriod.company_id == company_id,
+            PayrollPeriod.month == month
+        ).first()
+        if state is None or state.status != "closed":
+            self.invalidate(company_id, month)
+            return None
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == state.version:
+                self._cache.move_to_end(key)
+                return cached[1]
+
+        period = self._query(db, company_id, month).first()
+        if period is None or period.status != "closed":
+            return None
+        rows = decode_snapshot(period.snapshot, period.checksum)
+        self._store(key, period.version, rows)
+        return rows
+
+    def _store(self, key: Tuple[str, date], version: int, rows: List[Dict[str, Any]]):
+        with self._lock:
+            self._cache[key] = (version, rows)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def invalidate(self, company_id: Optional[str] = None, month: Optional[date] = None):
+        """Drop cached snapshots: one month, one company, or everything."""
+        with self._lock:
+            if month is not None:
+                self._cache.pop((company_id, month), None)
+            elif company_id is not None:
+                for key in [key for key in self._cache if key[0] == company_id]:
+                    del self._cache[key]
+            else:
+                self._cache.clear()
+
+
+period_snapshots = PeriodSnapshots()
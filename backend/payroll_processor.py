@@ -4,6 +4,13 @@
 from typing import List, Dict, Any, Optional
 import io
 
+from column_coercion import clean_numeric
+from row_classifier import classify_rows
+from header_detection import HeaderMatcher, detect_header
+
+# Model fields holding amounts; everything else is kept as text
+NUMERIC_FIELDS = ['basic', 'vda', 'allowance', 'bonus', 'ot_wages', 'ppe_cost', 'uniform_deduction', 'pt']
+
 def clean_column_name(col_name: str) -> str:
     """Clean column names by removing spaces and special characters"""
     if not isinstance(col_name, str):
@@ -14,74 +21,84 @@ def clean_column_name(col_name: str) -> str:
     clean_name = ''.join(c if c.isalnum() or c == '_' else '' for c in clean_name)
     return clean_name
 
-def map_excel_columns(df: pd.DataFrame) -> Dict[str, str]:
-    """Map Excel columns to our model fields"""
-    # Define possible column names for each field
-    column_mappings = {
-        'card_no': ['card_no', 'card no', 'cardno', 'employee_id', 'emp_id', 'id'],
-        'name': ['name', 'employee_name', 'emp_name'],
-        'esi': ['esi', 'esi_no', 'esi no'],
-        'uan': ['uan', 'uan_no', 'uan no', 'pf_no', 'pf no'],
-        'basic': ['basic', 'basic_salary', 'basic salary'],
-        'vda': ['vda', 'variable_dearness_allowance'],
-        'allowance': ['allowance', 'allow_ance', 'allow ance', 'other_allowance'],
-        'bonus': ['bonus', 'incentive'],
-        'ot_wages': ['ot_wages', 'ot wages', 'overtime', 'ot'],
-        'ppe_cost': ['ppe_cost', 'ppe cost', 'ppe', 'ppe\'s_cost', 'ppe\'s cost'],
-        'uniform_deduction': ['uniform_deduction', 'uniform dedca tion', 'uniform'],
-        'pt': ['pt', 'professional_tax', 'professional tax']
-    }
-    
-    # Create a mapping from Excel column names to our model fields
-    mapping = {}
-    
+# Possible column names for each model field
+PAYROLL_COLUMN_PATTERNS = {
+    'card_no': ['card_no', 'card no', 'cardno', 'employee_id', 'emp_id', 'id'],
+    'name': ['name', 'employee_name', 'emp_name'],
+    'esi': ['esi', 'esi_no', 'esi no'],
+    'uan': ['uan', 'uan_no', 'uan no', 'pf_no', 'pf no'],
+    'basic': ['basic', 'basic_salary', 'basic salary'],
+    'vda': ['vda', 'variable_dearness_allowance'],
+    'allowance': ['allowance', 'allow_ance', 'allow ance', 'other_allowance'],
+    'bonus': ['bonus', 'incentive'],
+    'ot_wages': ['ot_wages', 'ot wages', 'overtime', 'ot'],
+    'ppe_cost': ['ppe_cost', 'ppe cost', 'ppe', 'ppe\'s_cost', 'ppe\'s cost'],
+    'uniform_deduction': ['uniform_deduction', 'uniform dedca tion', 'uniform'],
+    'pt': ['pt', 'professional_tax', 'professional tax']
+}
+PAYROLL_HEADER_MATCHER = HeaderMatcher(PAYROLL_COLUMN_PATTERNS, min_matches=2)
+
+# Number of rows scanned for the header (title rows usually take the first 5-6)
+PAYROLL_HEADER_SCAN_ROWS = 10
+
+def map_excel_columns(df: pd.DataFrame, positions: Optional[Dict[str, int]] = None) -> Dict[str, str]:
+    """Map Excel columns to our model fields
+
+    Args:
+        df: DataFrame whose columns are the sheet header
+        positions: Field to column index already resolved by header detection
+    """
     # Clean column names in the DataFrame
     df.columns = [clean_column_name(col) for col in df.columns]
     
     # For each model field, find the corresponding Excel column
-    for field, possible_names in column_mappings.items():
-        for name in possible_names:
-            clean_name = clean_column_name(name)
-            if clean_name in df.columns:
-                mapping[field] = clean_name
-                break
+    if positions is None:
+        positions = PAYROLL_HEADER_MATCHER.match_row(df.columns)
     
-    return mapping
+    # Create a mapping from Excel column names to our model fields
+    return {field: df.columns[position] for field, position in positions.items()}
 
 def process_excel_file(file_content: bytes, report_month: Optional[datetime] = None) -> List[Dict[str, Any]]:
     """Process Excel file and return a list of payroll entries"""
     try:
-        # Read Excel file
-        df = pd.read_excel(io.BytesIO(file_content), engine='openpyxl')
+        # Parse the workbook once for both header detection and reading
+        excel_file = pd.ExcelFile(io.BytesIO(file_content), engine='openpyxl')
         
-        # Skip header rows (usually first 5-6 rows)
-        # Look for a row that contains common column headers
-        header_row = None
-        for i in range(min(10, len(df))):
-            row = df.iloc[i]
-            # Check if this row contains common headers like 'NAME', 'CARD NO', 'BASIC', etc.
-            if any(col in str(row).upper() for col in ['NAME', 'CARD NO', 'BASIC']):
-                header_row = i
-                break
+        # Skip title rows: locate the header from the top rows only
+        header_row, positions = detect_header(
+            excel_file, 0, PAYROLL_HEADER_MATCHER, max_rows=PAYROLL_HEADER_SCAN_ROWS
+        )
         
-        if header_row is not None:
-            # Use this row as the header
-            df.columns = df.iloc[header_row]
-            df = df.iloc[header_row+1:].reset_index(drop=True)
+        # Read the sheet once, starting at the header row
+        if header_row is None:
+            df = pd.read_excel(excel_file, sheet_name=0)
+            positions = None
+        else:
+            df = pd.read_excel(excel_file, sheet_name=0, header=header_row)
         
         # Map Excel columns to our model fields
-        column_mapping = map_excel_columns(df)
+        column_mapping = map_excel_columns(df, positions)
+        
+        # Coerce the amount columns once; blank or invalid cells become 0.0
+        numeric_columns = {
+            field: clean_numeric(df[excel_col])[0]
+            for field, excel_col in column_mapping.items()
+            if field in NUMERIC_FIELDS
+        }
+        
+        # Classify empty, total and repeated header rows once for the whole sheet
+        row_reasons = classify_rows(df, header_matcher=PAYROLL_HEADER_MATCHER)
         
         # Process each row
         payroll_entries = []
         
-        for _, row in df.iterrows():
+        for pos, (idx, row) in enumerate(df.iterrows()):
             # Skip rows with no name or card number
             if pd.isna(row.get(column_mapping.get('name', ''))) and pd.isna(row.get(column_mapping.get('card_no', ''))):
                 continue
                 
-            # Skip rows that might be totals or headers
-            if any(keyword in str(row).lower() for keyword in ['total', 'grand total', 'sum']):
+            # Skip rows that are totals, repeated headers or empty
+            if row_reasons.iat[pos]:
                 continue
             
             # Extract basic fields
@@ -89,21 +106,8 @@ def process_excel_file(file_content: bytes, report_month: Optional[datetime] = N
             for field, excel_col in column_mapping.items():
                 value = row.get(excel_col)
                 # Convert to appropriate type
-                if field in ['basic', 'vda', 'allowance', 'bonus', 'ot_wages', 'ppe_cost', 'uniform_deduction', 'pt']:
-                    # Convert to float, handling NaN and non-numeric values
-                    try:
-                        if pd.isna(value):
-                            entry[field] = 0.0
-                        else:
-                            # Try to extract numeric value from string if needed
-                            if isinstance(value, str):
-                                # Remove non-numeric characters except decimal point
-                                numeric_str = ''.join(c for c in value if c.isdigit() or c == '.')
-                                entry[field] = float(numeric_str) if numeric_str else 0.0
-                            else:
-                                entry[field] = float(value)
-                    except (ValueError, TypeError):
-                        entry[field] = 0.0
+                if field in numeric_columns:
+                    entry[field] = float(numeric_columns[field].at[idx])
                 else:
                     # For string fields
                     entry[field] = str(value) if not pd.isna(value) else ""
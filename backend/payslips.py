@@ -0,0 +1,276 @@
+import hashlib
+import html
+import json
+import os
+import re
+import threading
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from string import Template
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Tuple
+
+# Rendered payslips are cached by content hash; bump the version whenever the
+# template changes so stale renders are not reused
+TEMPLATE_VERSION = '1'
+PAYSLIP_CACHE_DIR = os.getenv("PAYSLIP_CACHE_DIR", "./payslip_cache")
+PAYSLIP_WORKERS = int(os.getenv("PAYSLIP_WORKERS", "0")) or os.cpu_count() or 1
+# Size the payslip cache is pruned back to, least recently used renders first out
+PAYSLIP_CACHE_MAX_BYTES = int(os.getenv("PAYSLIP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+
+# Below this many payslips to render, a process pool costs more than it saves
+POOL_THRESHOLD = 64
+
+EARNINGS = [
+    ('basic', 'Basic'),
+    ('vda', 'VDA'),
+    ('allowance', 'Allowance'),
+    ('ot_wages', 'OT Wages'),
+    ('bonus', 'Bonus'),
+    ('ppe_cost', 'PPE Cost'),
+]
+
+DEDUCTIONS = [
+    ('esi_employee', 'ESI (0.75%)'),
+    ('pf_employee', 'PF (12%)'),
+    ('pt', 'Professional Tax'),
+    ('uniform', 'Uniform'),
+    ('lwf_40', 'LWF'),
+]
+
+PAYSLIP_TEMPLATE = Template("""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Payslip $employee_id $month</title>
+<style>
+body { font-family: Arial, sans-serif; margin: 2em; }
+table { border-collapse: collapse; width: 100%; margin-bottom: 1em; }
+th, td { border: 1px solid #999; padding: 4px 8px; }
+td.amount { text-align: right; }
+</style>
+</head>
+<body>
+<h2>$company</h2>
+<h3>Payslip for $month</h3>
+<table>
+<tr><th>Employee ID</th><td>$employee_id</td><th>Name</th><td>$name</td></tr>
+<tr><th>Days Worked</th><td>$days_worked</td><th>OT Hours</th><td>$ot_hours</td></tr>
+</table>
+<table>
+<tr><th>Earnings</th><th>Amount</th><th>Deductions</th><th>Amount</th></tr>
+$rows
+<tr><th>Gross Salary</th><td class="amount">$gross_salary</td><th>Total Deductions</th><td class="amount">$deduction_total</td></tr>
+</table>
+<p><strong>Net Salary: $net_salary</strong></p>
+</body>
+</html>
+""")
+
+
+def payslip_context(entry: Any, company_name: str) -> Dict[str, Any]:
+    """Plain values of one PayrollEntry needed to render its payslip."""
+    fields = [field for field, _ in EARNINGS + DEDUCTIONS] + ['gross_salary', 'deduction_total', 'net_salary']
+    context = {field: float(getattr(entry, field) or 0) for field in fields}
+    context.update({
+        'company': company_name,
+        'employee_id': str(entry.employee_id),
+        'name': entry.name or '',
+        'month': entry.report_month.strftime('%B %Y') if entry.report_month else '',
+        'days_worked': entry.days_worked or 0,
+        'ot_hours': float(entry.ot_hours or 0),
+    })
+    return context
+
+
+def content_hash(context: Dict[str, Any]) -> str:
+    """Hash of everything that affects the rendered payslip."""
+    payload = json.dumps(context, sort_keys=True, default=str)
+    return hashlib.sha256(f"{TEMPLATE_VERSION}:{payload}".encode('utf-8')).hexdigest()
+
+
+def render_payslip(context: Dict[str, Any]) -> bytes:
+    """Render one payslip as HTML. Runs in pool workers, so it only uses its argument."""
+    rows = []
+    for index in range(max(len(EARNINGS), len(DEDUCTIONS))):
+        cells = []
+        for items in (EARNINGS, DEDUCTIONS):
+            if index < len(items):
+                field, label = items[index]
+                cells.append(f"<td>{html.escape(label)}</td><td class=\"amount\">{context[field]:,.2f}</td>")
+            else:
+                cells.append("<td></td><td></td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+
+    values = {key: html.escape(str(value)) for key, value in context.items()}
+    for field in ('gross_salary', 'deduction_total', 'net_salary'):
+        values[field] = f"{context[field]:,.2f}"
+    values['rows'] = '\n'.join(rows)
+    return PAYSLIP_TEMPLATE.substitute(values).encode('utf-8')
+
+
+def payslip_filename(context: Dict[str, Any]) -> str:
+    """File name of a payslip inside the ZIP archive."""
+    employee_id = re.sub(r'[^A-Za-z0-9_.-]', '_', context['employee_id'])
+    return f"payslip_{employee_id}_{context['month'].replace(' ', '_')}.html"
+
+
+class PayslipCache:
+    """Rendered payslips on disk, keyed by content hash.
+
+    A hit refreshes the file's modification time, so prune() drops the
+    least recently used renders once the directory outgrows max_bytes.
+    """
+
+    def __init__(self, directory: str = PAYSLIP_CACHE_DIR, max_bytes: int = PAYSLIP_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.html")
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return content
+
+    def put(self, key: str, content: bytes):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+
+    def prune(self):
+        """Delete the least recently used payslips until the cache fits in max_bytes."""
+        files = []
+        total = 0
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.html'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(files):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(max_workers: int) -> ProcessPoolExecutor:
+    """The worker pool shared by every download, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the shared worker pool; called on app shutdown."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+def generate_payslips(
+    contexts: List[Dict[str, Any]],
+    cache: Optional[PayslipCache] = None,
+    max_workers: int = PAYSLIP_WORKERS
+) -> Iterator[Tuple[str, bytes]]:
+    """Yield (filename, content) for every payslip, rendering only those not cached.
+
+    Cached payslips are yielded first so the download starts at once; the
+    rest are rendered in the shared process pool (inline for small batches)
+    and yielded in order as they complete.
+    """
+    cache = cache or PayslipCache()
+    missing = []
+    for context in contexts:
+        key = content_hash(context)
+        content = cache.get(key)
+        if content is None:
+            missing.append((key, context))
+        else:
+            yield payslip_filename(context), content
+
+    if not missing:
+        return
+
+    rendered: Generator[bytes, None, None]
+    if len(missing) < POOL_THRESHOLD or max_workers <= 1:
+        rendered = (render_payslip(context) for _, context in missing)
+    else:
+        chunksize = max(1, len(missing) // (max_workers * 4))
+        rendered = _get_pool(max_workers).map(
+            render_payslip, [context for _, context in missing], chunksize=chunksize)
+    try:
+        for (key, context), content in zip(missing, rendered):
+            cache.put(key, content)
+            yield payslip_filename(context), content
+    finally:
+        # An abandoned download cancels its renders that have not started
+        rendered.close()
+        cache.prune()
+
+
+class _ZipStream:
+    """Write-only file object collecting what ZipFile writes until it is drained."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_zip(files: Iterable[Tuple[str, bytes]]) -> Iterator[bytes]:
+    """Pack (filename, content) pairs into a ZIP archive produced incrementally.
+
+    ZipFile treats the target as unseekable and writes data descriptors,
+    so each member is sent as soon as it is compressed.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, mode='w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for filename, content in files:
+            archive.writestr(filename, content)
+            data = stream.drain()
+            if data:
+                yield data
+    data = stream.drain()
+    if data:
+        yield data
@@ -0,0 +1,132 @@
+import time
+from typing import Optional
+
+from company_context import get_current_company_id_from_context
+
+try:
+    from prometheus_client import Gauge, Histogram
+except ImportError:  # metrics stay disabled without prometheus_client
+    Gauge = Histogram = None
+
+# Stages of an Excel upload, in pipeline order
+STAGES = ('read_excel', 'parse', 'calculate', 'summarize', 'serialize')
+
+# Sheet size label buckets (upper bound in rows, label)
+SHEET_SIZES = ((100, 'small'), (1000, 'medium'), (10000, 'large'))
+
+_stage_seconds = None
+_rows_per_second = None
+_sheets_per_second = None
+
+
+def enable():
+    """Register the pipeline metrics with the default Prometheus registry.
+
+    Until this is called every timer is a shared no-op, so uninstrumented
+    apps pay one function call and a global lookup per stage.
+    """
+    global _stage_seconds, _rows_per_second, _sheets_per_second
+    if Histogram is None or _stage_seconds is not None:
+        return
+    _stage_seconds = Histogram(
+        'payroll_stage_duration_seconds',
+        'Time spent in each stage of Excel payroll processing',
+        ['stage', 'tenant', 'sheet_size'],
+        buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+    )
+    _rows_per_second = Gauge(
+        'payroll_rows_per_second',
+        'Employee rows processed per second by the last upload',
+        ['tenant']
+    )
+    _sheets_per_second = Gauge(
+        'payroll_sheets_per_second',
+        'Sheets processed per second by the last upload',
+        ['tenant']
+    )
+
+
+def enabled() -> bool:
+    return _stage_seconds is not None
+
+
+def sheet_size_label(rows: Optional[int]) -> str:
+    """Coarse size bucket of a sheet, kept small to bound label cardinality."""
+    if rows is None:
+        return 'all'
+    for limit, label in SHEET_SIZES:
+        if rows < limit:
+            return label
+    return 'xlarge'
+
+
+def tenant_label() -> str:
+    return get_current_company_id_from_context() or 'shared'
+
+
+class StageTimer:
+    """Times one stage as a context manager; failed stages are not observed.
+
+    ``rows`` may be set after the timer started (e.g. once a sheet is read).
+    """
+
+    __slots__ = ('stage', 'rows', 'started')
+
+    def __init__(self, stage: str, rows: Optional[int] = None):
+        self.stage = stage
+        self.rows = rows
+        self.started = time.perf_counter()
+
+    def stop(self):
+        _stage_seconds.labels(self.stage, tenant_label(), sheet_size_label(self.rows)).observe(
+            time.perf_counter() - self.started
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.stop()
+
+
+class _NoopTimer:
+    """Shared timer of disabled metrics; holds no state, so setting rows is dropped."""
+
+    __slots__ = ()
+
+    @property
+    def rows(self):
+        return None
+
+    @rows.setter
+    def rows(self, value):
+        pass
+
+    def stop(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+
+_NOOP = _NoopTimer()
+
+
+def stage(name: str, rows: Optional[int] = None):
+    """Start timing a pipeline stage."""
+    if _stage_seconds is None:
+        return _NOOP
+    return StageTimer(name, rows)
+
+
+def record_throughput(rows: int, sheets: int, seconds: float):
+    """Publish rows/sec and sheets/sec of a finished upload."""
+    if _stage_seconds is None or seconds <= 0:
+        return
+    tenant = tenant_label()
+    _rows_per_second.labels(tenant).set(rows / seconds)
+    _sheets_per_second.labels(tenant).set(sheets / seconds)
@@ -0,0 +1,232 @@
+import cProfile
+import hmac
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException
+from fastapi.responses import FileResponse
+from starlette.concurrency import run_in_threadpool
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:  # falls back to cProfile
+    PyinstrumentProfiler = None
+
+# Request profiling is opt-in; nothing is installed unless PROFILE_REQUESTS=true
+PROFILE_REQUESTS = os.getenv("PROFILE_REQUESTS", "false").lower() == "true"
+# Requests carrying this header are profiled when its value equals
+# PROFILE_ADMIN_TOKEN; without a token the header is ignored
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "x-profile").lower().encode()
+# Share of requests profiled at random
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+# A request slower than this arms profiling of the next request to the same endpoint
+PROFILE_SLOW_MS = float(os.getenv("PROFILE_SLOW_MS", "0"))
+# Armed paths remembered at most; the oldest is forgotten first
+PROFILE_ARMED_MAX = int(os.getenv("PROFILE_ARMED_MAX", "256"))
+# 'pyinstrument', 'cprofile' or 'auto' (pyinstrument when installed)
+PROFILE_ENGINE = os.getenv("PROFILE_ENGINE", "auto").lower()
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "logs", "profiles")
+)
+# Newest profiles kept on disk
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "200"))
+# Token for the profile endpoints of apps without their own authentication
+PROFILE_ADMIN_TOKEN = os.getenv("PROFILE_ADMIN_TOKEN")
+
+PROFILE_ID = re.compile(r'^[0-9T]{15}-[0-9a-f]{8}$')
+
+
+def enabled() -> bool:
+    return PROFILE_REQUESTS
+
+
+def _engine() -> str:
+    if PROFILE_ENGINE == 'cprofile' or PyinstrumentProfiler is None:
+        return 'cprofile'
+    return 'pyinstrument'
+
+
+def _header(scope, name: bytes) -> Optional[bytes]:
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value
+    return None
+
+
+class ProfilingMiddleware:
+    """Profiles sampled requests and writes each profile under PROFILE_DIR.
+
+    A request is profiled when it carries PROFILE_HEADER set to
+    PROFILE_ADMIN_TOKEN, when it is picked
+    at PROFILE_SAMPLE_RATE, or when the previous request to the same endpoint
+    took longer than PROFILE_SLOW_MS. Requests that are not picked only pay
+    for a header scan and two clock reads; no profiler is started for them.
+
+    One request is profiled at a time. cProfile only sees the event loop
+    thread, so ``def`` endpoints (run in the threadpool) show up as the wait
+    for their thread; pyinstrument, when installed, follows async tasks.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.busy = threading.Lock()
+        # (method, path) -> duration in ms of the slow request that armed it;
+        # paths carry their parameters, so at most PROFILE_ARMED_MAX are kept
+        self.armed: "OrderedDict[tuple, float]" = OrderedDict()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trigger = self._trigger(scope)
+        if trigger is None or not self.busy.acquire(blocking=False):
+            started = time.perf_counter()
+            await self.app(scope, receive, send)
+            if PROFILE_SLOW_MS:
+                elapsed = (time.perf_counter() - started) * 1000
+                if elapsed > PROFILE_SLOW_MS:
+                    self._arm((scope["method"], scope["path"]), elapsed)
+            return
+
+        try:
+            await self._profile(scope, receive, send, trigger)
+        finally:
+            self.busy.release()
+
+    def _arm(self, key: tuple, elapsed: float):
+        self.armed[key] = elapsed
+        self.armed.move_to_end(key)
+        while len(self.armed) > PROFILE_ARMED_MAX:
+            self.armed.popitem(last=False)
+
+    def _trigger(self, scope) -> Optional[str]:
+        header = _header(scope, PROFILE_HEADER)
+        if header is not None and PROFILE_ADMIN_TOKEN and hmac.compare_digest(header, PROFILE_ADMIN_TOKEN.encode()):
+            return 'header'
+        if PROFILE_SAMPLE_RATE and random.random() < PROFILE_SAMPLE_RATE:
+            return 'sample'
+        if self.armed and (scope["method"], scope["path"]) in self.armed:
+            return 'slow'
+        return None
+
+    async def _profile(self, scope, receive, send, trigger: str):
+        status = {}
+
+        async def send_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        engine = _engine()
+        armed_by = self.armed.pop((scope["method"], scope["path"]), None) if trigger == 'slow' else None
+        if engine == 'cprofile':
+            profiler = cProfile.Profile()
+            start, stop = profiler.enable, profiler.disable
+        else:
+            profiler = PyinstrumentProfiler(async_mode='enabled')
+            start, stop = profiler.start, profiler.stop
+
+        started = time.perf_counter()
+        start()
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            stop()
+            metadata = {
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "status": status.get("code"),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+                "trigger": trigger,
+                "armed_by_ms": round(armed_by, 1) if armed_by is not None else None,
+                "engine": engine,
+            }
+            await run_in_threadpool(save_profile, profiler, engine, metadata)
+
+
+def save_profile(profiler, engine: str, metadata: Dict[str, Any]) -> str:
+    """Write a profile and its metadata sidecar, then prune old profiles."""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    profile_id = f"{datetime.now().strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    if engine == 'cprofile':
+        filename = f"{profile_id}.prof"
+        profiler.dump_stats(os.path.join(PROFILE_DIR, filename))
+    else:
+        filename = f"{profile_id}.html"
+        with open(os.path.join(PROFILE_DIR, filename), 'w') as f:
+            f.write(profiler.output_html())
+
+    metadata = {"id": profile_id, "created_at": datetime.now().isoformat(), "file": filename, **metadata}
+    tmp_path = os.path.join(PROFILE_DIR, f".{profile_id}.json.tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(metadata, f)
+    os.replace(tmp_path, os.path.join(PROFILE_DIR, f"{profile_id}.json"))
+    prune_profiles()
+    return profile_id
+
+
+def list_profiles() -> List[Dict[str, Any]]:
+    """Metadata of the stored profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for name in os.listdir(PROFILE_DIR):
+        if not name.endswith('.json') or not PROFILE_ID.match(name[:-5]):
+            continue
+        try:
+            with open(os.path.join(PROFILE_DIR, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda metadata: metadata["created_at"], reverse=True)
+    return profiles
+
+
+def prune_profiles(keep: int = None):
+    keep = PROFILE_KEEP if keep is None else keep
+    for metadata in list_profiles()[keep:]:
+        for name in (metadata["file"], f"{metadata['id']}.json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name))
+            except FileNotFoundError:
+                pass
+
+
+def admin_token_required(x_admin_token: Optional[str] = Header(None)):
+    """Guard for apps without authentication: the X-Admin-Token header must match PROFILE_ADMIN_TOKEN."""
+    if not PROFILE_ADMIN_TOKEN or x_admin_token != PROFILE_ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin privileges required")
+
+
+def profiles_router(admin_dependency: Callable = admin_token_required) -> APIRouter:
+    """Endpoints to list and download stored profiles, guarded by ``admin_dependency``."""
+    router = APIRouter(dependencies=[Depends(admin_dependency)])
+
+    @router.get("/profiles", response_model=List[dict])
+    async def get_profiles():
+        """List stored request profiles, newest first"""
+        return list_profiles()
+
+    @router.get("/profiles/{profile_id}")
+    async def download_profile(profile_id: str):
+        """Download a stored profile (.prof for cProfile, .html for pyinstrument)"""
+        if not PROFILE_ID.match(profile_id):
+            raise HTTPException(status_code=404, detail="Profile not found")
+        for metadata in list_profiles():
+            if metadata["id"] == profile_id:
+                path = os.path.join(PROFILE_DIR, metadata["file"])
+                if os.path.exists(path):
+                    return FileResponse(path, filename=metadata["file"])
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    return router
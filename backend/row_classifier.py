@@ -0,0 +1,104 @@
+import pandas as pd
+import numpy as np
+from typing import Dict, List, Optional
+
+from header_detection import HeaderMatcher, normalize_label
+
+# Reason codes for rows that are not employee records
+REASON_EMPTY = 'empty'
+REASON_TOTAL = 'total'
+REASON_HEADER = 'header_repeat'
+REASON_OUTLIER = 'outlier'
+
+# Whole-word total markers ("Total", "Sub-Total", "Grand Total", "Sum"), so names
+# like "Suman" or "Sumitra" are not mistaken for summary rows
+TOTAL_PATTERN = r'\b(?:sub\s*-?\s*totals?|grand\s+totals?|totals?|sum)\b'
+
+
+def _normalized_text(column: pd.Series) -> pd.Series:
+    """Lowercased, stripped text of a column with missing cells as ''."""
+    return column.astype(str).str.strip().str.lower().where(column.notna(), '')
+
+
+def _header_labels(df: pd.DataFrame, header_matcher: Optional[HeaderMatcher]) -> List[str]:
+    """Normalized header label per column, '' where the header is not a known column name.
+
+    A sheet without a header row gets its first employee row as column
+    labels, so only labels the matcher knows count as a header.
+    """
+    labels = []
+    for col in df.columns:
+        label = '' if pd.isna(col) else str(col).strip().lower()
+        if header_matcher is None or normalize_label(label) not in header_matcher.lookup:
+            label = ''
+        labels.append(label)
+    return labels
+
+
+def classify_rows(
+    df: pd.DataFrame,
+    value_column: Optional[np.ndarray] = None,
+    outlier_factor: float = 5.0,
+    header_matcher: Optional[HeaderMatcher] = None
+) -> pd.Series:
+    """Classify the rows of a sheet that should not be read as employees.
+
+    Every check runs column-wise over the whole sheet:
+    - empty: no cell holds a value
+    - total: any text cell contains a total/sum marker
+    - header_repeat: at least two cells repeat their column header, counting
+      only headers that ``header_matcher`` recognises (skipped without one)
+    - outlier: the last remaining row's value is more than ``outlier_factor``
+      times the average of the other remaining rows (an unlabelled total row)
+
+    Args:
+        df: DataFrame containing the Excel sheet data
+        value_column: Optional numeric values aligned with df rows used for the outlier test
+        outlier_factor: Multiple of the average above which the last row is treated as a total
+        header_matcher: Column name synonyms of the sheet, used to tell a header from data
+
+    Returns:
+        Series aligned with df.index holding a reason code, or '' for rows to keep
+    """
+    row_count = len(df)
+    has_value = np.zeros(row_count, dtype=bool)
+    is_total = np.zeros(row_count, dtype=bool)
+    header_hits = np.zeros(row_count, dtype=int)
+    labels = _header_labels(df, header_matcher)
+
+    for position, label in enumerate(labels):
+        column = df.iloc[:, position]
+        text = _normalized_text(column)
+        has_value |= text.ne('').to_numpy()
+        if not pd.api.types.is_numeric_dtype(column):
+            is_total |= text.str.contains(TOTAL_PATTERN, regex=True).to_numpy()
+        if label:
+            header_hits += text.eq(label).to_numpy()
+
+    reasons = np.full(row_count, '', dtype=object)
+    label_count = sum(1 for label in labels if label)
+    if label_count:
+        reasons[header_hits >= min(2, label_count)] = REASON_HEADER
+    reasons[is_total & (reasons == '')] = REASON_TOTAL
+    reasons[~has_value] = REASON_EMPTY
+
+    # Single outlier test: last remaining row against the average of the rows before it
+    if value_column is not None:
+        kept = np.flatnonzero(reasons == '')
+        if len(kept) > 1:
+            values = np.asarray(value_column, dtype=float)
+            last = kept[-1]
+            average = np.nanmean(values[kept[:-1]])
+            if average > 0 and values[last] > average * outlier_factor:
+                reasons[last] = REASON_OUTLIER
+
+    return pd.Series(reasons, index=df.index)
+
+
+def dropped_row_report(reasons: pd.Series) -> Dict[str, List[int]]:
+    """Summarize classified rows as 1-based row numbers per reason code."""
+    report = {}
+    dropped = reasons[reasons != '']
+    for idx, reason in dropped.items():
+        report.setdefault(reason, []).append(int(idx) + 1)
+    return report
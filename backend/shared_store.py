@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from employee_store import DataStore, EmployeeTable
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
+
+MANIFEST_FILE = 'manifest.json'
+LOCK_FILE = 'store.lock'
+
+
+class SharedDataStore(DataStore):
+    """Employee store shared by every worker process through files on disk.
+
+    Each company is written as a directory of ``.npy`` column files next to a
+    ``manifest.json`` that records the store generation and, per company, the
+    generation it was last written at. Readers memory-map the column files, so
+    all workers share one copy of the data in the page cache. Before each read
+    a worker stats the manifest; only when it changed does it re-read it and
+    map the companies whose generation moved. Writers hold an exclusive
+    ``flock`` on ``store.lock`` and publish by atomically replacing the
+    manifest, so readers never see a half-written company.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.generation = 0
+        self._tables: Dict[str, EmployeeTable] = {}
+        self._table_generations: Dict[str, int] = {}
+        self._manifest_stat = None
+        self._thread_lock = threading.Lock()
+        os.makedirs(os.path.join(directory, 'companies'), exist_ok=True)
+
+    @property
+    def companies(self) -> Dict[str, EmployeeTable]:
+        self.refresh()
+        return self._tables
+
+    @contextmanager
+    def _write_lock(self):
+        with self._thread_lock:
+            with open(os.path.join(self.directory, LOCK_FILE), 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if fcntl is not None:
+                        fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(os.path.join(self.directory, MANIFEST_FILE)) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'generation': 0, 'companies': {}}
+
+    def _write_manifest(self, manifest: Dict[str, Any]):
+        path = os.path.join(self.directory, MANIFEST_FILE)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, path)
+
+    def refresh(self):
+        """Pick up companies written by other workers since the last read."""
+        try:
+            stat = os.stat(os.path.join(self.directory, MANIFEST_FILE))
+            stat_key = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            stat_key = None
+        if stat_key == self._manifest_stat:
+            return
+
+        manifest = self._read_manifest()
+        tables = {}
+        generations = {}
+        for name, entry in manifest['companies'].items():
+            if self._table_generations.get(name) == entry['generation']:
+                tables[name] = self._tables[name]
+                generations[name] = entry['generation']
+                continue
+            try:
+                tables[name] = self._load_table(entry)
+            except FileNotFoundError:
+                # A writer replaced this company after we read the manifest
+                return self.refresh()
+            generations[name] = entry['generation']
+
+        self._tables = tables
+        self._table_generations = generations
+        self.generation = manifest['generation']
+        self._manifest_stat = stat_key
+
+    def _load_table(self, entry: Dict[str, Any]) -> EmployeeTable:
+        company_dir = os.path.join(self.directory, 'companies', entry['directory'])
+        columns = {}
+        for field, meta in entry['columns'].items():
+            kind = meta['kind']
+            if kind == 'constant':
+                columns[field] = (kind, meta['value'])
+                continue
+            path = os.path.join(company_dir, meta['file'])
+            if kind == 'object':
+                # Python objects cannot be memory-mapped; these columns are rare and small
+                data = np.load(path, allow_pickle=True)
+            else:
+                data = np.load(path, mmap_mode='r')
+            if kind == 'category':
+                categories = np.load(os.path.join(company_dir, meta['categories']), mmap_mode='r')
+                data = pd.Categorical.from_codes(data, categories=categories)
+            columns[field] = (kind, data)
+        return EmployeeTable(entry['fields'], columns, entry['aliases'], entry['length'])
+
+    @staticmethod
+    def _dump_table(table: EmployeeTable, company_dir: str) -> Dict[str, Any]:
+        columns = {}
+        for position, (field, (kind, data)) in enumerate(table.columns.items()):
+            meta: Dict[str, Any] = {'kind': kind}
+            if kind == 'constant':
+                meta['value'] = data.item() if isinstance(data, np.generic) else data
+            else:
+                meta['file'] = f"{position}.npy"
+                if kind == 'category':
+                    meta['categories'] = f"{position}.categories.npy"
+                    np.save(os.path.join(company_dir, meta['categories']), np.array(data.categories.tolist(), dtype=str))
+                    data = data.codes
+                np.save(os.path.join(company_dir, meta['file']), data, allow_pickle=(kind == 'object'))
+            columns[field] = meta
+        return {
+            'fields': table.fields,
+            'aliases': table.aliases,
+            'length': len(table),
+            'columns': columns
+        }
+
+    def _remove_directory(self, directory: str):
+        # Workers that still map the old files keep them alive until they refresh
+        shutil.rmtree(os.path.join(self.directory, 'companies', directory), ignore_errors=True)
+
+    def set_company(self, company_name: str, employees: List[Dict[str, Any]]):
+        """Replace the stored employees of a company for every worker."""
+        table = EmployeeTable.from_records(employees) if employees else None
+        with self._write_lock():
+            manifest = self._read_manifest()
+            generation = manifest['generation'] + 1
+            previous = manifest['companies'].pop(company_name, None)
+
+            if table is not None:
+                directory = f"{hashlib.sha1(company_name.encode('utf-8')).hexdigest()[:16]}-{generation}"
+                company_dir = os.path.join(self.directory, 'companies', directory)
+                os.makedirs(company_dir)
+                entry = self._dump_table(table, company_dir)
+                entry.update({'directory': directory, 'generation': generation})
+                manifest['companies'][company_name] = entry
+
+            manifest['generation'] = generation
+            self._write_manifest(manifest)
+            if previous is not None:
+                self._remove_directory(previous['directory'])
+
+    def clear(self):
+        """Remove all stored companies for every worker."""
+        with self._write_lock():
+            manifest = self._read_manifest()
+            self._write_manifest({'generation': manifest['generation'] + 1, 'companies': {}})
+            for entry in manifest['companies'].values():
+                self._remove_directory(entry['directory'])
+
+
+def create_data_store(directory: Optional[str] = None) -> DataStore:
+    """Shared on-disk store when DATA_STORE_DIR is set, in-process store otherwise."""
+    directory = directory or os.getenv("DATA_STORE_DIR")
+    if directory:
+        return SharedDataStore(directory)
+    return DataStore()
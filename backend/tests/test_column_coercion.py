@@ -0,0 +1,26 @@
+import pandas as pd
+
+from column_coercion import clean_numeric
+
+
+def _clean(cells, **kwargs):
+    values, invalid = clean_numeric(pd.Series(cells, dtype=object), **kwargs)
+    return list(values), list(invalid)
+
+
+def test_text_cells_keep_their_first_number():
+    values, invalid = _clean(['₹ 1,250', 'Rs. 300', '22 days', ' 3 '])
+    assert values == [1250.0, 300.0, 22.0, 3.0]
+    assert not any(invalid)
+
+
+def test_parenthesized_cells_are_negative():
+    values, invalid = _clean(['(500)', 'Rs (1,200)', '(2.5)'])
+    assert values == [-500.0, -1200.0, -2.5]
+    assert not any(invalid)
+
+
+def test_strict_cells_must_hold_one_number():
+    values, invalid = _clean(['₹ 1,250', '12-15', '22 days', ' 3 ', '(1)', 4, None], strict=True)
+    assert values == [0.0, 0.0, 0.0, 3.0, -1.0, 4.0, 0.0]
+    assert invalid == [True, True, True, False, False, False, False]
@@ -0,0 +1,38 @@
+"""Every list endpoint query is served by its index (see benchmarks.query_plans).
+
+    cd backend && python -m pytest tests/test_query_plans.py
+
+Seeds a scratch SQLite database once per session; the plans are checked
+with the same shapes and rules as ``python -m benchmarks.query_plans``.
+"""
+import pytest
+
+from benchmarks import query_plans
+
+# Big enough for the planner statistics to favour the indexes
+COMPANIES = 20
+EMPLOYEES = 200
+MONTHS = 12
+
+
+@pytest.fixture(scope='session')
+def plan_db(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('query_plans') / 'plans.db'}"
+    api, database, models = query_plans.load_api(url)
+    if str(database.engine.url) != url:
+        # The engine is created at import; never seed a database we did not create
+        pytest.skip("backend.database was already imported with another DATABASE_URL")
+    sample = query_plans.seed(database, models, COMPANIES, EMPLOYEES, MONTHS)
+    db = database.SessionLocal()
+    try:
+        yield api, db, sample
+    finally:
+        db.close()
+        database.engine.dispose()
+
+
+@pytest.mark.parametrize('shape', query_plans.SHAPES, ids=[shape.name for shape in query_plans.SHAPES])
+def test_query_uses_index(plan_db, shape):
+    api, db, sample = plan_db
+    [result] = query_plans.check(api, db, sample, [shape])
+    assert not result['problems'], '\n'.join(result['problems'] + result['plan'])
@@ -0,0 +1,23 @@
+import pandas as pd
+
+from excel_processor import POSITION_HEADER_MATCHER
+from row_classifier import REASON_HEADER, REASON_TOTAL, classify_rows
+
+
+def test_repeated_header_row_is_dropped():
+    df = pd.DataFrame(
+        [['GO1', 'ASHA', 22, 500], ['Card No', 'Name', 'Attendance', 'Basic Rate'], ['GO2', 'RAVI', 20, 500]],
+        columns=['Card No', 'Name', 'Attendance', 'Basic Rate']
+    )
+    reasons = classify_rows(df, header_matcher=POSITION_HEADER_MATCHER)
+    assert list(reasons) == ['', REASON_HEADER, '']
+
+
+def test_first_row_of_data_is_not_a_header():
+    # Without a header row pandas turns the first employee into the column labels
+    df = pd.DataFrame(
+        [['GO2', 'RAVI', 'Packing', 500], ['GO3', 'MEENA', 'Packing', 500], ['', 'Total', '', 1000]],
+        columns=['GO1', 'ASHA', 'Packing', 500]
+    )
+    reasons = classify_rows(df, header_matcher=POSITION_HEADER_MATCHER)
+    assert list(reasons) == ['', '', REASON_TOTAL]
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+
+from mapping_api import get_tenant_id
+from upload_traces import trace_buffer
+
+router = APIRouter()
+
+@router.get("/upload-traces", response_model=List[dict])
+async def list_upload_traces(tenant_id: Optional[str] = Depends(get_tenant_id)):
+    """List the processing traces of recent uploads, newest first"""
+    return trace_buffer.list(tenant_id)
+
+@router.get("/upload-traces/{upload_id}", response_class=PlainTextResponse)
+async def get_upload_trace(upload_id: str, tenant_id: Optional[str] = Depends(get_tenant_id)):
+    """Processing trace of one upload, by the upload_id returned with its result"""
+    trace = trace_buffer.get(upload_id, tenant_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Upload trace not found")
+    return PlainTextResponse(trace["text"])
@@ -0,0 +1,159 @@
+import glob
+import gzip
+import json
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Upload traces kept in memory; the oldest leaves the ring buffer first
+UPLOAD_TRACE_CAPACITY = int(os.getenv("UPLOAD_TRACE_CAPACITY", "50"))
+# The newest traces stay as plain text; older ("cold") ones are zlib-compressed
+UPLOAD_TRACE_HOT = int(os.getenv("UPLOAD_TRACE_HOT", "4"))
+# Upper bound on the memory held by the stored traces
+UPLOAD_TRACE_MEMORY_BYTES = int(os.getenv("UPLOAD_TRACE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+# Characters captured per upload; the rest of a longer trace is counted, not kept
+UPLOAD_TRACE_MAX_CHARS = int(os.getenv("UPLOAD_TRACE_MAX_CHARS", "2000000"))
+# Optional on-disk copy of every trace, evicted oldest first past UPLOAD_TRACE_DISK_BYTES
+UPLOAD_TRACE_DIR = os.getenv("UPLOAD_TRACE_DIR")
+UPLOAD_TRACE_DISK_BYTES = int(os.getenv("UPLOAD_TRACE_DISK_BYTES", str(256 * 1024 * 1024)))
+
+UPLOAD_ID = re.compile(r'^[0-9a-f]{32}$')
+
+
+class TraceEntry:
+    __slots__ = ('metadata', 'text', 'compressed')
+
+    def __init__(self, metadata: Dict[str, Any], text: str):
+        self.metadata = metadata
+        self.text: Optional[str] = text
+        self.compressed: Optional[bytes] = None
+
+    def compress(self):
+        if self.text is not None:
+            self.compressed = zlib.compress(self.text.encode('utf-8'), 6)
+            self.text = None
+
+    def read(self) -> str:
+        if self.text is not None:
+            return self.text
+        return zlib.decompress(self.compressed).decode('utf-8')
+
+    @property
+    def nbytes(self) -> int:
+        # Plain text is counted at up to 4 bytes per character (str storage)
+        return len(self.compressed) if self.text is None else len(self.text) * 4
+
+
+class TraceBuffer:
+    """Bounded ring buffer of upload traces, keyed by upload id.
+
+    Holds at most ``capacity`` traces and ``memory_bytes`` of them; the
+    newest ``hot`` traces are kept as text and the rest compressed. With a
+    ``persist_dir`` every trace is also written there gzip-compressed, so
+    other workers (and restarts) can serve it, and the directory is trimmed
+    oldest first to ``disk_bytes``.
+    """
+
+    def __init__(
+        self,
+        capacity: int = UPLOAD_TRACE_CAPACITY,
+        hot: int = UPLOAD_TRACE_HOT,
+        memory_bytes: int = UPLOAD_TRACE_MEMORY_BYTES,
+        persist_dir: Optional[str] = UPLOAD_TRACE_DIR,
+        disk_bytes: int = UPLOAD_TRACE_DISK_BYTES
+    ):
+        self.capacity = capacity
+        self.hot = hot
+        self.memory_bytes = memory_bytes
+        self.persist_dir = persist_dir
+        self.disk_bytes = disk_bytes
+        self._entries: "OrderedDict[str, TraceEntry]" = OrderedDict()
+        self._nbytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, upload_id: str, text: str, metadata: Dict[str, Any]):
+        metadata = {"upload_id": upload_id, "chars": len(text), **metadata}
+        entry = TraceEntry(metadata, text)
+        with self._lock:
+            self._entries[upload_id] = entry
+            self._nbytes += entry.nbytes
+            # Compress the trace that just went cold
+            if len(self._entries) > self.hot:
+                cold = self._entries[list(self._entries)[-self.hot - 1]] if self.hot else entry
+                before = cold.nbytes
+                cold.compress()
+                self._nbytes += cold.nbytes - before
+            while self._entries and (len(self._entries) > self.capacity or self._nbytes > self.memory_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._nbytes -= evicted.nbytes
+        if self.persist_dir:
+            self._persist(upload_id, text, metadata)
+
+    def get(self, upload_id: str, tenant_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Metadata and text of a trace of ``tenant_id``, or None."""
+        with self._lock:
+            entry = self._entries.get(upload_id)
+            trace = {**entry.metadata, "text": entry.read()} if entry else None
+        if trace is None and self.persist_dir and UPLOAD_ID.match(upload_id):
+            trace = self._load(upload_id)
+        if trace is None or trace.get("tenant_id") != tenant_id:
+            return None
+        return trace
+
+    def list(self, tenant_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Metadata of the traces of ``tenant_id`` held in memory, newest first."""
+        with self._lock:
+            return [
+                dict(entry.metadata) for entry in reversed(self._entries.values())
+                if entry.metadata.get("tenant_id") == tenant_id
+            ]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    @property
+    def nbytes(self) -> int:
+        return self._nbytes
+
+    def _persist(self, upload_id: str, text: str, metadata: Dict[str, Any]):
+        os.makedirs(self.persist_dir, exist_ok=True)
+        path = os.path.join(self.persist_dir, f"{upload_id}.json.gz")
+        tmp_path = f"{path}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+            json.dump({**metadata, "text": text}, f)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _load(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            with gzip.open(os.path.join(self.persist_dir, f"{upload_id}.json.gz"), 'rt', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _evict_disk(self):
+        files = []
+        for path in glob.glob(os.path.join(self.persist_dir, "*.json.gz")):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+
+# Traces of the uploads processed by this worker
+trace_buffer = TraceBuffer()
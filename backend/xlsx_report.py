@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Iterable, List, Optional
+
+import pyarrow.compute as pc
+import xlsxwriter
+from xlsxwriter.utility import xl_col_to_name
+
+import payroll_archive
+
+# Computed columns of parse_excel_by_position, in statement order
+REPORT_COLUMNS = [
+    ('employee_id', 'Employee ID'),
+    ('name', 'Name'),
+    ('daily_salary', 'Daily Salary'),
+    ('attendance_days', 'Attendance'),
+    ('vda_rate', 'VDA Rate'),
+    ('pl', 'PL'),
+    ('bonus_rate', 'Bonus Rate'),
+    ('monthly_salary', 'Monthly Salary'),
+    ('vda', 'VDA'),
+    ('daily_allowance', 'Daily Allowance'),
+    ('allowance', 'Allowance'),
+    ('bonus', 'Bonus'),
+    ('pl_daily_rate', 'PL Daily Rate'),
+    ('nh_fh_days', 'NH/FH Days'),
+    ('nh_fh_amt', 'NH/FH Amount'),
+    ('ot_days', 'OT Days'),
+    ('ot_wages', 'OT Wages'),
+    ('ppe_cost', 'PPE Cost'),
+    ('total_b', 'Total B'),
+    ('esi_employee', 'ESI 0.75%'),
+    ('pf_employee', 'PF 12%'),
+    ('uniform_deduction', 'Uniform Deduction'),
+    ('pt', 'PT'),
+    ('lwf_employee', 'LWF 40'),
+    ('deduction_total', 'Total Deduction'),
+    ('bank_transfer', 'Bank Transfer'),
+    ('esi_employer', 'ESI 3.25%'),
+    ('pf_employer', 'PF 13%'),
+    ('commission', 'Commission'),
+    ('lwf_employer', 'LWF 60'),
+    ('ctc', 'CTC'),
+]
+
+# Columns written as plain numbers rather than money
+COUNT_COLUMNS = {'attendance_days', 'nh_fh_days', 'ot_days'}
+
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def sheet_title(company: str, used: set) -> str:
+    """Excel sheet name for a company: at most 31 characters, valid and unique."""
+    base = INVALID_SHEET_CHARS.sub('_', company).strip("'")[:31] or 'Sheet'
+    title = base
+    suffix = 1
+    while title.lower() in used:
+        suffix += 1
+        title = f"{base[:31 - len(str(suffix)) - 1]}~{suffix}"
+    used.add(title.lower())
+    return title
+
+
+def write_statement(path: str, month: str, companies: Iterable[str], root: Optional[str] = None) -> int:
+    """Write a payroll statement with one sheet per company. Returns the rows written.
+
+    The workbook is written in xlsxwriter's constant_memory mode: each row is
+    flushed to disk as soon as the next one starts, and the archive is read
+    in record batches, so memory stays bounded however large the month is.
+    Number formats are set per column rather than per cell, and the total
+    row uses SUM formulas with values precomputed in Arrow.
+    """
+    fields = [field for field, _ in REPORT_COLUMNS]
+    workbook = xlsxwriter.Workbook(path, {'constant_memory': True})
+    header_format = workbook.add_format({'bold': True, 'bg_color': '#D9E1F2', 'border': 1})
+    money_format = workbook.add_format({'num_format': '#,##0.00'})
+    total_format = workbook.add_format({'bold': True, 'num_format': '#,##0.00', 'top': 1})
+
+    used_titles: set = set()
+    rows_written = 0
+    try:
+        for company in companies:
+            worksheet = workbook.add_worksheet(sheet_title(company, used_titles))
+            worksheet.set_column(0, 0, 14)
+            worksheet.set_column(1, 1, 30)
+            for col, field in enumerate(fields[2:], start=2):
+                worksheet.set_column(col, col, 13, None if field in COUNT_COLUMNS else money_format)
+            worksheet.freeze_panes(1, 2)
+            worksheet.write_row(0, 0, [label for _, label in REPORT_COLUMNS], header_format)
+
+            totals = [0.0] * len(fields)
+            row = 0
+            for batch in payroll_archive.iter_company_month_batches(company, month, columns=fields, root=root):
+                for col in range(2, len(fields)):
+                    totals[col] += pc.sum(batch.column(col)).as_py() or 0
+                for values in zip(*[column.to_pylist() for column in batch.columns]):
+                    row += 1
+                    worksheet.write_row(row, 0, values)
+
+            worksheet.write_string(row + 1, 1, 'Total', total_format)
+            for col in range(2, len(fields)):
+                column = xl_col_to_name(col)
+                worksheet.write_formula(row + 1, col, f"=SUM({column}2:{column}{row + 1})", total_format, totals[col])
+            rows_written += row
+    finally:
+        workbook.close()
+    return rows_written
+
+
+def statement_companies(company: str, month: str, root: Optional[str] = None) -> List[str]:
+    """Companies to include: every archived company of the month for 'all', else the one given."""
+    if company.lower() == 'all':
+        return payroll_archive.companies_for_month(month, root)
+    if payroll_archive.company_month_exists(company, month, root):
+        return [company]
+    return []
+
+
+def remove_file(path: str):
+    """Delete a temporary report file once it has been sent."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass